@@ -0,0 +1,155 @@
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import tempfile
+import uuid
+from typing import Dict, List
+
+from dotenv import load_dotenv
+from qdrant_client import AsyncQdrantClient
+
+from retrieval.engine import RETRIEVAL_COLLECTIONS, RetrievalEngine
+from shared.clients import OllamaClient
+from shared.models.retrieval import RetrievalQuery
+from shared.models.vector import Vector, VectorPoint
+from shared.utils.hashing import vector_point_id
+from shared.vector_store.base import VectorStore
+from shared.vector_store.numpy_store import NumpyVectorStore
+from shared.vector_store.qdrant_store import QdrantVectorStore
+
+
+class RandomEmbeddingClient:
+    """Stand-in for Ollama when benchmarking the vector store side only."""
+
+    def __init__(self, size: int, seed: int = 0):
+        self.size = size
+        self.random = random.Random(seed)
+
+    async def compute_embedding(self, text: str) -> List[float]:
+        return [self.random.uniform(-1, 1) for _ in range(self.size)]
+
+
+async def seed_collections(store: VectorStore, size: int, num_models: int,
+                           chunks_per_model: int, seed: int = 0):
+    """Fills the (empty) retrieval collections with random vectors and realistic payloads."""
+    rng = random.Random(seed)
+    for collection_name in RETRIEVAL_COLLECTIONS:
+        await store.create_collection(collection_name, size)
+
+    points: Dict[str, List[VectorPoint]] = {name: [] for name in RETRIEVAL_COLLECTIONS}
+
+    def add_point(collection_name: str, model_id: str, source_id: str, payload: dict):
+        points[collection_name].append(VectorPoint(
+            id=vector_point_id(collection_name, model_id, source_id),
+            vector=Vector.from_floats([rng.uniform(-1, 1) for _ in range(size)]),
+            payload={**payload, "model_id": model_id, "source_id": source_id},
+        ))
+
+    for _ in range(num_models):
+        model_id = str(uuid.UUID(int=rng.getrandbits(128)))
+        add_point("ModelDocSummaryChunks", model_id, "model_doc_summary_0", {"summary": "model summary"})
+        for section_index in range(max(1, chunks_per_model // 5)):
+            doc_section_id = f"{model_id}_section_{section_index}"
+            add_point("DocSectionQuestions", model_id, f"doc_section_question_{doc_section_id}_0",
+                      {"doc_section_id": doc_section_id, "question": "section question?"})
+            add_point("DocSectionSummaryChunksLevel1", model_id, f"doc_section_summary_level1_{doc_section_id}_0",
+                      {"doc_section_id": doc_section_id, "summary": "section summary", "level": "1"})
+            for chunk_index in range(5):
+                chunk_id = f"{doc_section_id}_chunk_{chunk_index}"
+                add_point("Chunks", model_id, chunk_id,
+                          {"doc_section_id": doc_section_id, "type": "text", "content": "chunk content"})
+                add_point("ChunkQuestions", model_id, f"chunk_question_{chunk_id}_0",
+                          {"doc_section_id": doc_section_id, "chunk_id": chunk_id, "question": "chunk question?"})
+
+    for collection_name, collection_points in points.items():
+        for batch_start in range(0, len(collection_points), 256):
+            await store.upsert(collection_name, collection_points[batch_start:batch_start + 256])
+        print(f"Seeded {len(collection_points)} points into {collection_name}.")
+
+
+def percentile(values: List[float], p: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+async def benchmark(args):
+    load_dotenv()
+
+    temp_dir = None
+    if args.backend == "numpy":
+        if args.in_memory:
+            temp_dir = tempfile.TemporaryDirectory()
+        store = NumpyVectorStore(temp_dir.name if temp_dir else os.getenv("VECTOR_STORE_ROOT", "./local_data/vector_store"))
+    elif args.in_memory:
+        store = QdrantVectorStore(AsyncQdrantClient(location=":memory:"))
+    else:
+        store = QdrantVectorStore(AsyncQdrantClient(
+            host=os.getenv("VECTOR_DB_HOST", "localhost"),
+            port=os.getenv("VECTOR_DB_PORT", "6333"),
+        ))
+    if args.in_memory:
+        await seed_collections(store, args.size, args.models, args.chunks_per_model)
+
+    if args.ollama:
+        embedding_client = OllamaClient(os.getenv("OLLAMA_URL"),
+                                        os.getenv("OLLAMA_DEFAULT_EMBEDDING_MODEL", "nomic-embed-text"))
+    else:
+        embedding_client = RandomEmbeddingClient(args.size)
+
+    engine = RetrievalEngine(store, embedding_client, collection_layout=args.layout)
+    questions = [f"benchmark question {i}" for i in range(args.queries)]
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def run_query(question: str):
+        async with semaphore:
+            return await engine.retrieve(RetrievalQuery(question=question, limit=args.limit))
+
+    try:
+        # warm up connections and caches before measuring
+        for question in questions[:min(5, len(questions))]:
+            await engine.retrieve(RetrievalQuery(question=question, limit=args.limit))
+        results = await asyncio.gather(*[run_query(question) for question in questions])
+    finally:
+        await store.close()
+        if temp_dir:
+            temp_dir.cleanup()
+        if args.ollama:
+            await embedding_client.aclose()
+
+    print(f"{'stage':<10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'mean ms':>10}")
+    for stage in ["embed", "search", "fuse", "hydrate", "total"]:
+        timings = [result.timings_ms[stage] for result in results]
+        print(f"{stage:<10}{percentile(timings, 50):>10.2f}{percentile(timings, 95):>10.2f}"
+              f"{percentile(timings, 99):>10.2f}{statistics.mean(timings):>10.2f}")
+
+    p95_total = percentile([result.timings_ms["total"] for result in results], 95)
+    if args.p95_target_ms and p95_total > args.p95_target_ms:
+        print(f"p95 latency {p95_total:.2f} ms exceeds the target of {args.p95_target_ms} ms.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the retrieval engine latency.")
+    parser.add_argument("--in-memory", action="store_true",
+                        help="Use a throwaway store seeded with synthetic points instead of the configured one")
+    parser.add_argument("--backend", default="qdrant", choices=["qdrant", "numpy"],
+                        help="Vector store backend, numpy reads VECTOR_STORE_ROOT unless --in-memory")
+    parser.add_argument("--ollama", action="store_true",
+                        help="Embed the questions with Ollama instead of random vectors")
+    parser.add_argument("--layout", default="separate", choices=["separate", "single"])
+    parser.add_argument("--size", type=int, default=768, help="Vector size")
+    parser.add_argument("--models", type=int, default=50, help="Number of synthetic models (in-memory)")
+    parser.add_argument("--chunks-per-model", type=int, default=100)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--p95-target-ms", type=float, default=None,
+                        help="Exit with an error if the total p95 latency is above this")
+    args = parser.parse_args()
+    if args.in_memory and args.layout == "single":
+        parser.error("the in-memory collections are seeded in the separate layout")
+
+    asyncio.run(benchmark(args))
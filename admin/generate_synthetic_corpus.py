@@ -0,0 +1,362 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Tuple
+
+from faker import Faker
+
+from ingest.workflows.docs.activities import assign_ids_and_content_hashes, \
+    get_title_breadcrumbs
+from shared.models.base import Chunk, DocSection
+from shared.prisma.models_db_prisma_client import Prisma
+from shared.utils.hashing import stable_id
+from shared.utils.postgres import bulk_insert
+
+# elements of the ODD protocol, the top level sections of a model documentation
+ODD_ELEMENTS = [
+    "Purpose and patterns",
+    "Entities, state variables, and scales",
+    "Process overview and scheduling",
+    "Design concepts",
+    "Initialization",
+    "Input data",
+    "Submodels",
+]
+DOMAIN_TERMS = (
+    "agent agents model simulation environment patch patches grid network schedule tick "
+    "step scheduler population household farmer firm market price land cell neighbor "
+    "neighborhood interaction emergence adaptation learning sensing prediction objective "
+    "stochasticity collective observation calibration validation parameter parameters "
+    "variable state initialization submodel process movement energy resource resources "
+    "growth mortality reproduction decision rule rules probability distribution random "
+    "spatial temporal landscape NetLogo Repast MASON GAMA Mesa Python Java HPC turtle "
+    "breed link heterogeneity sensitivity analysis scenario output dataset".split()
+)
+COMMON_WORDS = (
+    "the of and to in a is that for it as with be on by this are from at or which an "
+    "each all their when its into if than then each other after before every new time "
+    "number value values rate level based using used uses given between over under".split()
+)
+PROGRAMMING_LANGUAGES = ["NetLogo", "Java", "Python", "C++", "R", "Julia", "Matlab", "Logo"]
+LICENSES = ["MIT", "Apache 2.0", "GPL-3.0", "BSD-3-Clause", "CC-BY-4.0"]
+CHUNK_TYPES = ["text", "text", "text", "text", "table", "formula", "image"]
+
+# implicit many-to-many tables of ModelMetadata (Prisma orders A/B by model name)
+LINK_TABLES = {
+    "programming_languages": ("_ModelMetadataToProgrammingLanguage", "metadata_first"),
+    "authors": ("_ModelMetadataToPerson", "metadata_first"),
+    "categories": ("_CategoryToModelMetadata", "metadata_second"),
+    "tags": ("_ModelMetadataToTag", "metadata_first"),
+}
+# insert order of the per model tables, parents before children
+MODEL_TABLES = ["modelmetadata", "model", "modeldoc", "docsection", "chunk",
+                "docsectionqa", "chunkqa", "modelcode"]
+
+
+def parse_range(value: str) -> Tuple[int, int]:
+    low, _, high = value.partition("-")
+    return int(low), int(high or low)
+
+
+@dataclass
+class GeneratedModel:
+    slug: str
+    model_id: str
+    markdown: str
+    rows: Dict[str, List[dict]] = field(default_factory=dict)
+    # field of LINK_TABLES -> ids linked to the ModelMetadata
+    links: Dict[str, List[str]] = field(default_factory=dict)
+
+
+class CorpusGenerator:
+    """
+    Generates models with ODD-like documentation. Every model only depends on
+    the seed and its index, so any subset of a corpus can be (re)generated in
+    any order and produces the same ids and content.
+    """
+
+    def __init__(self, seed: int, sections: Tuple[int, int], chunks_per_section: Tuple[int, int],
+                 qas_per_chunk: Tuple[int, int], qas_per_section: Tuple[int, int]):
+        self.seed = seed
+        self.sections = sections
+        self.chunks_per_section = chunks_per_section
+        self.qas_per_chunk = qas_per_chunk
+        self.qas_per_section = qas_per_section
+        self.fake = Faker()
+        self.words = DOMAIN_TERMS + COMMON_WORDS * 3
+        self.reference_ids: Dict[str, List[str]] = {}
+
+    def id(self, *parts) -> str:
+        return stable_id("synthetic-corpus", str(self.seed), *map(str, parts))
+
+    def sentence(self, rng: random.Random, min_words: int = 6, max_words: int = 16) -> str:
+        words = rng.choices(self.words, k=rng.randint(min_words, max_words))
+        return " ".join(words).capitalize() + "."
+
+    def paragraph(self, rng: random.Random, min_sentences: int = 2, max_sentences: int = 6) -> str:
+        return " ".join(self.sentence(rng) for _ in range(rng.randint(min_sentences, max_sentences)))
+
+    def reference_rows(self) -> Dict[str, List[dict]]:
+        """Organizations, persons and the vocabularies shared by all models."""
+        rng = random.Random(self.seed)
+        self.fake.seed_instance(self.seed)
+        organizations = [
+            {
+                "id": self.id("organization", i),
+                "type": rng.choice(["University", "Research Institute", "Company"]),
+                "name": self.fake.company(),
+                "url": self.fake.url(),
+                "identifier": self.id("organization-identifier", i),
+            }
+            for i in range(50)
+        ]
+        persons = [
+            {
+                "id": self.id("person", i),
+                "type": "Person",
+                "given_name": self.fake.first_name(),
+                "family_name": self.fake.last_name(),
+                "email": self.fake.email(),
+                "affiliation_id": rng.choice(organizations)["id"],
+            }
+            for i in range(1000)
+        ]
+        return {
+            "organization": organizations,
+            "person": persons,
+            "programminglanguage": [{"name": name} for name in PROGRAMMING_LANGUAGES],
+            "category": [{"name": f"{term} models"} for term in DOMAIN_TERMS[:40]],
+            "tag": [{"name": f"{term}-{i}"} for i in range(10) for term in DOMAIN_TERMS[:30]],
+        }
+
+    def doc_sections(self, rng: random.Random, model_doc_id: str) -> List[DocSection]:
+        doc_sections: List[DocSection] = []
+        parents: List[DocSection] = []
+        odd_elements = iter(ODD_ELEMENTS)
+        for i in range(rng.randint(*self.sections)):
+            level = 1 if not parents else rng.choices(
+                range(1, len(parents) + 2), weights=[3] + [2] * (len(parents) - 1) + [3])[0]
+            level = min(level, 3)
+            parents = parents[:level - 1]
+            title = next(odd_elements, None) if level == 1 else None
+            doc_section = DocSection(
+                id=f"section_{i}",
+                model_doc_id=model_doc_id,
+                title=title or self.sentence(rng, 2, 5).rstrip("."),
+                level=level,
+                content="",
+                chunks=[],
+                parent=parents[-1] if parents else None,
+            )
+            doc_section.chunks = [
+                Chunk(id=f"chunk_{i}_{j}", doc_section_id=doc_section.id,
+                      type=rng.choice(CHUNK_TYPES), content=self.paragraph(rng))
+                for j in range(rng.randint(*self.chunks_per_section))
+            ]
+            doc_section.content = "\n\n".join(chunk.content for chunk in doc_section.chunks)
+            doc_sections.append(doc_section)
+            parents.append(doc_section)
+        return assign_ids_and_content_hashes(doc_sections, model_doc_id)
+
+    def model(self, index: int) -> GeneratedModel:
+        rng = random.Random(f"{self.seed}:{index}")
+        self.fake.seed_instance(f"{self.seed}:{index}")
+        slug = f"synthetic-{self.seed}-{index:06d}"
+        metadata_id, model_id, model_doc_id = (self.id(kind, index) for kind in ("metadata", "model", "doc"))
+        name = self.fake.catch_phrase()
+        created = datetime(2010, 1, 1, tzinfo=timezone.utc) + timedelta(days=rng.randint(0, 5000))
+
+        doc_sections = self.doc_sections(rng, model_doc_id)
+        markdown = f"# {name}\n\n" + "\n\n".join(
+            f"{'#' * (doc_section.level + 1)} {doc_section.title}\n\n{doc_section.content}"
+            for doc_section in doc_sections
+        ) + "\n"
+
+        model = GeneratedModel(slug=slug, model_id=model_id, markdown=markdown)
+        model.rows["modelmetadata"] = [{
+            "id": metadata_id,
+            "publisher_id": rng.choice(self.reference_ids["organization"]),
+            "name": name,
+            "abstract": self.paragraph(rng, 2, 3),
+            "description": self.paragraph(rng, 3, 8),
+            "version": f"{rng.randint(0, 5)}.{rng.randint(0, 9)}.{rng.randint(0, 9)}",
+            "url": f"https://www.comses.net/codebases/{slug}/",
+            "identifier": slug,
+            "date_created": created,
+            "date_modified": created + timedelta(days=rng.randint(0, 1000)),
+            "keywords": rng.sample(DOMAIN_TERMS, 5),
+            "citation": [self.sentence(rng) for _ in range(rng.randint(1, 2))],
+            "license": rng.choice(LICENSES),
+            "release_notes": self.sentence(rng),
+        }]
+        model.rows["model"] = [{"id": model_id, "external_id": slug, "metadata_id": metadata_id}]
+        model.rows["modeldoc"] = [{
+            "id": model_doc_id,
+            "model_id": model_id,
+            "markdown_object_name": f"{slug}/docs/model_docs.md",
+            "original_source_object_name": f"{slug}/docs/model_docs.pdf",
+            "docs_summary": self.paragraph(rng, 3, 6),
+        }]
+        model.rows["docsection"] = [
+            {
+                "id": doc_section.id,
+                "modeldoc_id": model_doc_id,
+                "parent_id": doc_section.parent.id if doc_section.parent else None,
+                "title": doc_section.title,
+                "level": doc_section.level,
+                "content": doc_section.content,
+                "summary": self.sentence(rng, 12, 30),
+                "content_hash": doc_section.content_hash,
+            }
+            for doc_section in doc_sections
+        ]
+        model.rows["chunk"] = [
+            {
+                "id": chunk.id,
+                "docsection_id": doc_section.id,
+                "type": chunk.type,
+                "content": chunk.content,
+                "content_with_context": " > ".join(get_title_breadcrumbs(doc_section)) + "\n" + chunk.content,
+                "summary": self.sentence(rng, 8, 20),
+                "content_hash": chunk.content_hash,
+            }
+            for doc_section in doc_sections for chunk in doc_section.chunks
+        ]
+        model.rows["docsectionqa"] = [
+            {"id": stable_id(doc_section.id, "qa", str(i)), "docsection_id": doc_section.id,
+             "question": self.sentence(rng).rstrip(".") + "?", "answer": self.paragraph(rng, 1, 3)}
+            for doc_section in doc_sections for i in range(rng.randint(*self.qas_per_section))
+        ]
+        model.rows["chunkqa"] = [
+            {"id": stable_id(chunk["id"], "qa", str(i)), "chunk_id": chunk["id"],
+             "question": self.sentence(rng).rstrip(".") + "?", "answer": self.paragraph(rng, 1, 2)}
+            for chunk in model.rows["chunk"] for i in range(rng.randint(*self.qas_per_chunk))
+        ]
+        model.rows["modelcode"] = [{"id": self.id("code", index), "model_id": model_id}]
+        model.links = {
+            "programming_languages": rng.sample(self.reference_ids["programminglanguage"], rng.randint(1, 2)),
+            "authors": rng.sample(self.reference_ids["person"], rng.randint(1, 4)),
+            "categories": rng.sample(self.reference_ids["category"], rng.randint(1, 3)),
+            "tags": rng.sample(self.reference_ids["tag"], rng.randint(2, 6)),
+        }
+        return model
+
+
+async def save_reference_rows(db: Prisma, generator: CorpusGenerator, counts: Dict[str, int]) -> None:
+    """Creates the shared rows and looks up the ids of the ones with unique names that already existed."""
+    for table, rows in generator.reference_rows().items():
+        counts[table] += await getattr(db, table).create_many(data=rows, skip_duplicates=True)
+        if "id" in rows[0]:
+            generator.reference_ids[table] = [row["id"] for row in rows]
+        else:
+            records = await getattr(db, table).find_many(
+                where={"name": {"in": [row["name"] for row in rows]}})
+            generator.reference_ids[table] = sorted(record.id for record in records)
+
+
+async def save_models(db: Prisma, models: List[GeneratedModel], counts: Dict[str, int]) -> None:
+    async with db.tx(timeout=timedelta(minutes=5)) as transaction:
+        for table in MODEL_TABLES:
+            rows = [row for model in models for row in model.rows[table]]
+            counts[table] += await getattr(transaction, table).create_many(data=rows, skip_duplicates=True)
+        for link_field, (table, order) in LINK_TABLES.items():
+            rows = [
+                (model.rows["modelmetadata"][0]["id"], linked_id) if order == "metadata_first"
+                else (linked_id, model.rows["modelmetadata"][0]["id"])
+                for model in models for linked_id in model.links[link_field]
+            ]
+            await bulk_insert(transaction, table, ["A", "B"], rows, conflict_columns=["A", "B"])
+            counts[table] += len(rows)
+
+
+def write_markdown(models: List[GeneratedModel], markdown_dir: str) -> None:
+    lines = []
+    for model in models:
+        path = os.path.join(markdown_dir, model.slug, "model_docs.md")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(model.markdown)
+        lines.append(json.dumps({"model_id": model.model_id, "model_slug": model.slug,
+                                 "markdown_path": path}) + "\n")
+    with open(os.path.join(markdown_dir, "manifest.jsonl"), "a", encoding="utf-8") as f:
+        f.writelines(lines)
+
+
+async def generate(args):
+    generator = CorpusGenerator(args.seed, parse_range(args.sections), parse_range(args.chunks_per_section),
+                                parse_range(args.qas_per_chunk), parse_range(args.qas_per_section))
+    counts: Dict[str, int] = {table: 0 for table in
+                              ["organization", "person", "programminglanguage", "category", "tag",
+                               *MODEL_TABLES, *(table for table, _ in LINK_TABLES.values())]}
+    db = None
+    if not args.no_db:
+        db = Prisma()
+        await db.connect()
+    if args.markdown_dir:
+        os.makedirs(args.markdown_dir, exist_ok=True)
+
+    started = time.perf_counter()
+    semaphore = asyncio.Semaphore(args.concurrency)
+    done = 0
+
+    async def run_batch(batch_start: int):
+        nonlocal done
+        async with semaphore:
+            models = [generator.model(index) for index in
+                      range(batch_start, min(batch_start + args.batch_size, args.start + args.models))]
+            if args.markdown_dir:
+                await asyncio.to_thread(write_markdown, models, args.markdown_dir)
+            if db:
+                await save_models(db, models, counts)
+            else:
+                for model in models:
+                    for table, rows in model.rows.items():
+                        counts[table] += len(rows)
+            done += len(models)
+            elapsed = time.perf_counter() - started
+            print(f"{done}/{args.models} models, {sum(counts.values()) / elapsed:.0f} rows/s")
+
+    try:
+        if db:
+            await save_reference_rows(db, generator, counts)
+        else:
+            generator.reference_ids = {table: [row["id"] if "id" in row else row["name"] for row in rows]
+                                       for table, rows in generator.reference_rows().items()}
+        await asyncio.gather(*[
+            run_batch(batch_start)
+            for batch_start in range(args.start, args.start + args.models, args.batch_size)
+        ])
+    finally:
+        if db:
+            await db.disconnect()
+
+    elapsed = time.perf_counter() - started
+    print(f"{'table':<40}{'rows':>12}{'rows/s':>12}")
+    for table, count in counts.items():
+        print(f"{table:<40}{count:>12}{count / elapsed:>12.0f}")
+    total = sum(counts.values())
+    print(f"{'total':<40}{total:>12}{total / elapsed:>12.0f}  ({elapsed:.1f} s)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Generate a deterministic synthetic corpus of models for load testing.")
+    parser.add_argument("--models", type=int, default=10000)
+    parser.add_argument("--start", type=int, default=0,
+                        help="Index of the first model, to extend an existing corpus")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--batch-size", type=int, default=50, help="Models per transaction")
+    parser.add_argument("--concurrency", type=int, default=4, help="Transactions in flight")
+    parser.add_argument("--sections", default="8-30", help="DocSections per model (MIN-MAX)")
+    parser.add_argument("--chunks-per-section", default="1-6")
+    parser.add_argument("--qas-per-chunk", default="1-3")
+    parser.add_argument("--qas-per-section", default="2-4")
+    parser.add_argument("--markdown-dir", default=None,
+                        help="Also write every model documentation as markdown for ingestion")
+    parser.add_argument("--no-db", action="store_true", help="Only generate (and write markdown)")
+    asyncio.run(generate(parser.parse_args()))
@@ -0,0 +1,65 @@
+import argparse
+import asyncio
+import os
+
+from dotenv import load_dotenv
+from qdrant_client import AsyncQdrantClient
+
+from shared.vector_store.provisioning import DEFAULT_PROFILE_PATH, \
+    load_collection_profiles, provision_collections, provision_vector_store
+
+
+async def provision_vector_db(profile_path: str, collections: list, recreate: bool,
+                              backend: str, index_type: str, build_indexes: bool):
+    load_dotenv()
+
+    profiles = load_collection_profiles(
+        profile_path, os.getenv("SPARSE_VECTORS_ENABLED", "false").lower() == "true")
+    if collections:
+        profiles = [profile for profile in profiles if profile.name in collections]
+    print(f"Provisioning {len(profiles)} collections from {profile_path}...")
+
+    if backend == "pgvector":
+        # asyncpg is only needed by this backend
+        from shared.vector_store.pgvector_store import PgVectorStore
+        store = await PgVectorStore.connect(
+            os.getenv("PGVECTOR_DB_URL", os.getenv("MODELS_DB_URL")), index_type=index_type)
+        try:
+            await provision_vector_store(store, profiles)
+            if build_indexes:
+                for profile in profiles:
+                    print(f"Building the {index_type} index of {profile.name}...")
+                    await store.build_index(profile.name)
+        finally:
+            await store.close()
+        print("Vector DB provisioning completed successfully.")
+        return
+
+    client = AsyncQdrantClient(
+        host=os.getenv("VECTOR_DB_HOST", "localhost"),
+        port=os.getenv("VECTOR_DB_PORT", "6333"),
+    )
+    try:
+        await provision_collections(client, profiles, recreate=recreate)
+        print("Vector DB provisioning completed successfully.")
+    finally:
+        await client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Create or migrate the vector collections declared in a profile file.")
+    parser.add_argument("--profile", default=os.getenv("VECTOR_DB_COLLECTION_PROFILES", DEFAULT_PROFILE_PATH))
+    parser.add_argument("--collection", action="append", default=[],
+                        help="Only provision this collection (can be repeated)")
+    parser.add_argument("--recreate", action="store_true",
+                        help="Drop and recreate collections whose vector size or distance changed (Qdrant)")
+    parser.add_argument("--backend", default="qdrant", choices=["qdrant", "pgvector"])
+    parser.add_argument("--index-type", default=os.getenv("PGVECTOR_INDEX_TYPE", "hnsw"),
+                        choices=["hnsw", "ivfflat"], help="pgvector index type")
+    parser.add_argument("--build-indexes", action="store_true",
+                        help="(Re)build the pgvector indexes, e.g. IVFFlat after loading the points")
+    args = parser.parse_args()
+
+    asyncio.run(provision_vector_db(args.profile, args.collection, args.recreate,
+                                    args.backend, args.index_type, args.build_indexes))
@@ -0,0 +1,157 @@
+import argparse
+import json
+import os
+import tarfile
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import zstandard
+from dotenv import load_dotenv
+from minio import Minio
+
+from shared.code_archive import archive_index_object_name, read_member
+from shared.model_backup import LATEST_VERSION, MANIFESTS_PREFIX, blob_object_name, \
+    manifest_object_name
+from shared.utils.hashing import sha256_file
+
+# archives with fewer files to restore are range-read member by member instead of streamed
+MAX_RANGE_READ_FILES = 16
+
+
+def create_minio_client() -> Minio:
+    return Minio(
+        f"{os.getenv('MINIO_ENDPOINT')}:{os.getenv('MINIO_PORT')}",
+        access_key=os.getenv("MINIO_ACCESS_KEY"),
+        secret_key=os.getenv("MINIO_SECRET_KEY"),
+        secure=False,  # Set this to True if using HTTPS
+    )
+
+
+def list_versions(client: Minio, bucket_name: str, model_slug: str) -> list:
+    prefix = f"{MANIFESTS_PREFIX}/{model_slug}/"
+    return sorted(
+        obj.object_name[len(prefix):-len(".json")]
+        for obj in client.list_objects(bucket_name, prefix=prefix)
+        if obj.object_name.endswith(".json")
+    )
+
+
+def read_object(client: Minio, bucket_name: str, object_name: str, offset: int = 0, length: int = 0) -> bytes:
+    response = client.get_object(bucket_name, object_name, offset=offset, length=length)
+    try:
+        return response.read()
+    finally:
+        response.close()
+        response.release_conn()
+
+
+def read_manifest(client: Minio, bucket_name: str, model_slug: str, version: str) -> dict:
+    return json.loads(read_object(client, bucket_name, manifest_object_name(model_slug, version)))
+
+
+def local_path(output_dir: str, file: dict) -> str:
+    return os.path.join(output_dir, *file["path"].split("/"))
+
+
+def is_restored(output_dir: str, file: dict) -> bool:
+    path = local_path(output_dir, file)
+    return os.path.isfile(path) and os.path.getsize(path) == file["size"] \
+        and sha256_file(path) == file["sha256"]
+
+
+def write_file(output_dir: str, file: dict, write) -> None:
+    """Writes a manifest file through `write(tmp_path)` and verifies its hash."""
+    path = local_path(output_dir, file)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    write(tmp_path)
+    if sha256_file(tmp_path) != file["sha256"]:
+        os.remove(tmp_path)
+        raise ValueError(f"Backup of {file['path']} is corrupt")
+    os.replace(tmp_path, path)
+
+
+def write_bytes(data: bytes):
+    def write(tmp_path: str):
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+    return write
+
+
+def restore_blob(client: Minio, bucket_name: str, output_dir: str, file: dict) -> None:
+    write_file(output_dir, file,
+               lambda tmp_path: client.fget_object(bucket_name, blob_object_name(file["sha256"]), tmp_path))
+
+
+def restore_from_archive(client: Minio, bucket_name: str, output_dir: str, archive: str, files: list) -> None:
+    """Range-reads a few members through the archive index, streams the whole archive for many."""
+    if len(files) <= MAX_RANGE_READ_FILES:
+        index = json.loads(read_object(client, bucket_name, archive_index_object_name(archive)))
+        for file in files:
+            data = read_member(index, file["path"][len("code/"):],
+                               lambda offset, length: read_object(client, bucket_name, archive, offset, length))
+            write_file(output_dir, file, write_bytes(data))
+        return
+
+    files_by_member = {file["path"][len("code/"):]: file for file in files}
+    response = client.get_object(bucket_name, archive)
+    try:
+        with zstandard.ZstdDecompressor().stream_reader(response) as reader, \
+                tarfile.open(fileobj=reader, mode="r|") as tar:
+            for member in tar:
+                file = files_by_member.get(member.name)
+                if file:
+                    write_file(output_dir, file, write_bytes(tar.extractfile(member).read()))
+    finally:
+        response.close()
+        response.release_conn()
+
+
+def restore_model_backup(model_slug: str, version: str, output_dir: str, parallelism: int):
+    load_dotenv()
+    client = create_minio_client()
+    bucket_name = os.getenv("MINIO_BUCKET_NAME")
+
+    manifest = read_manifest(client, bucket_name, model_slug, version)
+    files = manifest["files"]
+    print(f"Restoring {len(files)} files of {model_slug} version {manifest['version']} to {output_dir}...")
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=parallelism) as executor:
+        missing = [file for file, restored in
+                   zip(files, executor.map(lambda file: is_restored(output_dir, file), files)) if not restored]
+        files_by_archive = defaultdict(list)
+        for file in missing:
+            files_by_archive[file.get("archive")].append(file)
+        jobs = [executor.submit(restore_blob, client, bucket_name, output_dir, file)
+                for file in files_by_archive.pop(None, [])]
+        jobs += [executor.submit(restore_from_archive, client, bucket_name, output_dir, archive, archive_files)
+                 for archive, archive_files in files_by_archive.items()]
+        for job in jobs:
+            job.result()
+    elapsed = time.perf_counter() - started
+
+    print(f"Restored {len(missing)} files ({sum(file['size'] for file in missing) / 1024 / 1024:.1f} MiB), "
+          f"{len(files) - len(missing)} were up to date, in {elapsed:.1f}s.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Materialize a backed up model version from MinIO in a local folder.")
+    parser.add_argument("model_slug")
+    parser.add_argument("--version", default=LATEST_VERSION,
+                        help="Version to restore (default: the last backed up one)")
+    parser.add_argument("--output", default=None,
+                        help="Target folder (default: ./restored/<model_slug>)")
+    parser.add_argument("--parallelism", type=int, default=8, help="Files downloaded at once")
+    parser.add_argument("--list", action="store_true", help="Only list the backed up versions")
+    args = parser.parse_args()
+
+    if args.list:
+        load_dotenv()
+        for version in list_versions(create_minio_client(), os.getenv("MINIO_BUCKET_NAME"), args.model_slug):
+            print(version)
+    else:
+        restore_model_backup(args.model_slug, args.version,
+                             args.output or os.path.join("restored", args.model_slug), args.parallelism)
@@ -13,7 +13,7 @@ from ingest.workflows.code.IngestModelCodeWorkflow import \
     IngestModelCodeWorkflow
 from ingest.workflows.docs.ComputeAndUpsertModelDocEmbeddingsWorkflow import \
     ComputeAndUpsertModelDocEmbeddingsWorkflow, ComputeEmbeddingsWorkflow, \
-    PopulateChunkAnswersCollectionWorkflow, PopulateChunkQuestionsCollectionWorkflow, \
+    EmbedAndUpsertVectorPointsWorkflow, PopulateChunkAnswersCollectionWorkflow, PopulateChunkQuestionsCollectionWorkflow, \
     PopulateChunksCollectionWorkflow, \
     PopulateDocSectionAnswersCollectionWorkflow, PopulateDocSectionQuestionsCollectionWorkflow, \
     PopulateDocSectionSummaryChunksCollectionWorkflow, \
@@ -27,6 +27,9 @@ from ingest.workflows.docs.GenerateSyntheticDataForModelDocWorkflow import \
 from ingest.workflows.docs.IngestModelDocsWorkflow import \
     IngestModelDocsWorkflow
 from ingest.workflows.docs.activities import ModelDocsActivities
+from ingest.workflows.docs.conversion_cache import ConversionCache
+from ingest.workflows.docs.pdf_conversion import DEFAULT_MAX_WORKERS, \
+    PageParallelPdfConverter
 from ingest.workflows.metadata.ComputeAndUpsertMetadataEmbeddingsWorkflow import \
     ComputeAndUpsertMetadataEmbeddingsWorkflow
 from ingest.workflows.metadata.IngestModelMetadataWorkflow import \
@@ -34,7 +37,9 @@ from ingest.workflows.metadata.IngestModelMetadataWorkflow import \
 from ingest.workflows.metadata.activities import \
     generate_model_metadata_from_json
 from shared.activities.text_activities import TextActivities
+from shared.blob_store import create_blob_store_from_env
 from shared.const import INGEST_MODEL_TASK_QUEUE
+from shared.converter import create_data_converter_from_env
 from shared.utils.logging_config import logger
 
 
@@ -58,15 +63,46 @@ async def main():
         f"INGEST_WORKER_MAX_CONCURRENT_ACTIVITIES = {INGEST_WORKER_MAX_CONCURRENT_ACTIVITIES} from .env loaded."
     )
 
+    FS_ROOT = os.getenv("FILE_STORAGE_ROOT")
+    # processes converting PDF pages, each loads the marker models, raise on hosts with the memory
+    DOCS_CONVERSION_PROCESSES = int(os.getenv("DOCS_CONVERSION_PROCESSES", str(DEFAULT_MAX_WORKERS)))
+    DOCS_CONVERSION_PAGES_PER_TASK = int(os.getenv("DOCS_CONVERSION_PAGES_PER_TASK", "4"))
+
+    logger.info(f"FILE_STORAGE_ROOT = {FS_ROOT} from .env loaded.")
+    logger.info(f"DOCS_CONVERSION_PROCESSES = {DOCS_CONVERSION_PROCESSES} from .env loaded.")
+    logger.info(f"DOCS_CONVERSION_PAGES_PER_TASK = {DOCS_CONVERSION_PAGES_PER_TASK} from .env loaded.")
+
+    # converted documents by PDF hash, kept locally (LRU) and in the blob store
+    DOCS_CONVERSION_CACHE_ENABLED = os.getenv("DOCS_CONVERSION_CACHE_ENABLED", "true").lower() == "true"
+    DOCS_CONVERSION_CACHE_ROOT = os.getenv("DOCS_CONVERSION_CACHE_ROOT", "./local_data/conversion_cache")
+    DOCS_CONVERSION_CACHE_MAX_MB = int(os.getenv("DOCS_CONVERSION_CACHE_MAX_MB", "2048"))
+
+    logger.info(f"DOCS_CONVERSION_CACHE_ENABLED = {DOCS_CONVERSION_CACHE_ENABLED} from .env loaded.")
+    logger.info(f"DOCS_CONVERSION_CACHE_ROOT = {DOCS_CONVERSION_CACHE_ROOT} from .env loaded.")
+    logger.info(f"DOCS_CONVERSION_CACHE_MAX_MB = {DOCS_CONVERSION_CACHE_MAX_MB} from .env loaded.")
+
     client = None
     tp = None
     worker = None
+    docs_activities = None
 
     try:
-        client = await Client.connect(TEMPORAL_ADDRESS, namespace=TEMPORAL_NAMESPACE)
+        client = await Client.connect(
+            TEMPORAL_ADDRESS,
+            namespace=TEMPORAL_NAMESPACE,
+            data_converter=create_data_converter_from_env(),
+        )
         tp = ThreadPoolExecutor()
 
-        docs_activities = ModelDocsActivities()
+        docs_activities = ModelDocsActivities(
+            FS_ROOT,
+            pdf_converter=PageParallelPdfConverter(DOCS_CONVERSION_PROCESSES, DOCS_CONVERSION_PAGES_PER_TASK),
+            conversion_cache=ConversionCache(
+                DOCS_CONVERSION_CACHE_ROOT,
+                DOCS_CONVERSION_CACHE_MAX_MB * 1024 * 1024,
+                create_blob_store_from_env(),
+            ) if DOCS_CONVERSION_CACHE_ENABLED else None,
+        )
         text_activities = TextActivities()
         logger.info("Worker running...")
 
@@ -92,10 +128,12 @@ async def main():
                 PopulateDocSectionAnswersCollectionWorkflow,
                 ComputeAndUpsertMetadataEmbeddingsWorkflow,
                 ComputeEmbeddingsWorkflow,
+                EmbedAndUpsertVectorPointsWorkflow,
             ],
             activities=[
                 generate_model_metadata_from_json,
                 docs_activities.split_markdown,
+                docs_activities.count_pdf_pages,
                 docs_activities.convert_pdf_to_markdown,
                 text_activities.chunk_text
             ],
@@ -112,6 +150,8 @@ async def main():
             await worker.shutdown()
         if tp:
             tp.shutdown(wait=True)
+        if docs_activities:
+            docs_activities.close()
 
 
 if __name__ == "__main__":
@@ -7,34 +7,48 @@ from temporalio import workflow
 from shared.activities.llm_activities import LLMActivities
 from shared.activities.text_activities import TextActivities
 from shared.activities.vector_store_activities import VectorStoreActivities
-from shared.const import OLLAMA_EMBEDDING_TASK_QUEUE, \
-    VECTOR_STORE_TASK_QUEUE
-from shared.models.base import ModelDoc
-from shared.models.vector import VectorPoint
-
-EMBEDDING_BATCH_SIZE = 10
+from shared.const import MODEL_DOC_POINTS_COLLECTION, \
+    OLLAMA_EMBEDDING_TASK_QUEUE, VECTOR_STORE_TASK_QUEUE
+from shared.models.base import IngestOptions, ModelDoc
+from shared.models.vector import EmbeddingJob, PendingVectorPoint, Vector, \
+    VectorPoint
+from shared.utils.hashing import point_content_hash, vector_point_id
+
+# number of texts sent to one compute_embeddings activity
+EMBEDDING_BATCH_SIZE = 64
+# number of compute_embeddings activities per run before continue_as_new
+EMBEDDING_BATCHES_PER_RUN = 10
+
+# collections whose points reference a DocSection via the doc_section_id payload
+DOC_SECTION_COLLECTIONS = [
+    "Chunks",
+    *[f"DocSectionSummaryChunksLevel{level}" for level in range(1, 7)],
+    "ChunkQuestions",
+    "ChunkAnswers",
+    "DocSectionQuestions",
+    "DocSectionAnswers",
+]
 
 @workflow.defn
 class ComputeEmbeddingsWorkflow:
     @workflow.run
-    async def run(self, texts: List[str], start_index: int = 0, previous_results: List[List[float]] = None) -> List[List[float]]:
+    async def run(self, texts: List[str], start_index: int = 0, previous_results: List[Vector] = None) -> List[Vector]:
         if previous_results is None:
             previous_results = []
 
-        end_index = min(start_index + EMBEDDING_BATCH_SIZE, len(texts))
-        current_batch = texts[start_index:end_index]
+        end_index = min(start_index + EMBEDDING_BATCH_SIZE * EMBEDDING_BATCHES_PER_RUN, len(texts))
 
         embedding_tasks = [
             workflow.execute_activity(
-                LLMActivities.compute_embedding,
-                args=[text],
+                LLMActivities.compute_embeddings,
+                args=[texts[batch_start:min(batch_start + EMBEDDING_BATCH_SIZE, end_index)]],
                 task_queue=OLLAMA_EMBEDDING_TASK_QUEUE,
-                start_to_close_timeout=timedelta(seconds=10)
-            ) for text in current_batch
+                start_to_close_timeout=timedelta(minutes=2)
+            ) for batch_start in range(start_index, end_index, EMBEDDING_BATCH_SIZE)
         ]
 
         batch_results = await asyncio.gather(*embedding_tasks)
-        all_results = previous_results + batch_results
+        all_results = previous_results + [embedding for batch in batch_results for embedding in batch]
 
         if end_index < len(texts):
             # There are more texts to process
@@ -45,10 +59,149 @@ class ComputeEmbeddingsWorkflow:
 
 
 
+@workflow.defn
+class EmbedAndUpsertVectorPointsWorkflow:
+    """
+    Embeds and upserts points staged in the blob store batch by batch. Vectors
+    go straight from the embedding worker to the vector store worker through the
+    blob store, so each run only carries the EmbeddingJob cursor.
+    """
+    @workflow.run
+    async def run(self, job: EmbeddingJob) -> int:
+        end_index = min(job.cursor + EMBEDDING_BATCHES_PER_RUN, job.num_batches)
+
+        upserted = await asyncio.gather(*[
+            self.embed_and_upsert_batch(job, batch_index)
+            for batch_index in range(job.cursor, end_index)
+        ])
+        job.cursor = end_index
+        job.points_upserted += sum(upserted)
+
+        if job.cursor < job.num_batches:
+            # There are more batches to process
+            return await workflow.continue_as_new(args=[job])
+        else:
+            return job.points_upserted
+
+    @staticmethod
+    async def embed_and_upsert_batch(job: EmbeddingJob, batch_index: int) -> int:
+        await workflow.execute_activity(
+            LLMActivities.compute_staged_embeddings,
+            args=[job.points_key, batch_index],
+            task_queue=OLLAMA_EMBEDDING_TASK_QUEUE,
+            start_to_close_timeout=timedelta(minutes=2)
+        )
+        return await workflow.execute_activity(
+            VectorStoreActivities.upsert_staged_vector_points,
+            args=[job.collection_name, job.points_key, batch_index],
+            task_queue=VECTOR_STORE_TASK_QUEUE,
+            start_to_close_timeout=timedelta(minutes=1)
+        )
+
+
+async def get_embedding_model() -> str:
+    return await workflow.execute_activity(
+        LLMActivities.get_embedding_model,
+        task_queue=OLLAMA_EMBEDDING_TASK_QUEUE,
+        start_to_close_timeout=timedelta(seconds=10)
+    )
+
+
+def with_point_ids(collection_name: str, points: List[PendingVectorPoint],
+                   embedding_model: str) -> List[PendingVectorPoint]:
+    """
+    Replaces the readable source ids of `points` by deterministic UUIDs and
+    adds source_id and content_hash to their payloads, so repeated upserts
+    overwrite the same points and unchanged points can be skipped. Ids are
+    namespaced by the point's kind, if set, instead of the collection. The
+    content_hash covers the text, the payload and `embedding_model`.
+    """
+    return [
+        PendingVectorPoint(
+            id=vector_point_id(point.payload.get("kind", collection_name),
+                               point.payload["model_id"], point.id),
+            payload={
+                **point.payload,
+                "source_id": point.id,
+                "content_hash": point_content_hash(embedding_model, point.text, point.payload)
+            },
+            text=point.text
+        )
+        for point in points
+    ]
+
+
+async def embed_and_upsert_points(collection_name: str,
+                                  points: List[PendingVectorPoint],
+                                  options: IngestOptions) -> None:
+    """
+    Computes the vectors for `points` and upserts them into `collection_name`,
+    either streamed batch by batch through the blob store
+    (`options.stream_embeddings`) or by collecting all vectors in the workflow.
+    Points are identified by `with_point_ids`, unchanged points are skipped
+    (`options.skip_unchanged_points`).
+    """
+    if not points:
+        return
+
+    points = with_point_ids(collection_name, points, await get_embedding_model())
+
+    if options.stream_embeddings:
+        points_key = f"embedding-jobs/{workflow.info().workflow_id}/{collection_name}"
+        num_batches = await workflow.execute_activity(
+            VectorStoreActivities.stage_vector_points,
+            args=[points_key, points, EMBEDDING_BATCH_SIZE,
+                  collection_name if options.skip_unchanged_points else None],
+            task_queue=VECTOR_STORE_TASK_QUEUE,
+            start_to_close_timeout=timedelta(minutes=1)
+        )
+        if num_batches:
+            await workflow.execute_child_workflow(
+                EmbedAndUpsertVectorPointsWorkflow.run,
+                args=[EmbeddingJob(collection_name=collection_name,
+                                   points_key=points_key,
+                                   num_batches=num_batches)]
+            )
+        await workflow.execute_activity(
+            VectorStoreActivities.delete_staged_vector_points,
+            args=[points_key],
+            task_queue=VECTOR_STORE_TASK_QUEUE,
+            start_to_close_timeout=timedelta(minutes=1)
+        )
+        return
+
+    if options.skip_unchanged_points:
+        points = await workflow.execute_activity(
+            VectorStoreActivities.filter_changed_vector_points,
+            args=[collection_name, points],
+            task_queue=VECTOR_STORE_TASK_QUEUE,
+            start_to_close_timeout=timedelta(minutes=1)
+        )
+        if not points:
+            return
+
+    embeddings = await workflow.execute_child_workflow(
+        ComputeEmbeddingsWorkflow.run,
+        args=[[point.text for point in points]]
+    )
+    vector_points = [
+        VectorPoint(id=point.id, payload=point.payload, vector=embedding)
+        for point, embedding in zip(points, embeddings)
+        if embedding
+    ]
+    await workflow.execute_activity(
+        VectorStoreActivities.upsert_metadata_vector_points,
+        args=[collection_name, vector_points],
+        task_queue=VECTOR_STORE_TASK_QUEUE,
+        heartbeat_timeout=timedelta(seconds=30),
+        start_to_close_timeout=timedelta(minutes=10)
+    )
+
+
 @workflow.defn
 class ComputeAndUpsertModelDocEmbeddingsWorkflow:
     @workflow.run
-    async def run(self, model_doc: ModelDoc):
+    async def run(self, model_doc: ModelDoc, options: IngestOptions = None):
         """
                 Goal of the workflow is to populate the following Qdrant Collections:
 
@@ -66,60 +219,73 @@ class ComputeAndUpsertModelDocEmbeddingsWorkflow:
                 DocSectionQuestions -> DocSectionQuestions are embedded
                 DocSectionAnswers -> DocSectionAnswers are embedded
 
+                With options.collection_layout == "single" all of them are
+                upserted into MODEL_DOC_POINTS_COLLECTION instead, tagged with
+                the collection name as "kind".
+
                 @param model_doc:
+                @param options: ingest options passed on to the Populate*CollectionWorkflows
                 @return:
         """
 
         workflow.logger.info(
             "Starting ComputeAndUpsertModelDocEmbeddingsWorkflow")
 
+        options = options or IngestOptions()
+
+        if options.collection_layout == "single":
+            await self.upsert_into_single_collection(model_doc, options)
+            workflow.logger.info(
+                "ComputeAndUpsertModelDocEmbeddingsWorkflow completed.")
+            return
+
         # Execute child workflows in parallel
         tasks = [
             asyncio.create_task(workflow.execute_child_workflow(
-                PopulateChunksCollectionWorkflow.run, args=[model_doc])),
+                PopulateChunksCollectionWorkflow.run, args=[model_doc, options])),
 
             asyncio.create_task(workflow.execute_child_workflow(
                 PopulateModelDocSummaryChunksCollectionWorkflow.run,
-                args=[model_doc])),
+                args=[model_doc, options])),
 
             # Populate DocSectionSummaryChunksLevel1
             asyncio.create_task(workflow.execute_child_workflow(
-                PopulateDocSectionSummaryChunksCollectionWorkflow.run, args=[model_doc, 1])),
+                PopulateDocSectionSummaryChunksCollectionWorkflow.run, args=[model_doc, 1, options])),
 
             # Populate DocSectionSummaryChunksLevel2
             # asyncio.create_task(workflow.execute_child_workflow(
             # 	PopulateDocSectionSummaryChunksCollectionWorkflow.run,
-            # 	args=[model_doc, 2])),
+            # 	args=[model_doc, 2, options])),
 
             # Populate DocSectionSummaryChunksLevel3
             # asyncio.create_task(workflow.execute_child_workflow(
             # 	PopulateDocSectionSummaryChunksCollectionWorkflow.run,
-            # 	args=[model_doc, 3])),
+            # 	args=[model_doc, 3, options])),
 
             # Populate DocSectionSummaryChunksLevel4
             # asyncio.create_task(workflow.execute_child_workflow(
             # 	PopulateDocSectionSummaryChunksCollectionWorkflow.run,
-            # 	args=[model_doc, 4])),
+            # 	args=[model_doc, 4, options])),
 
             # Populate DocSectionSummaryChunksLevel5
             # asyncio.create_task(workflow.execute_child_workflow(
             # 	PopulateDocSectionSummaryChunksCollectionWorkflow.run,
-            # 	args=[model_doc, 5])),
+            # 	args=[model_doc, 5, options])),
 
             # Populate DocSectionSummaryChunksLevel6
             # asyncio.create_task(workflow.execute_child_workflow(
             # 	PopulateDocSectionSummaryChunksCollectionWorkflow.run,
-            # 	args=[model_doc, 6])),
+            # 	args=[model_doc, 6, options])),
 
 
             asyncio.create_task(workflow.execute_child_workflow(
-                PopulateChunkQuestionsCollectionWorkflow.run, args=[model_doc])),
+                PopulateChunkQuestionsCollectionWorkflow.run, args=[model_doc, options])),
             asyncio.create_task(workflow.execute_child_workflow(
-                PopulateChunkAnswersCollectionWorkflow.run, args=[model_doc])),
+                PopulateChunkAnswersCollectionWorkflow.run, args=[model_doc, options])),
             asyncio.create_task(workflow.execute_child_workflow(
-                PopulateDocSectionQuestionsCollectionWorkflow.run, args=[model_doc])),
+                PopulateDocSectionQuestionsCollectionWorkflow.run, args=[model_doc, options])),
             asyncio.create_task(workflow.execute_child_workflow(
-                PopulateDocSectionAnswersCollectionWorkflow.run, args=[model_doc])),
+                PopulateDocSectionAnswersCollectionWorkflow.run, args=[model_doc, options])),
         ]
 
         # Wait for all child workflows to complete
@@ -128,302 +294,244 @@ class ComputeAndUpsertModelDocEmbeddingsWorkflow:
         workflow.logger.info(
             "ComputeAndUpsertModelDocEmbeddingsWorkflow completed.")
 
-
-@workflow.defn
-class PopulateChunksCollectionWorkflow:
-    @workflow.run
-    async def run(self, model_doc: ModelDoc):
-        all_points = []
-        for doc_section in model_doc.doc_sections:
-            chunk_contents = [chunk.content_with_context for chunk in
-                              doc_section.chunks]
-            embeddings = await workflow.execute_child_workflow(
-                ComputeEmbeddingsWorkflow.run,
-                args=[chunk_contents]
-            )
-            points = [
-                VectorPoint(
-                    id=chunk.id,
-                    payload={
-                        "doc_section_id": chunk.doc_section_id,
-                        "type": chunk.type,
-                        "content": chunk.content,
-                        "model_id": model_doc.model_id
-                    },
-                    vector=embedding
-                )
-                for chunk, embedding in zip(doc_section.chunks, embeddings)
-            ]
-            all_points.extend(points)
+    @staticmethod
+    async def upsert_into_single_collection(model_doc: ModelDoc,
+                                            options: IngestOptions) -> None:
+        """
+        Builds the points of every kind and embeds and upserts them as one
+        stream into MODEL_DOC_POINTS_COLLECTION.
+        """
+        points_by_kind = await asyncio.gather(
+            chunk_points(model_doc),
+            model_doc_summary_chunk_points(model_doc),
+            doc_section_summary_chunk_points(model_doc, 1),
+            chunk_question_points(model_doc),
+            chunk_answer_points(model_doc),
+            doc_section_question_points(model_doc),
+            doc_section_answer_points(model_doc),
+        )
+        kinds = [
+            "Chunks",
+            "ModelDocSummaryChunks",
+            "DocSectionSummaryChunksLevel1",
+            "ChunkQuestions",
+            "ChunkAnswers",
+            "DocSectionQuestions",
+            "DocSectionAnswers",
+        ]
+        points = [
+            PendingVectorPoint(id=point.id,
+                               payload={**point.payload, "kind": kind},
+                               text=point.text)
+            for kind, kind_points in zip(kinds, points_by_kind)
+            for point in kind_points
+        ]
 
         await workflow.execute_activity(
-            VectorStoreActivities.upsert_metadata_vector_points,
-            args=["Chunks", all_points],
+            VectorStoreActivities.create_payload_indexes,
+            args=[MODEL_DOC_POINTS_COLLECTION, ["kind", "model_id", "doc_section_id"]],
             task_queue=VECTOR_STORE_TASK_QUEUE,
-            start_to_close_timeout=timedelta(seconds=10)
+            start_to_close_timeout=timedelta(minutes=1)
         )
+        await embed_and_upsert_points(MODEL_DOC_POINTS_COLLECTION, points, options)
+
+
+async def chunk_points(model_doc: ModelDoc) -> List[PendingVectorPoint]:
+    return [
+        PendingVectorPoint(
+            id=chunk.id,
+            payload={
+                "doc_section_id": chunk.doc_section_id,
+                "type": chunk.type,
+                "content": chunk.content,
+                "model_id": model_doc.model_id
+            },
+            text=chunk.content_with_context
+        )
+        for doc_section in model_doc.doc_sections
+        for chunk in doc_section.chunks
+    ]
+
+
+async def model_doc_summary_chunk_points(model_doc: ModelDoc) -> List[PendingVectorPoint]:
+    chunked_summary = await workflow.execute_activity(
+        TextActivities.chunk_text,
+        args=[model_doc.summary],
+        start_to_close_timeout=timedelta(seconds=10)
+    )
+    return [
+        PendingVectorPoint(
+            id=f"model_doc_summary_{i}",
+            payload={"summary": chunk, "model_id": model_doc.model_id},
+            text=chunk
+        )
+        for i, chunk in enumerate(chunked_summary)
+    ]
 
 
-@workflow.defn
-class PopulateModelDocSummaryChunksCollectionWorkflow:
-    @workflow.run
-    async def run(self, model_doc: ModelDoc):
-        chunked_summary = await workflow.execute_activity(
+async def doc_section_summary_chunk_points(model_doc: ModelDoc,
+                                           level: int) -> List[PendingVectorPoint]:
+    # Get doc sections at the specified level
+    doc_sections = [doc_section for doc_section in model_doc.doc_sections if
+                    doc_section.level == level]
+
+    # Chunk summaries for each doc section
+    chunked_summaries_tasks = [
+        workflow.execute_activity(
             TextActivities.chunk_text,
-            args=[model_doc.summary],
+            args=[doc_section.summary],
             start_to_close_timeout=timedelta(seconds=10)
+        ) for doc_section in doc_sections
+    ]
+    chunked_summaries: List[List[str]] = await asyncio.gather(*chunked_summaries_tasks)
+
+    # Create points, preserving the link between chunks and doc_section.id
+    return [
+        PendingVectorPoint(
+            id=f"doc_section_summary_level{level}_{doc_section.id}_{chunk_index}",
+            payload={
+                "summary": chunk,
+                "level": str(level),
+                "model_id": model_doc.model_id,
+                "doc_section_id": doc_section.id
+            },
+            text=chunk
         )
-        embeddings = await workflow.execute_child_workflow(
-            ComputeEmbeddingsWorkflow.run,
-            args=[chunked_summary]
+        for doc_section, summary_chunks in zip(doc_sections, chunked_summaries)
+        for chunk_index, chunk in enumerate(summary_chunks)
+    ]
+
+
+async def chunk_question_points(model_doc: ModelDoc) -> List[PendingVectorPoint]:
+    # Collect questions with their associated chunk and doc_section IDs
+    return [
+        PendingVectorPoint(
+            id=f"chunk_question_{qa.chunk_id}_{qa.id}",
+            payload={
+                "qa_id": qa.id,
+                "model_id": model_doc.model_id,
+                "doc_section_id": doc_section.id,
+                "chunk_id": qa.chunk_id,
+                "question": qa.question
+            },
+            text=qa.question
         )
-        points = [
-            VectorPoint(
-                id=f"model_doc_summary_{i}",
-                payload={"summary": chunk, "model_id": model_doc.model_id},
-                vector=embedding
-            )
-            for i, (chunk, embedding) in
-            enumerate(zip(chunked_summary, embeddings))
-        ]
-        await workflow.execute_activity(
-            VectorStoreActivities.upsert_metadata_vector_points,
-            args=["ModelDocSummaryChunks", points],
-            task_queue=VECTOR_STORE_TASK_QUEUE,
-            start_to_close_timeout=timedelta(seconds=10)
+        for doc_section in model_doc.doc_sections
+        for chunk in doc_section.chunks
+        for qa in chunk.qas
+    ]
+
+
+async def chunk_answer_points(model_doc: ModelDoc) -> List[PendingVectorPoint]:
+    # Collect answers with their associated chunk and doc_section IDs
+    return [
+        PendingVectorPoint(
+            id=f"chunk_answer_{qa.chunk_id}_{qa.id}",
+            payload={
+                "qa_id": qa.id,
+                "model_id": model_doc.model_id,
+                "doc_section_id": doc_section.id,
+                "chunk_id": qa.chunk_id,
+                "answer": qa.answer
+            },
+            text=qa.answer
+        )
+        for doc_section in model_doc.doc_sections
+        for chunk in doc_section.chunks
+        for qa in chunk.qas
+    ]
+
+
+async def doc_section_question_points(model_doc: ModelDoc) -> List[PendingVectorPoint]:
+    # Collect questions with their associated doc_section IDs
+    return [
+        PendingVectorPoint(
+            id=f"doc_section_question_{doc_section.id}_{qa.id}",
+            payload={
+                "qa_id": qa.id,
+                "model_id": model_doc.model_id,
+                "doc_section_id": doc_section.id,
+                "question": qa.question
+            },
+            text=qa.question
+        )
+        for doc_section in model_doc.doc_sections
+        for qa in doc_section.qas
+    ]
+
+
+async def doc_section_answer_points(model_doc: ModelDoc) -> List[PendingVectorPoint]:
+    # Collect answers with their associated doc_section IDs
+    return [
+        PendingVectorPoint(
+            id=f"doc_section_answer_{doc_section.id}_{qa.id}",
+            payload={
+                "qa_id": qa.id,
+                "model_id": model_doc.model_id,
+                "doc_section_id": doc_section.id,
+                "answer": qa.answer
+            },
+            text=qa.answer
         )
+        for doc_section in model_doc.doc_sections
+        for qa in doc_section.qas
+    ]
 
 
 @workflow.defn
-class PopulateDocSectionSummaryChunksCollectionWorkflow:
+class PopulateChunksCollectionWorkflow:
     @workflow.run
-    async def run(self, model_doc: ModelDoc, level: int):
-        # Get doc sections at the specified level
-        doc_sections = [doc_section for doc_section in model_doc.doc_sections if
-                        doc_section.level == level]
-
-        # Chunk summaries for each doc section
-        chunked_summaries_tasks = [
-            workflow.execute_activity(
-                TextActivities.chunk_text,
-                args=[doc_section.summary],
-                start_to_close_timeout=timedelta(seconds=10)
-            ) for doc_section in doc_sections
-        ]
-        chunked_summaries: List[List[str]] = await asyncio.gather(*chunked_summaries_tasks)
+    async def run(self, model_doc: ModelDoc, options: IngestOptions = None):
+        await embed_and_upsert_points("Chunks", await chunk_points(model_doc),
+                                      options or IngestOptions())
 
-        # Compute embeddings for all chunks
-        all_chunks = [chunk for summary_chunks in chunked_summaries for chunk in summary_chunks]
-        embeddings = await workflow.execute_child_workflow(
-            ComputeEmbeddingsWorkflow.run,
-            args=[all_chunks]
-        )
-
-        # Create points, preserving the link between chunks and doc_section.id
-        points = []
-        embedding_index = 0
-        for doc_section, summary_chunks in zip(doc_sections, chunked_summaries):
-            for chunk_index, chunk in enumerate(summary_chunks):
-                points.append(
-                    VectorPoint(
-                        id=f"doc_section_summary_level{level}_{doc_section.id}_{chunk_index}",
-                        payload={
-                            "summary": chunk,
-                            "level": str(level),
-                            "model_id": model_doc.model_id,
-                            "doc_section_id": doc_section.id
-                        },
-                        vector=embeddings[embedding_index]
-                    )
-                )
-                embedding_index += 1
-
-        # Upsert points to vector store
-        await workflow.execute_activity(
-            VectorStoreActivities.upsert_metadata_vector_points,
-            args=[f"DocSectionSummaryChunksLevel{level}", points],
-            task_queue=VECTOR_STORE_TASK_QUEUE,
-            start_to_close_timeout=timedelta(seconds=10)
-        )
 
 @workflow.defn
-class PopulateChunkQuestionsCollectionWorkflow:
+class PopulateModelDocSummaryChunksCollectionWorkflow:
     @workflow.run
-    async def run(self, model_doc: ModelDoc):
-        # Collect questions with their associated chunk and doc_section IDs
-        questions_data = [
-            {
-                "question": qa.question,
-                "chunk_id": qa.chunk_id,
-                "doc_section_id": doc_section.id,
-                "qa_id": qa.id
-            }
-            for doc_section in model_doc.doc_sections
-            for chunk in doc_section.chunks
-            for qa in chunk.qas
-        ]
+    async def run(self, model_doc: ModelDoc, options: IngestOptions = None):
+        await embed_and_upsert_points("ModelDocSummaryChunks",
+                                      await model_doc_summary_chunk_points(model_doc),
+                                      options or IngestOptions())
 
-        # Extract just the questions for embedding
-        questions = [data["question"] for data in questions_data]
 
-        embeddings = await workflow.execute_child_workflow(
-            ComputeEmbeddingsWorkflow.run,
-            args=[questions]
-        )
-
-        points = [
-            VectorPoint(
-                id=f"chunk_question_{data['chunk_id']}_{data['qa_id']}",
-                payload={
-                    "qa_id": data["qa_id"],
-                    "model_id": model_doc.model_id,
-                    "doc_section_id": data["doc_section_id"],
-                    "chunk_id": data["chunk_id"],
-                    "question": data["question"]
-                },
-                vector=embedding
-            )
-            for data, embedding in zip(questions_data, embeddings)
-        ]
+@workflow.defn
+class PopulateDocSectionSummaryChunksCollectionWorkflow:
+    @workflow.run
+    async def run(self, model_doc: ModelDoc, level: int, options: IngestOptions = None):
+        # Compute embeddings and upsert points to vector store
+        await embed_and_upsert_points(f"DocSectionSummaryChunksLevel{level}",
+                                      await doc_section_summary_chunk_points(model_doc, level),
+                                      options or IngestOptions())
 
-        await workflow.execute_activity(
-            VectorStoreActivities.upsert_metadata_vector_points,
-            args=["ChunkQuestions", points],
-            task_queue=VECTOR_STORE_TASK_QUEUE,
-            start_to_close_timeout=timedelta(seconds=10)
-        )
+@workflow.defn
+class PopulateChunkQuestionsCollectionWorkflow:
+    @workflow.run
+    async def run(self, model_doc: ModelDoc, options: IngestOptions = None):
+        await embed_and_upsert_points("ChunkQuestions",
+                                      await chunk_question_points(model_doc),
+                                      options or IngestOptions())
 
 @workflow.defn
 class PopulateChunkAnswersCollectionWorkflow:
     @workflow.run
-    async def run(self, model_doc: ModelDoc):
-        # Collect answers with their associated chunk and doc_section IDs
-        answers_data = [
-            {
-                "answer": qa.answer,
-                "chunk_id": qa.chunk_id,
-                "doc_section_id": doc_section.id,
-                "qa_id": qa.id
-            }
-            for doc_section in model_doc.doc_sections
-            for chunk in doc_section.chunks
-            for qa in chunk.qas
-        ]
-
-        # Extract just the answers for embedding
-        answers = [data["answer"] for data in answers_data]
-
-        embeddings = await workflow.execute_child_workflow(
-            ComputeEmbeddingsWorkflow.run,
-            args=[answers]
-        )
-
-        points = [
-            VectorPoint(
-                id=f"chunk_answer_{data['chunk_id']}_{data['qa_id']}",
-                payload={
-                    "qa_id": data["qa_id"],
-                    "model_id": model_doc.model_id,
-                    "doc_section_id": data["doc_section_id"],
-                    "chunk_id": data["chunk_id"],
-                    "answer": data["answer"]
-                },
-                vector=embedding
-            )
-            for data, embedding in zip(answers_data, embeddings)
-        ]
-
-        await workflow.execute_activity(
-            VectorStoreActivities.upsert_metadata_vector_points,
-            args=["ChunkAnswers", points],
-            task_queue=VECTOR_STORE_TASK_QUEUE,
-            start_to_close_timeout=timedelta(seconds=10)
-        )
+    async def run(self, model_doc: ModelDoc, options: IngestOptions = None):
+        await embed_and_upsert_points("ChunkAnswers",
+                                      await chunk_answer_points(model_doc),
+                                      options or IngestOptions())
 
 @workflow.defn
 class PopulateDocSectionQuestionsCollectionWorkflow:
     @workflow.run
-    async def run(self, model_doc: ModelDoc):
-        # Collect questions with their associated doc_section IDs
-        questions_data = [
-            {
-                "question": qa.question,
-                "doc_section_id": doc_section.id,
-                "qa_id": qa.id
-            }
-            for doc_section in model_doc.doc_sections
-            for qa in doc_section.qas
-        ]
-
-        # Extract just the questions for embedding
-        questions = [data["question"] for data in questions_data]
-
-        embeddings = await workflow.execute_child_workflow(
-            ComputeEmbeddingsWorkflow.run,
-            args=[questions]
-        )
-
-        points = [
-            VectorPoint(
-                id=f"doc_section_question_{data['doc_section_id']}_{data['qa_id']}",
-                payload={
-                    "qa_id": data["qa_id"],
-                    "model_id": model_doc.model_id,
-                    "doc_section_id": data["doc_section_id"],
-                    "question": data["question"]
-                },
-                vector=embedding
-            )
-            for data, embedding in zip(questions_data, embeddings)
-        ]
-
-        await workflow.execute_activity(
-            VectorStoreActivities.upsert_metadata_vector_points,
-            args=["DocSectionQuestions", points],
-            task_queue=VECTOR_STORE_TASK_QUEUE,
-            start_to_close_timeout=timedelta(seconds=10)
-        )
+    async def run(self, model_doc: ModelDoc, options: IngestOptions = None):
+        await embed_and_upsert_points("DocSectionQuestions",
+                                      await doc_section_question_points(model_doc),
+                                      options or IngestOptions())
 
 @workflow.defn
 class PopulateDocSectionAnswersCollectionWorkflow:
     @workflow.run
-    async def run(self, model_doc: ModelDoc):
-        # Collect answers with their associated doc_section IDs
-        answers_data = [
-            {
-                "answer": qa.answer,
-                "doc_section_id": doc_section.id,
-                "qa_id": qa.id
-            }
-            for doc_section in model_doc.doc_sections
-            for qa in doc_section.qas
-        ]
-
-        # Extract just the answers for embedding
-        answers = [data["answer"] for data in answers_data]
-
-        embeddings = await workflow.execute_child_workflow(
-            ComputeEmbeddingsWorkflow.run,
-            args=[answers]
-        )
-
-        points = [
-            VectorPoint(
-                id=f"doc_section_answer_{data['doc_section_id']}_{data['qa_id']}",
-                payload={
-                    "qa_id": data["qa_id"],
-                    "model_id": model_doc.model_id,
-                    "doc_section_id": data["doc_section_id"],
-                    "answer": data["answer"]
-                },
-                vector=embedding
-            )
-            for data, embedding in zip(answers_data, embeddings)
-        ]
-
-        await workflow.execute_activity(
-            VectorStoreActivities.upsert_metadata_vector_points,
-            args=["DocSectionAnswers", points],
-            task_queue=VECTOR_STORE_TASK_QUEUE,
-            start_to_close_timeout=timedelta(seconds=10)
-        )
\ No newline at end of file
+    async def run(self, model_doc: ModelDoc, options: IngestOptions = None):
+        await embed_and_upsert_points("DocSectionAnswers",
+                                      await doc_section_answer_points(model_doc),
+                                      options or IngestOptions())
@@ -1,21 +1,29 @@
 import asyncio
+from datetime import timedelta
 from typing import List
 
 from temporalio import workflow
 
 from shared.activities.llm_activities import LLMActivities
-from shared.models.base import Chunk
+from shared.const import OLLAMA_GENERATE_TASK_QUEUE
+from shared.models.base import Chunk, IngestOptions
+
+# timeout for a single LLM generation activity
+LLM_ACTIVITY_TIMEOUT = timedelta(minutes=10)
 
 
 @workflow.defn
 class GenerateSyntheticDataForChunksWorkflow:
 	@workflow.run
 	async def run(self, chunks: List[Chunk], title_breadcrumbs: List[str],
-	              doc_section_content: str) -> List[Chunk]:
+	              doc_section_content: str,
+	              options: IngestOptions = None) -> List[Chunk]:
 		workflow.logger.info("Starting GenerateSyntheticDataForChunksWorkflow")
 
+		options = options or IngestOptions()
 		chunk_tasks = [
-			self.process_chunk(chunk, title_breadcrumbs, doc_section_content)
+			self.process_chunk(chunk, title_breadcrumbs, doc_section_content,
+			                   options)
 			for chunk in chunks]
 		updated_chunks = await asyncio.gather(*chunk_tasks)
 
@@ -24,7 +32,8 @@ class GenerateSyntheticDataForChunksWorkflow:
 
 	@staticmethod
 	async def process_chunk(chunk: Chunk, title_breadcrumbs: List[str],
-	                        doc_section_content: str) -> Chunk:
+	                        doc_section_content: str,
+	                        options: IngestOptions) -> Chunk:
 		context = {
 			"doc_section_content": doc_section_content,
 			"title_breadcrumbs": title_breadcrumbs
@@ -34,19 +43,35 @@ class GenerateSyntheticDataForChunksWorkflow:
 			workflow.execute_activity(
 				LLMActivities.add_context_to_chunk,
 				args=[chunk, context],
-				task_queue="llm_task_queue"
-			),
-			workflow.execute_activity(
-				LLMActivities.add_chunk_summary,
-				args=[chunk],
-				task_queue="llm_task_queue"
-			),
-			workflow.execute_activity(
-				LLMActivities.add_chunk_qas,
-				args=[chunk],
-				task_queue="llm_task_queue"
+				task_queue=OLLAMA_GENERATE_TASK_QUEUE,
+				start_to_close_timeout=LLM_ACTIVITY_TIMEOUT
 			)
 		]
+		if options.enrichment_mode == "combined":
+			# summary and QAs from a single LLM call
+			tasks.append(
+				workflow.execute_activity(
+					LLMActivities.add_chunk_enrichment,
+					args=[chunk],
+					task_queue=OLLAMA_GENERATE_TASK_QUEUE,
+					start_to_close_timeout=LLM_ACTIVITY_TIMEOUT
+				)
+			)
+		else:
+			tasks.extend([
+				workflow.execute_activity(
+					LLMActivities.add_chunk_summary,
+					args=[chunk],
+					task_queue=OLLAMA_GENERATE_TASK_QUEUE,
+					start_to_close_timeout=LLM_ACTIVITY_TIMEOUT
+				),
+				workflow.execute_activity(
+					LLMActivities.add_chunk_qas,
+					args=[chunk],
+					task_queue=OLLAMA_GENERATE_TASK_QUEUE,
+					start_to_close_timeout=LLM_ACTIVITY_TIMEOUT
+				)
+			])
 		results = await asyncio.gather(*tasks)
 
 		# Merge the results back into the chunk
@@ -58,10 +83,11 @@ class GenerateSyntheticDataForChunksWorkflow:
 
 	@staticmethod
 	def merge_chunk(original: Chunk, updated: Chunk) -> Chunk:
-		if hasattr(updated, 'content_with_context'):
+		# every activity returns a full Chunk, only take over the attributes it generated
+		if updated.content_with_context is not None:
 			original.content_with_context = updated.content_with_context
-		if hasattr(updated, 'summary'):
+		if updated.summary is not None:
 			original.summary = updated.summary
-		if hasattr(updated, 'qas'):
+		if updated.qas is not None:
 			original.qas = updated.qas
-		return original
\ No newline at end of file
+		return original
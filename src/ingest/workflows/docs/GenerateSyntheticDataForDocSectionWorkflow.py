@@ -4,19 +4,22 @@ from typing import List
 from temporalio import workflow
 
 from ingest.workflows.docs.GenerateSyntheticDataForChunksWorkflow import \
-	GenerateSyntheticDataForChunksWorkflow
+	GenerateSyntheticDataForChunksWorkflow, LLM_ACTIVITY_TIMEOUT
 from shared.activities.llm_activities import LLMActivities
-from shared.models.base import DocSection
+from shared.const import OLLAMA_GENERATE_TASK_QUEUE
+from shared.models.base import DocSection, IngestOptions
 
 
 @workflow.defn
 class GenerateSyntheticDataForDocSectionWorkflow:
 	@workflow.run
 	async def run(self, doc_section: DocSection,
-	              title_breadcrumbs: List[str]) -> DocSection:
+	              title_breadcrumbs: List[str],
+	              options: IngestOptions = None) -> DocSection:
 		workflow.logger.info(
 			f"Starting GenerateSyntheticDataForDocSectionWorkflow for {doc_section.title}")
 
+		options = options or IngestOptions()
 		context = {
 			"title_breadcrumbs": title_breadcrumbs,
 			"title": doc_section.title
@@ -26,23 +29,40 @@ class GenerateSyntheticDataForDocSectionWorkflow:
 			workflow.execute_activity(
 				LLMActivities.add_context_to_doc_section,
 				args=[doc_section, context],
-				task_queue="llm_task_queue"
-			),
-			workflow.execute_activity(
-				LLMActivities.add_doc_section_summary,
-				args=[doc_section],
-				task_queue="llm_task_queue"
-			),
-			workflow.execute_activity(
-				LLMActivities.add_doc_section_qas,
-				args=[doc_section],
-				task_queue="llm_task_queue"
+				task_queue=OLLAMA_GENERATE_TASK_QUEUE,
+				start_to_close_timeout=LLM_ACTIVITY_TIMEOUT
 			)
 		]
+		if options.enrichment_mode == "combined":
+			# summary and QAs from a single LLM call
+			doc_section_tasks.append(
+				workflow.execute_activity(
+					LLMActivities.add_doc_section_enrichment,
+					args=[doc_section],
+					task_queue=OLLAMA_GENERATE_TASK_QUEUE,
+					start_to_close_timeout=LLM_ACTIVITY_TIMEOUT
+				)
+			)
+		else:
+			doc_section_tasks.extend([
+				workflow.execute_activity(
+					LLMActivities.add_doc_section_summary,
+					args=[doc_section],
+					task_queue=OLLAMA_GENERATE_TASK_QUEUE,
+					start_to_close_timeout=LLM_ACTIVITY_TIMEOUT
+				),
+				workflow.execute_activity(
+					LLMActivities.add_doc_section_qas,
+					args=[doc_section],
+					task_queue=OLLAMA_GENERATE_TASK_QUEUE,
+					start_to_close_timeout=LLM_ACTIVITY_TIMEOUT
+				)
+			])
 
 		chunk_task = workflow.execute_child_workflow(
 			GenerateSyntheticDataForChunksWorkflow.run,
-			args=[doc_section.chunks, title_breadcrumbs, doc_section.content]
+			args=[doc_section.chunks, title_breadcrumbs, doc_section.content,
+			      options]
 		)
 
 		results = await asyncio.gather(*doc_section_tasks, chunk_task)
@@ -60,10 +80,11 @@ class GenerateSyntheticDataForDocSectionWorkflow:
 
 	@staticmethod
 	def merge_doc_section(original: DocSection, updated: DocSection) -> DocSection:
-		if hasattr(updated, 'content_with_context'):
+		# every activity returns a full DocSection, only take over the attributes it generated
+		if getattr(updated, 'content_with_context', None) is not None:
 			original.content_with_context = updated.content_with_context
-		if hasattr(updated, 'summary'):
+		if updated.summary is not None:
 			original.summary = updated.summary
-		if hasattr(updated, 'qas'):
+		if updated.qas is not None:
 			original.qas = updated.qas
-		return original
\ No newline at end of file
+		return original
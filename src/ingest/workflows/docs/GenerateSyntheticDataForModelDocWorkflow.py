@@ -1,27 +1,46 @@
 import asyncio
-from typing import List
+from typing import List, Optional
 
 from temporalio import workflow
 
 from ingest.workflows.docs.GenerateSyntheticDataForDocSectionWorkflow import \
 	GenerateSyntheticDataForDocSectionWorkflow
-from shared.models.base import DocSection, ModelDoc
+from shared.models.base import DocSection, IngestOptions, ModelDoc
 
 
 @workflow.defn
 class GenerateSyntheticDataForModelDocWorkflow:
 	@workflow.run
-	async def run(self, model_doc: ModelDoc) -> ModelDoc:
+	async def run(self, model_doc: ModelDoc,
+	              options: IngestOptions = None,
+	              doc_section_ids: Optional[List[str]] = None) -> ModelDoc:
+		"""
+		@param doc_section_ids: only process these doc sections (all if None),
+		                        the others are returned unchanged
+		"""
 		workflow.logger.info(
 			"Starting GenerateSyntheticDataForModelDocWorkflow")
 
-		# process all doc sections
+		options = options or IngestOptions()
+
+		# process all (selected) doc sections
 		doc_sections_map = self.create_doc_sections_map(model_doc.doc_sections)
-		doc_section_tasks = [self.process_doc_section(section, doc_sections_map)
-		                     for section in model_doc.doc_sections]
-		updated_doc_sections = await asyncio.gather(*doc_section_tasks)
+		selected_doc_sections = [
+			section for section in model_doc.doc_sections
+			if doc_section_ids is None or section.id in doc_section_ids
+		]
+		doc_section_tasks = [self.process_doc_section(section, doc_sections_map,
+		                                              options)
+		                     for section in selected_doc_sections]
+		updated_doc_sections = {
+			section.id: section
+			for section in await asyncio.gather(*doc_section_tasks)
+		}
 
-		model_doc.doc_sections = updated_doc_sections
+		model_doc.doc_sections = [
+			updated_doc_sections.get(section.id, section)
+			for section in model_doc.doc_sections
+		]
 
 		workflow.logger.info(
 			"GenerateSyntheticDataForModelDocWorkflow completed.")
@@ -44,13 +63,14 @@ class GenerateSyntheticDataForModelDocWorkflow:
 
 	@staticmethod
 	async def process_doc_section(doc_section: DocSection,
-	                              doc_sections_map: dict) -> DocSection:
+	                              doc_sections_map: dict,
+	                              options: IngestOptions) -> DocSection:
 		title_breadcrumbs = GenerateSyntheticDataForModelDocWorkflow.get_title_breadcrumbs(
 			doc_section, doc_sections_map)
 
 		updated_doc_section = await workflow.execute_child_workflow(
 			GenerateSyntheticDataForDocSectionWorkflow.run,
-			args=[doc_section, title_breadcrumbs]
+			args=[doc_section, title_breadcrumbs, options]
 		)
 
 		return updated_doc_section
\ No newline at end of file
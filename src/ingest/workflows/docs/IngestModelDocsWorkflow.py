@@ -1,18 +1,28 @@
 from datetime import timedelta
-from typing import List
+from typing import List, Optional
 
 from temporalio import workflow
+from temporalio.common import RetryPolicy
+from temporalio.exceptions import ActivityError
 from temporalio.workflow import ChildWorkflowCancellationType, ParentClosePolicy
 
 from ingest.workflows.docs.ComputeAndUpsertModelDocEmbeddingsWorkflow import \
-	ComputeAndUpsertModelDocEmbeddingsWorkflow
+	ComputeAndUpsertModelDocEmbeddingsWorkflow, DOC_SECTION_COLLECTIONS
 from ingest.workflows.docs.GenerateSyntheticDataForModelDocWorkflow import \
 	GenerateSyntheticDataForModelDocWorkflow
 from ingest.workflows.docs.activities import ModelDocsActivities
 from shared.activities.minio_activities import MinioActivities
 from shared.activities.postgres_activities import PostgresActivities
-from shared.const import MINIO_TASK_QUEUE, POSTGRES_TASK_QUEUE
-from shared.models.base import DocSection, IngestModelInput, ModelDoc
+from shared.activities.vector_store_activities import VectorStoreActivities
+from shared.const import MINIO_TASK_QUEUE, MODEL_DOC_POINTS_COLLECTION, \
+	POSTGRES_TASK_QUEUE, RETRIEVAL_TASK_QUEUE, VECTOR_STORE_TASK_QUEUE
+from shared.models.base import DocSection, IngestModelInput, IngestOptions, \
+	ModelDoc, ModelDocDiff
+
+# PDF conversion timeout: model loading plus a generous per page time (pages
+# are converted in parallel, so this is a bound for a single core)
+CONVERSION_BASE_TIMEOUT = timedelta(minutes=5)
+CONVERSION_TIMEOUT_PER_PAGE = timedelta(seconds=30)
 
 
 @workflow.defn
@@ -26,10 +36,16 @@ class IngestModelDocsWorkflow:
 	async def run(self, input: IngestModelInput) -> None:
 		workflow.logger.info("Starting IngestModelDocsWorkflow")
 
+		page_count = await workflow.execute_activity(
+			ModelDocsActivities.count_pdf_pages,
+			args=[input.original_file_path],
+			schedule_to_close_timeout=timedelta(seconds=30)
+		)
 		markdown_local_path, image_folder_local_path = await workflow.execute_activity(
 			ModelDocsActivities.convert_pdf_to_markdown,
 			args=[input.original_file_path],
-            schedule_to_close_timeout=timedelta(seconds=10)
+			start_to_close_timeout=CONVERSION_BASE_TIMEOUT + page_count * CONVERSION_TIMEOUT_PER_PAGE,
+			heartbeat_timeout=timedelta(minutes=2)
 		)
 
 		# backup markdown file
@@ -37,33 +53,50 @@ class IngestModelDocsWorkflow:
 			MinioActivities.upload_file,
 			args=[markdown_local_path, f"{input.model_slug}/docs/model_docs.md"],
 			task_queue=MINIO_TASK_QUEUE,
-			schedule_to_close_timeout=timedelta(seconds=10)
+			schedule_to_close_timeout=timedelta(minutes=2)
 		)
 		# backup images
 		await workflow.execute_activity(
 			MinioActivities.upload_folder,
 			args=[image_folder_local_path, f"{input.model_slug}/docs/images"],
 			task_queue=MINIO_TASK_QUEUE,
-			schedule_to_close_timeout=timedelta(seconds=10)
+			start_to_close_timeout=timedelta(minutes=10),
+			heartbeat_timeout=timedelta(minutes=1)
 		)
 
 		# split local markdown file into DocSections
+		model_doc_id = f"{input.model_id}_model_doc"
 		doc_sections: List[DocSection] = await workflow.execute_activity(
 			ModelDocsActivities.split_markdown,
-			args=[markdown_local_path],
+			args=[markdown_local_path, model_doc_id],
             schedule_to_close_timeout=timedelta(seconds=10)
 		)
 
 		model_doc = ModelDoc(
-			id=f"{input.model_id}_model_doc",
+			id=model_doc_id,
 			model_id=input.model_id,
 			doc_sections = doc_sections
 		)
 
+		# compare with the persisted ModelDoc to only process the delta
+		diff: Optional[ModelDocDiff] = None
+		if input.options.incremental:
+			diff = await workflow.execute_activity(
+				PostgresActivities.diff_model_doc,
+				task_queue=POSTGRES_TASK_QUEUE,
+				args=[model_doc],
+				schedule_to_close_timeout=timedelta(seconds=30)
+			)
+			if diff.is_empty():
+				workflow.logger.info(
+					"IngestModelDocsWorkflow completed, ModelDoc is unchanged.")
+				return
+
 		# Generate synthetic data with LLM for ModelDoc
 		model_doc_with_synthetic_data: ModelDoc = await workflow.execute_child_workflow(
 			GenerateSyntheticDataForModelDocWorkflow.run,
-			args=[model_doc],
+			args=[model_doc, input.options,
+			      diff.changed_doc_section_ids if diff else None],
 			id=f"doc-add-synth-data-{input.model_slug}",
 			# retry_policy=RetryPolicy(
 			#     initial_interval=timedelta(seconds=7),
@@ -74,18 +107,26 @@ class IngestModelDocsWorkflow:
 			cancellation_type=ChildWorkflowCancellationType.WAIT_CANCELLATION_COMPLETED,
 		)
 
+		if diff:
+			# only save and embed new and changed DocSections
+			model_doc_with_synthetic_data.doc_sections = [
+				doc_section for doc_section in model_doc_with_synthetic_data.doc_sections
+				if doc_section.id in diff.changed_doc_section_ids
+			]
+			await self.delete_stale_data(input.model_id, diff, input.options)
+
 		# save ModelDoc to models_db
 		await workflow.execute_activity(
 			PostgresActivities.save_model_doc,
 			task_queue=POSTGRES_TASK_QUEUE,
 			args=[model_doc_with_synthetic_data],
-            schedule_to_close_timeout=timedelta(seconds=10)
+			schedule_to_close_timeout=timedelta(seconds=90)
 		)
 
 		# compute and store all ModelDoc embeddings
 		await workflow.execute_child_workflow(
 			ComputeAndUpsertModelDocEmbeddingsWorkflow.run,
-			args=[model_doc_with_synthetic_data],
+			args=[model_doc_with_synthetic_data, input.options],
 			id=f"doc-embeddings-{input.model_slug}",
 			# retry_policy=RetryPolicy(
 			#     initial_interval=timedelta(seconds=7),
@@ -96,6 +137,55 @@ class IngestModelDocsWorkflow:
 			cancellation_type=ChildWorkflowCancellationType.WAIT_CANCELLATION_COMPLETED,
 		)
 
+		# cached search results may miss the new points. Called by name, the
+		# retrieval activities (and their dependencies) are not part of ingest
+		try:
+			await workflow.execute_activity(
+				"invalidate_model_cache",
+				task_queue=RETRIEVAL_TASK_QUEUE,
+				args=[input.model_id],
+				result_type=int,
+				schedule_to_close_timeout=timedelta(seconds=30),
+				retry_policy=RetryPolicy(maximum_attempts=3)
+			)
+		except ActivityError as e:
+			# the cached results expire after their TTL anyway
+			workflow.logger.warning(
+				f"Could not invalidate the retrieval cache: {str(e)}")
+
 		workflow.logger.info(
 			f"IngestModelDocsWorkflow completed."
-		)
\ No newline at end of file
+		)
+
+	@staticmethod
+	async def delete_stale_data(model_id: str, diff: ModelDocDiff,
+	                            options: IngestOptions) -> None:
+		"""
+		Removes the persisted rows and vector points of stale and changed
+		DocSections before the changed ones are saved and embedded again.
+		"""
+		await workflow.execute_activity(
+			PostgresActivities.delete_stale_doc_sections,
+			task_queue=POSTGRES_TASK_QUEUE,
+			args=[diff],
+			schedule_to_close_timeout=timedelta(seconds=30)
+		)
+
+		single_collection = options.collection_layout == "single"
+		await workflow.execute_activity(
+			VectorStoreActivities.delete_points_by_payload,
+			task_queue=VECTOR_STORE_TASK_QUEUE,
+			args=[[MODEL_DOC_POINTS_COLLECTION] if single_collection else DOC_SECTION_COLLECTIONS,
+			      "doc_section_id",
+			      diff.changed_doc_section_ids + diff.stale_doc_section_ids],
+			schedule_to_close_timeout=timedelta(minutes=1)
+		)
+		# the ModelDoc summary covers the whole document
+		await workflow.execute_activity(
+			VectorStoreActivities.delete_points_by_payload,
+			task_queue=VECTOR_STORE_TASK_QUEUE,
+			args=[[MODEL_DOC_POINTS_COLLECTION] if single_collection else ["ModelDocSummaryChunks"],
+			      "model_id", [model_id],
+			      ["ModelDocSummaryChunks"] if single_collection else None],
+			schedule_to_close_timeout=timedelta(minutes=1)
+		)
@@ -1,24 +1,126 @@
-from typing import List, Tuple
+import os
+from typing import List, Optional, Tuple
 
-from temporalio import activity
+from temporalio import activity, workflow
 
 from shared.models.base import DocSection
+from shared.utils.hashing import sha256_file, sha256_hex, stable_id
+
+with workflow.unsafe.imports_passed_through():
+	from ingest.workflows.docs.conversion_cache import ConversionCache
+	from ingest.workflows.docs.pdf_conversion import IMAGE_FOLDER_NAME, \
+		MARKDOWN_FILE_NAME, PageParallelPdfConverter, pdf_page_count
+
+
+def get_title_breadcrumbs(doc_section: DocSection) -> List[str]:
+	breadcrumbs = [doc_section.title]
+	current_section = doc_section
+	while current_section.parent:
+		current_section = current_section.parent
+		breadcrumbs.insert(0, current_section.title)
+	return breadcrumbs
+
+
+def assign_ids_and_content_hashes(doc_sections: List[DocSection],
+                                  model_doc_id: str) -> List[DocSection]:
+	"""
+	Gives DocSections and Chunks ids that stay the same across ingests of the
+	same document (derived from the title breadcrumbs and the position) and
+	content hashes that change whenever their content changes. Together they
+	let a re-ingest find out which DocSections actually changed.
+	"""
+	id_map = {}
+	occurrences = {}
+	for doc_section in doc_sections:
+		path = " > ".join(get_title_breadcrumbs(doc_section))
+		occurrence = occurrences.get(path, 0)
+		occurrences[path] = occurrence + 1
+
+		new_id = stable_id(model_doc_id, path, str(occurrence))
+		id_map[doc_section.id] = new_id
+		doc_section.id = new_id
+		doc_section.content_hash = sha256_hex(str(doc_section.level),
+		                                      doc_section.title,
+		                                      doc_section.content)
+
+		for chunk_index, chunk in enumerate(doc_section.chunks):
+			chunk.id = stable_id(new_id, str(chunk_index))
+			chunk.doc_section_id = new_id
+			chunk.content_hash = sha256_hex(chunk.content)
+
+	for doc_section in doc_sections:
+		if doc_section.parent:
+			doc_section.parent.id = id_map.get(doc_section.parent.id,
+			                                   doc_section.parent.id)
+	return doc_sections
 
 
 class ModelDocsActivities:
+	def __init__(self, local_fs_root: Optional[str] = None,
+	             output_folder: str = "converted_docs",
+	             pdf_converter: Optional[PageParallelPdfConverter] = None,
+	             conversion_cache: Optional[ConversionCache] = None):
+		"""
+		Args:
+			local_fs_root: Root of relative local paths (shared with the MinIO worker)
+			output_folder: Folder below local_fs_root the converted documents are written to
+			pdf_converter: Converter of PDFs to markdown, page-parallel by default
+			conversion_cache: Cache of converted documents by PDF hash, None to always convert
+		"""
+		self.local_fs_root = local_fs_root
+		self.output_folder = output_folder
+		self.pdf_converter = pdf_converter or PageParallelPdfConverter()
+		self.conversion_cache = conversion_cache
+
+	def _local_path(self, path: str) -> str:
+		return os.path.join(self.local_fs_root or "", path)
+
+	@activity.defn
+	def count_pdf_pages(self, docs_file_path: str) -> int:
+		return pdf_page_count(self._local_path(docs_file_path))
+
 	@activity.defn
 	def convert_pdf_to_markdown(self,
 	                          docs_file_path: str) -> Tuple[str, str]:
-		activity.logger.warning(f"Starting activity convert_pdf_to_markdown {docs_file_path}")
+		"""
+		Converts the PDF to markdown and images, heartbeating the number of
+		converted pages, unless the conversion cache has the same PDF
+		converted by the same converter version. The returned markdown file
+		and image folder paths are relative to local_fs_root like `docs_file_path`.
+		"""
+		activity.logger.info(f"Starting activity convert_pdf_to_markdown {docs_file_path}")
+		pdf_path = self._local_path(docs_file_path)
+		name = os.path.splitext(os.path.basename(docs_file_path))[0]
+		pdf_sha256 = sha256_file(pdf_path)
+		# keyed by content, parts left by a failed conversion of a replaced PDF are not reused
+		output_folder = os.path.join(self.output_folder, f"{name}-{pdf_sha256[:12]}")
+		result = os.path.join(output_folder, MARKDOWN_FILE_NAME), os.path.join(output_folder, IMAGE_FOLDER_NAME)
+
+		if self.conversion_cache and self.conversion_cache.get(pdf_sha256, self._local_path(output_folder)):
+			activity.logger.info(f"Conversion of {docs_file_path} ({pdf_sha256}) found in the cache.")
+			return result
+
+		_, _, stats = self.pdf_converter.convert(
+			pdf_path, self._local_path(output_folder),
+			lambda converted_pages, pages: activity.heartbeat(converted_pages, pages))
+		activity.logger.info(
+			f"Converted {stats['pages']} pages ({stats['ocr_pages']} with OCR) of {docs_file_path} "
+			f"in {stats['page_ranges']} page ranges.")
+		if self.conversion_cache:
+			self.conversion_cache.put(pdf_sha256, self._local_path(output_folder))
+		return result
 
-		return "markdown_local_path", "image_folder_local_path"
+	def close(self) -> None:
+		self.pdf_converter.close()
 
 	@activity.defn
-	def split_markdown(self, markdown_local_path: str) -> List[DocSection]:
+	def split_markdown(self, markdown_local_path: str,
+	                   model_doc_id: str) -> List[DocSection]:
 		"""
-		Creates the main Model object from ModelMetadata
-		@returns model_id
+		Splits the markdown file into DocSections (with Chunks) that carry
+		stable ids and content hashes (see assign_ids_and_content_hashes)
 		"""
 		activity.logger.warning(
-			"Starting activity create_model_from_metadata")
-		return []
\ No newline at end of file
+			"Starting activity split_markdown")
+		doc_sections: List[DocSection] = []
+		return assign_ids_and_content_hashes(doc_sections, model_doc_id)
@@ -0,0 +1,114 @@
+import io
+import os
+import shutil
+import tarfile
+import threading
+from importlib import metadata
+from typing import List, Optional, Tuple
+
+from shared.blob_store import BlobStore
+
+# bump when the conversion output changes without a marker upgrade
+CONVERSION_PIPELINE_VERSION = "1"
+
+
+def converter_version() -> str:
+	"""Version of the PDF conversion, part of the cache key so upgrades miss the cache."""
+	try:
+		marker_version = metadata.version("marker-pdf")
+	except metadata.PackageNotFoundError:
+		marker_version = "unknown"
+	return f"marker-{marker_version}-pipeline-{CONVERSION_PIPELINE_VERSION}"
+
+
+def _folder_size(path: str) -> int:
+	return sum(os.path.getsize(os.path.join(dirpath, filename))
+	           for dirpath, _, filenames in os.walk(path) for filename in filenames)
+
+
+def _tar_folder(path: str) -> bytes:
+	buffer = io.BytesIO()
+	# images are compressed already
+	with tarfile.open(fileobj=buffer, mode="w") as tar:
+		tar.add(path, arcname=".")
+	return buffer.getvalue()
+
+
+class ConversionCache:
+	"""
+	Converted documents (markdown file and image folder) keyed by the SHA-256
+	of the PDF and the converter version. Entries are kept in a local folder,
+	evicting the least recently used ones beyond `max_bytes`, and backed by
+	a blob store (MinIO) shared by all ingest workers.
+	"""
+
+	def __init__(self, root: str, max_bytes: int, blob_store: Optional[BlobStore] = None,
+	             version: Optional[str] = None):
+		self.root = root
+		self.max_bytes = max_bytes
+		self.blob_store = blob_store
+		self.version = version or converter_version()
+
+	def _entry_path(self, pdf_sha256: str) -> str:
+		return os.path.join(self.root, self.version, pdf_sha256)
+
+	def _blob_key(self, pdf_sha256: str) -> str:
+		return f"conversions/{self.version}/{pdf_sha256[:2]}/{pdf_sha256}.tar"
+
+	def _store_entry(self, pdf_sha256: str, fill) -> None:
+		"""Fills a temporary folder with `fill(path)` and moves it in place as the entry."""
+		entry_path = self._entry_path(pdf_sha256)
+		tmp_path = f"{entry_path}.{os.getpid()}-{threading.get_ident()}.tmp"
+		shutil.rmtree(tmp_path, ignore_errors=True)
+		fill(tmp_path)
+		try:
+			os.rename(tmp_path, entry_path)
+		except OSError:
+			# stored concurrently by another activity
+			shutil.rmtree(tmp_path, ignore_errors=True)
+
+	def get(self, pdf_sha256: str, output_folder: str) -> bool:
+		"""Copies the cached conversion to `output_folder`, returns if there was one."""
+		entry_path = self._entry_path(pdf_sha256)
+		fetched = False
+		if not os.path.isdir(entry_path):
+			if self.blob_store is None or not self.blob_store.exists(self._blob_key(pdf_sha256)):
+				return False
+			data = self.blob_store.get(self._blob_key(pdf_sha256))
+
+			def extract(path: str):
+				with tarfile.open(fileobj=io.BytesIO(data), mode="r") as tar:
+					tar.extractall(path, filter="data")
+			self._store_entry(pdf_sha256, extract)
+			fetched = True
+		# the modification time orders entries for eviction
+		os.utime(entry_path)
+		shutil.copytree(entry_path, output_folder, dirs_exist_ok=True)
+		if fetched:
+			self.evict()
+		return True
+
+	def put(self, pdf_sha256: str, output_folder: str) -> None:
+		"""Caches the conversion in `output_folder` locally and in the blob store."""
+		self._store_entry(pdf_sha256, lambda path: shutil.copytree(output_folder, path))
+		if self.blob_store is not None:
+			self.blob_store.put(self._blob_key(pdf_sha256), _tar_folder(output_folder))
+		self.evict()
+
+	def evict(self) -> None:
+		"""Removes the least recently used entries (of any version) beyond max_bytes."""
+		entries: List[Tuple[float, int, str]] = []
+		if not os.path.isdir(self.root):
+			return
+		for version in os.listdir(self.root):
+			version_path = os.path.join(self.root, version)
+			for name in os.listdir(version_path):
+				path = os.path.join(version_path, name)
+				if not name.endswith(".tmp"):
+					entries.append((os.path.getmtime(path), _folder_size(path), path))
+		total = sum(size for _, size, _ in entries)
+		for _, size, path in sorted(entries):
+			if total <= self.max_bytes:
+				break
+			shutil.rmtree(path, ignore_errors=True)
+			total -= size
@@ -0,0 +1,184 @@
+import multiprocessing
+import os
+import shutil
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Dict, List, Optional, Tuple
+
+# pages converted by one task of the process pool
+DEFAULT_PAGES_PER_TASK = 4
+# pool processes, each one loads its own copy of the marker models (several GB)
+DEFAULT_MAX_WORKERS = 2
+# seconds between progress reports while no page range finishes
+PROGRESS_INTERVAL = 30
+MARKDOWN_FILE_NAME = "document.md"
+IMAGE_FOLDER_NAME = "images"
+
+# marker models, loaded once per pool process
+_artifacts = None
+
+
+def _load_models():
+	global _artifacts
+	from marker.models import create_model_dict
+	_artifacts = create_model_dict()
+
+
+def pdf_page_count(pdf_path: str) -> int:
+	import pypdfium2
+
+	pdf = pypdfium2.PdfDocument(pdf_path)
+	try:
+		return len(pdf)
+	finally:
+		pdf.close()
+
+
+def text_layer_pages(pdf_path: str) -> List[bool]:
+	"""Per page if it has a text layer, pages without one need OCR."""
+	import pypdfium2
+
+	pdf = pypdfium2.PdfDocument(pdf_path)
+	try:
+		has_text = []
+		for page in pdf:
+			text_page = page.get_textpage()
+			has_text.append(text_page.count_chars() > 0)
+			text_page.close()
+			page.close()
+		return has_text
+	finally:
+		pdf.close()
+
+
+def page_ranges(has_text: List[bool], pages_per_task: int) -> List[Tuple[int, int, bool]]:
+	"""
+	Splits the pages into (start, end, ocr) ranges of at most
+	`pages_per_task` pages that either all have a text layer or all need OCR.
+	"""
+	ranges = []
+	start = 0
+	for page in range(1, len(has_text) + 1):
+		if page == len(has_text) or page - start == pages_per_task \
+				or has_text[page] != has_text[start]:
+			ranges.append((start, page, not has_text[start]))
+			start = page
+	return ranges
+
+
+def convert_page_range(pdf_path: str, start: int, end: int, ocr: bool, image_folder: str) -> str:
+	"""
+	Converts pages [start, end) to markdown with marker in a pool process,
+	OCRing them only if `ocr` is set. Extracted images are saved to
+	`image_folder` and linked relative to the markdown file.
+	"""
+	from marker.converters.pdf import PdfConverter
+	from marker.output import text_from_rendered
+
+	if _artifacts is None:
+		_load_models()
+	converter = PdfConverter(artifact_dict=_artifacts, config={
+		"page_range": list(range(start, end)),
+		"force_ocr": ocr,
+		"output_format": "markdown",
+	})
+	markdown, _, images = text_from_rendered(converter(pdf_path))
+	for name, image in images.items():
+		image.save(os.path.join(image_folder, name))
+		markdown = markdown.replace(f"]({name})", f"]({IMAGE_FOLDER_NAME}/{name})")
+	return markdown
+
+
+def _write_text(path: str, text: str) -> None:
+	tmp_path = f"{path}.tmp"
+	with open(tmp_path, "w", encoding="utf-8") as f:
+		f.write(text)
+	os.replace(tmp_path, path)
+
+
+class PageParallelPdfConverter:
+	"""
+	Converts PDFs to markdown by splitting them into page ranges converted in
+	parallel on a process pool (CPU bound, so threads would not help). The
+	markdown of finished ranges is kept in the output folder until the whole
+	document is stitched, so a retried conversion only converts the rest.
+	"""
+
+	def __init__(self, max_workers: Optional[int] = None,
+	             pages_per_task: int = DEFAULT_PAGES_PER_TASK):
+		self.max_workers = max_workers or DEFAULT_MAX_WORKERS
+		self.pages_per_task = pages_per_task
+		self.pool = None
+
+	def _pool(self) -> ProcessPoolExecutor:
+		if self.pool is None:
+			# spawn, forking a process that loaded torch models is unsafe
+			self.pool = ProcessPoolExecutor(
+				max_workers=self.max_workers,
+				mp_context=multiprocessing.get_context("spawn"),
+				initializer=_load_models)
+		return self.pool
+
+	def convert(self, pdf_path: str, output_folder: str,
+	            on_progress: Callable[[int, int], None]) -> Tuple[str, str, Dict[str, int]]:
+		"""
+		Converts `pdf_path` into `<output_folder>/document.md` and images in
+		`<output_folder>/images`, calling `on_progress(converted pages, pages)`
+		whenever a range finishes and at least every PROGRESS_INTERVAL seconds.
+
+		Returns:
+			Tuple[str, str, Dict[str, int]]: Markdown path, image folder and
+				the number of pages, OCRed pages and page ranges
+		"""
+		has_text = text_layer_pages(pdf_path)
+		ranges = page_ranges(has_text, self.pages_per_task)
+		image_folder = os.path.join(output_folder, IMAGE_FOLDER_NAME)
+		parts_folder = os.path.join(output_folder, "parts")
+		os.makedirs(image_folder, exist_ok=True)
+		os.makedirs(parts_folder, exist_ok=True)
+
+		parts: Dict[int, str] = {}
+		futures = {}
+		converted_pages = 0
+		for start, end, ocr in ranges:
+			part_path = os.path.join(parts_folder, f"{start:05d}-{end:05d}.md")
+			if os.path.exists(part_path):
+				with open(part_path, "r", encoding="utf-8") as f:
+					parts[start] = f.read()
+				converted_pages += end - start
+				continue
+			future = self._pool().submit(convert_page_range, pdf_path, start, end, ocr, image_folder)
+			futures[future] = (start, end, part_path)
+		on_progress(converted_pages, len(has_text))
+
+		pending = set(futures)
+		try:
+			while pending:
+				done, pending = wait(pending, timeout=PROGRESS_INTERVAL, return_when=FIRST_COMPLETED)
+				for future in done:
+					start, end, part_path = futures[future]
+					parts[start] = future.result()
+					_write_text(part_path, parts[start])
+					converted_pages += end - start
+				on_progress(converted_pages, len(has_text))
+		except BrokenProcessPool:
+			# a pool process died (e.g. out of memory), start a new pool next time
+			self.pool = None
+			raise
+		finally:
+			for future in pending:
+				future.cancel()
+
+		markdown_path = os.path.join(output_folder, MARKDOWN_FILE_NAME)
+		_write_text(markdown_path, "\n\n".join(parts[start] for start in sorted(parts)))
+		shutil.rmtree(parts_folder)
+		return markdown_path, image_folder, {
+			"pages": len(has_text),
+			"ocr_pages": has_text.count(False),
+			"page_ranges": len(ranges),
+		}
+
+	def close(self) -> None:
+		if self.pool is not None:
+			self.pool.shutdown(cancel_futures=True)
+			self.pool = None
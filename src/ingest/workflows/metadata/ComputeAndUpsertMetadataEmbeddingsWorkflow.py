@@ -1,4 +1,3 @@
-import asyncio
 from datetime import timedelta
 from typing import List
 
@@ -7,7 +6,8 @@ from temporalio import workflow
 from shared.const import OLLAMA_EMBEDDING_TASK_QUEUE, VECTOR_STORE_TASK_QUEUE
 from shared.models.model_metadata import Category, ModelMetadata, Person, \
 	ProgrammingLanguage, Tag
-from shared.models.vector import VectorPoint
+from shared.models.vector import PendingVectorPoint, VectorPoint
+from shared.utils.hashing import point_content_hash, vector_point_id
 
 with workflow.unsafe.imports_passed_through():
 	from shared.activities.llm_activities import LLMActivities
@@ -38,13 +38,12 @@ class ComputeAndUpsertMetadataEmbeddingsWorkflow:
 		tag_names = [tag.name for tag in tags] if tags else []
 		return f"{desc}: {', '.join(tag_names)}"
 
-	async def _compute_embedding(self, text: str):
+	async def _compute_embeddings(self, texts: List[str]):
 		return await workflow.execute_activity_method(
-			LLMActivities.compute_embedding,
+			LLMActivities.compute_embeddings,
 			task_queue=OLLAMA_EMBEDDING_TASK_QUEUE,
-			args=[text],
-			heartbeat_timeout=timedelta(seconds=2),
-            schedule_to_close_timeout=timedelta(seconds=10)
+			args=[texts],
+			start_to_close_timeout=timedelta(minutes=2)
 		)
 
 	async def _upsert_vector_points(self, collection_name: str, points: list):
@@ -53,13 +52,13 @@ class ComputeAndUpsertMetadataEmbeddingsWorkflow:
 			VectorStoreActivities.upsert_metadata_vector_points,
 			args=[collection_name, points],
 			task_queue=VECTOR_STORE_TASK_QUEUE,
-			heartbeat_timeout=timedelta(seconds=2),
-            schedule_to_close_timeout=timedelta(seconds=10)
+			heartbeat_timeout=timedelta(seconds=30),
+            schedule_to_close_timeout=timedelta(minutes=10)
 		)
 
 	@workflow.run
 	async def run(self, model_id: str, model_metadata: ModelMetadata):
-		embedding_tasks = []
+		embedding_texts = []
 		field_names = []
 
 		special_handlers = {
@@ -69,7 +68,7 @@ class ComputeAndUpsertMetadataEmbeddingsWorkflow:
 			'tags': self._handle_tags
 		}
 
-		# Generate embedding tasks for each field
+		# Generate embedding texts for each field
 		for field_name, field_value in model_metadata.__dict__.items():
 			if field_value is not None:
 				field_desc = model_metadata.__class__.__dataclass_fields__[
@@ -81,28 +80,51 @@ class ComputeAndUpsertMetadataEmbeddingsWorkflow:
 				else:
 					embedding_text = f"{field_desc}: {str(field_value)}"
 
-				# Create coroutine instead of task
-				embedding_tasks.append(self._compute_embedding(embedding_text))
+				embedding_texts.append(embedding_text)
 				field_names.append(field_name)
 
-		# Await all embedding computations in parallel
-		vectors = await asyncio.gather(*embedding_tasks)
+		collection_name = "model_metadata_embeddings"
+		embedding_model = await workflow.execute_activity_method(
+			LLMActivities.get_embedding_model,
+			task_queue=OLLAMA_EMBEDDING_TASK_QUEUE,
+			start_to_close_timeout=timedelta(seconds=10)
+		)
+		pending_points = []
+		for field_name, embedding_text in zip(field_names, embedding_texts):
+			payload = {"model_id": model_id, "field_name": field_name}
+			pending_points.append(PendingVectorPoint(
+				id=vector_point_id(collection_name, model_id, field_name),
+				payload={
+					**payload,
+					"content_hash": point_content_hash(embedding_model, embedding_text, payload)
+				},
+				text=embedding_text
+			))
+
+		# Skip fields whose text did not change since the last upsert
+		pending_points = await workflow.execute_activity_method(
+			VectorStoreActivities.filter_changed_vector_points,
+			args=[collection_name, pending_points],
+			task_queue=VECTOR_STORE_TASK_QUEUE,
+			schedule_to_close_timeout=timedelta(seconds=30)
+		)
+		if not pending_points:
+			workflow.logger.info(
+				"ComputeAndUpsertMetadataEmbeddingsWorkflow completed, metadata is unchanged.")
+			return
+
+		# Compute all field embeddings with a single batched activity
+		vectors = await self._compute_embeddings(
+			[point.text for point in pending_points])
 
 		# Create vector points from results
 		points = [
-			VectorPoint(
-				id=f"{model_id}_{field_name}",
-				vector=vector,
-				payload={
-					"model_id": model_id,
-					"field_name": field_name
-				}
-			)
-			for field_name, vector in zip(field_names, vectors)
+			VectorPoint(id=point.id, vector=vector, payload=point.payload)
+			for point, vector in zip(pending_points, vectors)
 		]
 
 		# Upsert all vector points
-		await self._upsert_vector_points("model_metadata_embeddings", points)
+		await self._upsert_vector_points(collection_name, points)
 
 		workflow.logger.info(
 			"ComputeAndUpsertMetadataEmbeddingsWorkflow completed.")
\ No newline at end of file
@@ -0,0 +1,33 @@
+from typing import Dict
+
+from temporalio import activity, workflow
+
+from shared.models.retrieval import RetrievalQuery, RetrievalResult
+
+with workflow.unsafe.imports_passed_through():
+    from retrieval.engine import RetrievalEngine
+
+
+class RetrievalActivities:
+    def __init__(self, engine: RetrievalEngine):
+        self.engine = engine
+
+    @activity.defn
+    async def retrieve(self, query: RetrievalQuery) -> RetrievalResult:
+        result = await self.engine.retrieve(query)
+        activity.logger.info(
+            f"Retrieved {len(result.passages)} passages, timings (ms): "
+            f"{ {stage: round(ms, 1) for stage, ms in result.timings_ms.items()} }, "
+            f"cache hits: {result.cache_hits}")
+        return result
+
+    @activity.defn
+    async def invalidate_model_cache(self, model_id: str) -> int:
+        invalidated = self.engine.invalidate_model(model_id)
+        activity.logger.info(
+            f"Invalidated {invalidated} cached search results for model {model_id}.")
+        return invalidated
+
+    @activity.defn
+    async def get_cache_stats(self) -> Dict[str, Dict[str, float]]:
+        return self.engine.cache_stats()
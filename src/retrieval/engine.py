@@ -0,0 +1,277 @@
+import asyncio
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from shared.cache.query_cache import QueryEmbeddingCache, SearchResultCache
+from shared.const import MODEL_DOC_POINTS_COLLECTION
+from shared.models.retrieval import Passage, RetrievalQuery, RetrievalResult
+from shared.utils.hashing import normalize_text, vector_point_id
+from shared.vector_store.base import SPARSE_VECTOR_NAME, SearchHit, VectorStore
+from shared.vector_store.sparse import SparseEncoder
+
+# collections searched when the query doesn't name any
+RETRIEVAL_COLLECTIONS = [
+    "Chunks",
+    "ChunkQuestions",
+    "DocSectionQuestions",
+    "DocSectionSummaryChunksLevel1",
+    "ModelDocSummaryChunks",
+]
+# collections also ranked by BM25 sparse vectors for exact term matches
+HYBRID_COLLECTIONS = ["Chunks"]
+# rank constant of reciprocal rank fusion, dampens the weight of the top ranks
+RRF_K = 60
+
+PassageKey = Tuple[str, str]
+
+
+def passage_key(kind: str, payload: Dict[str, Any]) -> PassageKey:
+    """(passage type, id) a point is deduplicated on: its chunk, else its DocSection, else its ModelDoc."""
+    if kind == "Chunks":
+        return "chunk", payload["source_id"]
+    if payload.get("chunk_id"):
+        return "chunk", payload["chunk_id"]
+    if payload.get("doc_section_id"):
+        return "doc_section", payload["doc_section_id"]
+    return "model_doc", payload["model_id"]
+
+
+def passage_text(payload: Dict[str, Any]) -> str:
+    for field_name in ("content", "summary", "answer", "question"):
+        if payload.get(field_name):
+            return payload[field_name]
+    return ""
+
+
+def reciprocal_rank_fusion(ranked_lists: Dict[str, List[PassageKey]],
+                           k: int = RRF_K) -> Dict[PassageKey, float]:
+    """
+    Fuses ranked lists into one score per key: the sum of 1 / (k + rank) over
+    the lists containing the key (ranks start at 1). Only the first occurrence
+    of a key in a list counts.
+    """
+    scores: Dict[PassageKey, float] = {}
+    for ranked_keys in ranked_lists.values():
+        seen = set()
+        for rank, key in enumerate(ranked_keys, start=1):
+            if key in seen:
+                continue
+            seen.add(key)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank)
+    return scores
+
+
+class RetrievalEngine:
+    """
+    Answers a question with passages from the ingested collections: the
+    question is embedded once, all collections are searched concurrently and
+    the per-collection rankings are fused with reciprocal rank fusion. With a
+    sparse encoder the HYBRID_COLLECTIONS are additionally ranked by BM25 and
+    fused the same way.
+    """
+
+    def __init__(self, vector_store: VectorStore, embedding_client,
+                 collection_layout: str = "separate", rrf_k: int = RRF_K,
+                 query_embedding_cache: Optional[QueryEmbeddingCache] = None,
+                 search_result_cache: Optional[SearchResultCache] = None,
+                 sparse_encoder: Optional[SparseEncoder] = None):
+        """
+        Args:
+            vector_store: VectorStore backend, search params such as the HNSW
+                beam are configured on the store
+            embedding_client: Client with an async `compute_embedding(text)`
+            collection_layout: "separate" or "single", see IngestOptions
+            rrf_k: Rank constant of reciprocal rank fusion
+            query_embedding_cache: Cache of question -> embedding
+            search_result_cache: Cache of (embedding bucket, settings) -> passages
+            sparse_encoder: Encodes the question into BM25 query weights with
+                the term statistics written by the vector store worker
+        """
+        self.store = vector_store
+        self.embedding_client = embedding_client
+        self.collection_layout = collection_layout
+        self.rrf_k = rrf_k
+        self.query_embedding_cache = query_embedding_cache
+        self.search_result_cache = search_result_cache
+        self.sparse_encoder = sparse_encoder
+        # per cache: [summed latency of the misses in ms, number of misses, estimated saved ms]
+        self._cache_latency: Dict[str, List[float]] = {
+            "query_embedding": [0.0, 0, 0.0],
+            "search_results": [0.0, 0, 0.0],
+        }
+
+    async def embed(self, question: str) -> List[float]:
+        return await self.embedding_client.compute_embedding(question)
+
+    def record_cache_lookup(self, cache_name: str, hit: bool, elapsed_ms: float) -> None:
+        """Tracks the latency of misses to estimate the time saved by hits."""
+        latency = self._cache_latency[cache_name]
+        if hit:
+            latency[2] += latency[0] / latency[1] if latency[1] else 0.0
+        else:
+            latency[0] += elapsed_ms
+            latency[1] += 1
+
+    def cache_stats(self) -> Dict[str, Dict[str, float]]:
+        stats = {}
+        for cache_name, cache in (("query_embedding", self.query_embedding_cache),
+                                  ("search_results", self.search_result_cache)):
+            if cache:
+                stats[cache_name] = {**cache.stats(), "saved_ms": self._cache_latency[cache_name][2]}
+        return stats
+
+    def invalidate_model(self, model_id: str) -> int:
+        """Drops the cached search results a re-ingest of `model_id` can change."""
+        if not self.search_result_cache:
+            return 0
+        return self.search_result_cache.invalidate_model(model_id)
+
+    def collection_and_filter(self, kind: str,
+                              query: RetrievalQuery) -> Tuple[str, Optional[Dict[str, List[str]]]]:
+        payload_filter = {}
+        if self.collection_layout == "single":
+            collection_name = MODEL_DOC_POINTS_COLLECTION
+            payload_filter["kind"] = [kind]
+        else:
+            collection_name = kind
+        if query.model_id:
+            payload_filter["model_id"] = [query.model_id]
+        return collection_name, payload_filter or None
+
+    async def search(self, kind: str, vector: List[float],
+                     query: RetrievalQuery) -> List[SearchHit]:
+        collection_name, payload_filter = self.collection_and_filter(kind, query)
+        return await self.store.search(collection_name, vector, query.per_collection_limit,
+                                       payload_filter=payload_filter)
+
+    def sparse_kinds(self, kinds: List[str], query: RetrievalQuery) -> List[str]:
+        if not (query.hybrid and self.sparse_encoder):
+            return []
+        return [
+            kind for kind in kinds
+            if kind in HYBRID_COLLECTIONS
+            and self.sparse_encoder.enabled(self.collection_and_filter(kind, query)[0])
+        ]
+
+    async def search_sparse(self, kind: str, query: RetrievalQuery) -> List[SearchHit]:
+        collection_name, payload_filter = self.collection_and_filter(kind, query)
+        sparse_vector = await asyncio.to_thread(
+            self.sparse_encoder.encode_query, collection_name, query.question)
+        if not sparse_vector:
+            return []
+        return await self.store.search_sparse(collection_name, sparse_vector,
+                                              query.per_collection_limit,
+                                              payload_filter=payload_filter)
+
+    async def hydrate_chunks(self, chunk_keys: List[Tuple[str, str]]) -> Dict[str, Dict[str, Any]]:
+        """Fetches the Chunks payloads of (model_id, chunk_id) pairs by their deterministic point ids."""
+        if not chunk_keys:
+            return {}
+        collection_name = MODEL_DOC_POINTS_COLLECTION if self.collection_layout == "single" else "Chunks"
+        records = await self.store.retrieve(
+            collection_name,
+            [vector_point_id("Chunks", model_id, chunk_id) for model_id, chunk_id in chunk_keys],
+        )
+        return {record.payload["source_id"]: record.payload for record in records if record.payload}
+
+    async def retrieve(self, query: RetrievalQuery) -> RetrievalResult:
+        timings_ms: Dict[str, float] = {}
+        started = stage_started = time.perf_counter()
+
+        def end_stage(stage: str):
+            nonlocal stage_started
+            now = time.perf_counter()
+            timings_ms[stage] = (now - stage_started) * 1000
+            stage_started = now
+
+        cache_hits = []
+        embedding_model = getattr(self.embedding_client, "default_model", "")
+        vector = None
+        if self.query_embedding_cache:
+            vector = self.query_embedding_cache.get(embedding_model, query.question)
+        if vector is None:
+            vector = await self.embed(query.question)
+            if self.query_embedding_cache:
+                self.query_embedding_cache.put(embedding_model, query.question, vector)
+        else:
+            cache_hits.append("query_embedding")
+        if self.query_embedding_cache:
+            self.record_cache_lookup("query_embedding", bool(cache_hits),
+                                     (time.perf_counter() - stage_started) * 1000)
+        end_stage("embed")
+
+        kinds = query.collections or RETRIEVAL_COLLECTIONS
+        sparse_kinds = self.sparse_kinds(kinds, query)
+        result_key = None
+        if self.search_result_cache:
+            result_key = self.search_result_cache.key(vector, {
+                "layout": self.collection_layout,
+                "collections": sorted(kinds),
+                "model_id": query.model_id,
+                "limit": query.limit,
+                "per_collection_limit": query.per_collection_limit,
+                "sparse_collections": sorted(sparse_kinds),
+                "question": normalize_text(query.question) if sparse_kinds else None,
+            })
+            passages = self.search_result_cache.get(result_key)
+            if passages is not None:
+                cache_hits.append("search_results")
+                self.record_cache_lookup("search_results", True, 0.0)
+                end_stage("search")
+                timings_ms["total"] = (time.perf_counter() - started) * 1000
+                return RetrievalResult(passages=passages, timings_ms=timings_ms,
+                                       cache_hits=cache_hits)
+        search_started = time.perf_counter()
+
+        results = await asyncio.gather(
+            *[self.search(kind, vector, query) for kind in kinds],
+            *[self.search_sparse(kind, query) for kind in sparse_kinds],
+        )
+        end_stage("search")
+
+        ranked_lists: Dict[str, List[PassageKey]] = {}
+        best_hits: Dict[PassageKey, Tuple[str, Dict[str, Any]]] = {}
+        ranks: Dict[PassageKey, Dict[str, int]] = {}
+        list_names = kinds + [f"{kind}:{SPARSE_VECTOR_NAME}" for kind in sparse_kinds]
+        for list_name, kind, points in zip(list_names, kinds + sparse_kinds, results):
+            ranked_lists[list_name] = []
+            for rank, point in enumerate(points, start=1):
+                key = passage_key(kind, point.payload)
+                ranked_lists[list_name].append(key)
+                ranks.setdefault(key, {}).setdefault(list_name, rank)
+                # keep the Chunks hit if there is one, it holds the chunk content
+                if key not in best_hits or kind == "Chunks":
+                    best_hits[key] = (kind, point.payload)
+
+        scores = reciprocal_rank_fusion(ranked_lists, self.rrf_k)
+        top_keys = sorted(scores, key=scores.get, reverse=True)[:query.limit]
+        end_stage("fuse")
+
+        chunk_payloads = await self.hydrate_chunks([
+            (best_hits[key][1]["model_id"], key[1]) for key in top_keys
+            if key[0] == "chunk" and best_hits[key][0] != "Chunks"
+        ])
+        passages = []
+        for key in top_keys:
+            payload = best_hits[key][1]
+            if key[0] == "chunk" and best_hits[key][0] != "Chunks":
+                payload = chunk_payloads.get(key[1], payload)
+            passages.append(Passage(
+                type=key[0],
+                id=key[1],
+                model_id=payload["model_id"],
+                doc_section_id=payload.get("doc_section_id"),
+                content=passage_text(payload),
+                score=scores[key],
+                ranks=ranks[key],
+            ))
+        end_stage("hydrate")
+
+        if self.search_result_cache:
+            self.search_result_cache.put(result_key, query.model_id, passages)
+            self.record_cache_lookup("search_results", False,
+                                     (time.perf_counter() - search_started) * 1000)
+
+        timings_ms["total"] = (time.perf_counter() - started) * 1000
+        return RetrievalResult(passages=passages, timings_ms=timings_ms,
+                               cache_hits=cache_hits)
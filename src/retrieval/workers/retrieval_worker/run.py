@@ -0,0 +1,176 @@
+import asyncio
+import os
+
+from dotenv import load_dotenv
+from qdrant_client import AsyncQdrantClient
+from temporalio.client import Client
+from temporalio.worker import Worker
+
+from retrieval.activities import RetrievalActivities
+from retrieval.engine import RetrievalEngine
+from shared.cache.memory_cache import MemoryLRUCache
+from shared.cache.query_cache import QueryEmbeddingCache, SearchResultCache
+from shared.clients import OllamaClient
+from shared.const import RETRIEVAL_TASK_QUEUE
+from shared.converter import create_data_converter_from_env
+from shared.utils.logging_config import logger
+from shared.vector_store.numpy_store import NumpyVectorStore
+from shared.vector_store.provisioning import DEFAULT_PROFILE_PATH, \
+    load_collection_profiles
+from shared.vector_store.qdrant_store import QdrantVectorStore
+from shared.vector_store.sparse import SparseEncoder, TermStatistics
+
+
+async def main():
+    load_dotenv()
+
+    TEMPORAL_ADDRESS = os.getenv("TEMPORAL_ADDRESS", "temporal:7233")
+    TEMPORAL_NAMESPACE = os.getenv("TEMPORAL_NAMESPACE", "default")
+
+    OLLAMA_URL = os.getenv("OLLAMA_URL")
+    OLLAMA_DEFAULT_EMBEDDING_MODEL = os.getenv("OLLAMA_DEFAULT_EMBEDDING_MODEL", "nomic-embed-text")
+
+    # "qdrant", "numpy" (embedded store below VECTOR_STORE_ROOT) or "pgvector" (PGVECTOR_DB_URL)
+    VECTOR_STORE_BACKEND = os.getenv("VECTOR_STORE_BACKEND", "qdrant")
+    VECTOR_STORE_ROOT = os.getenv("VECTOR_STORE_ROOT", "./local_data/vector_store")
+    PGVECTOR_DB_URL = os.getenv("PGVECTOR_DB_URL", os.getenv("MODELS_DB_URL"))
+    # "hnsw" or "ivfflat"
+    PGVECTOR_INDEX_TYPE = os.getenv("PGVECTOR_INDEX_TYPE", "hnsw")
+    # "relaxed_order" lets filtered searches return `limit` hits (pgvector >= 0.8)
+    PGVECTOR_ITERATIVE_SCAN = os.getenv("PGVECTOR_ITERATIVE_SCAN") or None
+    VECTOR_DB_HOST = os.getenv("VECTOR_DB_HOST")
+    VECTOR_DB_PORT = os.getenv("VECTOR_DB_PORT")
+    VECTOR_DB_GRPC_PORT = int(os.getenv("VECTOR_DB_GRPC_PORT", "6334"))
+    VECTOR_DB_PREFER_GRPC = os.getenv("VECTOR_DB_PREFER_GRPC", "false").lower() == "true"
+    VECTOR_DB_COLLECTION_PROFILES = os.getenv("VECTOR_DB_COLLECTION_PROFILES", DEFAULT_PROFILE_PATH)
+    # "separate" or "single", has to match the layout the models were ingested with
+    VECTOR_DB_COLLECTION_LAYOUT = os.getenv("VECTOR_DB_COLLECTION_LAYOUT", "separate")
+
+    # BM25 sparse vectors of the collections with "sparse" in their profile,
+    # the term statistics file is written by the vector worker and read by retrieval.
+    # Opt-in: existing collections have to be recreated with the sparse vector first.
+    SPARSE_VECTORS_ENABLED = os.getenv("SPARSE_VECTORS_ENABLED", "false").lower() == "true"
+    SPARSE_STATS_PATH = os.getenv("SPARSE_STATS_PATH", "./local_data/sparse_stats.sqlite3")
+    RETRIEVAL_HNSW_EF = os.getenv("RETRIEVAL_HNSW_EF")
+    RETRIEVAL_QUERY_EMBEDDING_CACHE_MAX_MB = int(os.getenv("RETRIEVAL_QUERY_EMBEDDING_CACHE_MAX_MB", "64"))
+    RETRIEVAL_RESULT_CACHE_MAX_MB = int(os.getenv("RETRIEVAL_RESULT_CACHE_MAX_MB", "64"))
+    # each worker caches its own results, re-ingests invalidate only one worker's,
+    # the others serve results missing the new points for up to the TTL
+    RETRIEVAL_RESULT_CACHE_TTL_SECONDS = float(os.getenv("RETRIEVAL_RESULT_CACHE_TTL_SECONDS", "600"))
+    RETRIEVAL_RESULT_CACHE_BUCKET_DECIMALS = int(os.getenv("RETRIEVAL_RESULT_CACHE_BUCKET_DECIMALS", "3"))
+    RETRIEVAL_WORKER_MAX_CONCURRENT_ACTIVITIES = int(
+        os.getenv("RETRIEVAL_WORKER_MAX_CONCURRENT_ACTIVITIES", "16")
+    )
+
+    logger.info(f"OLLAMA_URL = {OLLAMA_URL} from .env loaded.")
+    logger.info(f"OLLAMA_DEFAULT_EMBEDDING_MODEL = {OLLAMA_DEFAULT_EMBEDDING_MODEL} from .env loaded.")
+    logger.info(f"VECTOR_STORE_BACKEND = {VECTOR_STORE_BACKEND} from .env loaded.")
+    logger.info(f"VECTOR_STORE_ROOT = {VECTOR_STORE_ROOT} from .env loaded.")
+    logger.info(f"PGVECTOR_INDEX_TYPE = {PGVECTOR_INDEX_TYPE} from .env loaded.")
+    logger.info(f"PGVECTOR_ITERATIVE_SCAN = {PGVECTOR_ITERATIVE_SCAN} from .env loaded.")
+    logger.info(f"VECTOR_DB_HOST = {VECTOR_DB_HOST} from .env loaded.")
+    logger.info(f"VECTOR_DB_PORT = {VECTOR_DB_PORT} from .env loaded.")
+    logger.info(f"VECTOR_DB_PREFER_GRPC = {VECTOR_DB_PREFER_GRPC} from .env loaded.")
+    logger.info(f"VECTOR_DB_COLLECTION_PROFILES = {VECTOR_DB_COLLECTION_PROFILES} from .env loaded.")
+    logger.info(f"VECTOR_DB_COLLECTION_LAYOUT = {VECTOR_DB_COLLECTION_LAYOUT} from .env loaded.")
+    logger.info(f"SPARSE_VECTORS_ENABLED = {SPARSE_VECTORS_ENABLED} from .env loaded.")
+    logger.info(f"SPARSE_STATS_PATH = {SPARSE_STATS_PATH} from .env loaded.")
+    logger.info(f"RETRIEVAL_HNSW_EF = {RETRIEVAL_HNSW_EF} from .env loaded.")
+    logger.info(f"RETRIEVAL_QUERY_EMBEDDING_CACHE_MAX_MB = {RETRIEVAL_QUERY_EMBEDDING_CACHE_MAX_MB} from .env loaded.")
+    logger.info(f"RETRIEVAL_RESULT_CACHE_MAX_MB = {RETRIEVAL_RESULT_CACHE_MAX_MB} from .env loaded.")
+    logger.info(f"RETRIEVAL_RESULT_CACHE_TTL_SECONDS = {RETRIEVAL_RESULT_CACHE_TTL_SECONDS} from .env loaded.")
+    logger.info(f"RETRIEVAL_RESULT_CACHE_BUCKET_DECIMALS = {RETRIEVAL_RESULT_CACHE_BUCKET_DECIMALS} from .env loaded.")
+    logger.info(
+        f"RETRIEVAL_WORKER_MAX_CONCURRENT_ACTIVITIES = {RETRIEVAL_WORKER_MAX_CONCURRENT_ACTIVITIES} from .env loaded."
+    )
+
+    worker = None
+    llm_client = None
+    vector_store = None
+    sparse_encoder = None
+
+    try:
+        client = await Client.connect(
+            TEMPORAL_ADDRESS,
+            namespace=TEMPORAL_NAMESPACE,
+            data_converter=create_data_converter_from_env(),
+        )
+
+        llm_client = OllamaClient(OLLAMA_URL, OLLAMA_DEFAULT_EMBEDDING_MODEL)
+        profiles = load_collection_profiles(VECTOR_DB_COLLECTION_PROFILES, SPARSE_VECTORS_ENABLED)
+        if SPARSE_VECTORS_ENABLED:
+            sparse_encoder = SparseEncoder(
+                TermStatistics(SPARSE_STATS_PATH),
+                [profile.name for profile in profiles if profile.sparse],
+            )
+        if VECTOR_STORE_BACKEND == "numpy":
+            vector_store = NumpyVectorStore(VECTOR_STORE_ROOT)
+        elif VECTOR_STORE_BACKEND == "pgvector":
+            # asyncpg is only needed by this backend
+            from shared.vector_store.pgvector_store import PgVectorStore
+            vector_store = await PgVectorStore.connect(
+                PGVECTOR_DB_URL,
+                index_type=PGVECTOR_INDEX_TYPE,
+                ef_search=int(RETRIEVAL_HNSW_EF) if RETRIEVAL_HNSW_EF else None,
+                iterative_scan=PGVECTOR_ITERATIVE_SCAN,
+            )
+        else:
+            hnsw_ef = int(RETRIEVAL_HNSW_EF) if RETRIEVAL_HNSW_EF else None
+            vector_store = QdrantVectorStore(
+                AsyncQdrantClient(
+                    host=VECTOR_DB_HOST,
+                    port=VECTOR_DB_PORT,
+                    grpc_port=VECTOR_DB_GRPC_PORT,
+                    prefer_grpc=VECTOR_DB_PREFER_GRPC,
+                ),
+                search_params={
+                    profile.name: profile.search_params(hnsw_ef)
+                    for profile in profiles
+                },
+            )
+        engine = RetrievalEngine(
+            vector_store,
+            llm_client,
+            collection_layout=VECTOR_DB_COLLECTION_LAYOUT,
+            # caches with a size of 0 MB are disabled
+            query_embedding_cache=QueryEmbeddingCache(
+                MemoryLRUCache(RETRIEVAL_QUERY_EMBEDDING_CACHE_MAX_MB * 1024 * 1024)
+            ) if RETRIEVAL_QUERY_EMBEDDING_CACHE_MAX_MB else None,
+            search_result_cache=SearchResultCache(
+                MemoryLRUCache(RETRIEVAL_RESULT_CACHE_MAX_MB * 1024 * 1024,
+                               ttl_seconds=RETRIEVAL_RESULT_CACHE_TTL_SECONDS),
+                bucket_decimals=RETRIEVAL_RESULT_CACHE_BUCKET_DECIMALS,
+            ) if RETRIEVAL_RESULT_CACHE_MAX_MB else None,
+            sparse_encoder=sparse_encoder,
+        )
+        retrieval_activities = RetrievalActivities(engine)
+
+        worker = Worker(
+            client,
+            task_queue=RETRIEVAL_TASK_QUEUE,
+            activities=[
+                retrieval_activities.retrieve,
+                retrieval_activities.invalidate_model_cache,
+                retrieval_activities.get_cache_stats,
+            ],
+            max_concurrent_activities=RETRIEVAL_WORKER_MAX_CONCURRENT_ACTIVITIES,
+        )
+
+        logger.info("Worker running...")
+        await worker.run()
+    except Exception as e:
+        logger.error(f"An error occurred: {str(e)}")
+        raise
+    finally:
+        if worker:
+            await worker.shutdown()
+        if llm_client:
+            await llm_client.aclose()
+        if vector_store:
+            await vector_store.close()
+        if sparse_encoder:
+            sparse_encoder.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,22 +1,69 @@
-from typing import Dict, List
+import asyncio
+import json
+from typing import Any, Dict, List
 
 from temporalio import activity, workflow
 from temporalio.exceptions import ApplicationError
 
-from shared.models.base import Chunk, \
-    DocSection  # Assuming you have this import
+from shared.models.base import Chunk, ChunkQA, \
+    DocSection, DocSectionQA  # Assuming you have this import
+from shared.models.vector import Vector
 
 with workflow.unsafe.imports_passed_through():
-    from langchain_core.messages import BaseMessage
+    from shared.blob_store import staged_points_batch_key, \
+        staged_vectors_batch_key
+
+# JSON schema for generating summary and QAs of a text with a single LLM call
+ENRICHMENT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "summary": {"type": "string"},
+        "qas": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "question": {"type": "string"},
+                    "answer": {"type": "string"}
+                },
+                "required": ["question", "answer"]
+            }
+        }
+    },
+    "required": ["summary", "qas"]
+}
 
 class LLMActivities:
-    def __init__(self, llm_client):
+    def __init__(self, llm_client, blob_store=None, embedding_cache=None,
+                 generation_cache=None, vector_dtype: str = "float32"):
         self.llm_client = llm_client
+        self.blob_store = blob_store
+        self.embedding_cache = embedding_cache
+        self.generation_cache = generation_cache
+        self.vector_dtype = vector_dtype
+
+    async def generate(self, messages: List[Dict[str, str]],
+                       format: Any = None) -> str:
+        """
+        Sends messages to the LLM, answering byte-identical requests from the
+        generation cache if one is configured.
+        """
+        if not self.generation_cache:
+            return await self.llm_client.chat(messages, format=format)
+
+        model = self.llm_client.default_model
+        response = self.generation_cache.get(model, messages, format=format)
+        if response is None:
+            response = await self.llm_client.chat(messages, format=format)
+            self.generation_cache.put(model, messages, response, format=format)
+        activity.logger.debug(
+            f"Generation cache stats: {self.generation_cache.stats()}")
+        return response
 
     @activity.defn
-    async def chat(self, messages: List[Dict[str, str]]) -> BaseMessage:
+    async def chat(self, messages: List[Dict[str, str]]) -> str:
         try:
-            response: BaseMessage = await self.llm_client.chat(messages)
+            response: str = await self.generate(messages)
             activity.logger.info(
                 f"Got response from LLM.")
             return response
@@ -24,17 +71,69 @@ class LLMActivities:
             raise ApplicationError(f"Failed to chat with LLM: {str(e)}")
 
     @activity.defn
-    async def compute_embedding(self, text: str) -> List[float]:
+    async def get_embedding_model(self) -> str:
+        """Embedding model and vector dtype of this worker, e.g. "nomic-embed-text/float32"."""
+        return f"{self.llm_client.default_model}/{self.vector_dtype}"
+
+    @activity.defn
+    async def compute_embedding(self, text: str) -> Vector:
         if not text:
+            return Vector(dtype=self.vector_dtype)
+        embeddings = await self.compute_embeddings([text])
+        return embeddings[0]
+
+    @activity.defn
+    async def compute_embeddings(self, texts: List[str]) -> List[Vector]:
+        if not texts:
             return []
         try:
-            embedding: List[float] = await self.llm_client.compute_embedding(
-                text)
+            embeddings: List[Vector] = [Vector(dtype=self.vector_dtype) for _ in texts]
+            missing = [i for i, text in enumerate(texts) if text]
 
-            activity.logger.info(f"Embedding for text {text[0:50]} (text size: {len(text)}) computed.")
-            return embedding
+            if self.embedding_cache:
+                model = self.llm_client.default_model
+                cached = self.embedding_cache.get_many(
+                    model, [texts[i] for i in missing])
+                for i, embedding in zip(missing, cached):
+                    if embedding is not None:
+                        embeddings[i] = embedding.astype(self.vector_dtype)
+                missing = [i for i, embedding in zip(missing, cached)
+                           if embedding is None]
+
+            if missing:
+                computed = await self.llm_client.compute_embeddings(
+                    [texts[i] for i in missing])
+                for i, embedding in zip(missing, computed):
+                    embeddings[i] = Vector.from_floats(embedding, self.vector_dtype)
+                if self.embedding_cache:
+                    self.embedding_cache.put_many(
+                        model, [texts[i] for i in missing], computed)
+
+            activity.logger.info(
+                f"Embeddings for {len(texts)} texts (total size: {sum(len(text) for text in texts)}) computed, "
+                f"{len(missing)} sent to the embedding model.")
+            if self.embedding_cache:
+                activity.logger.debug(
+                    f"Embedding cache stats: {self.embedding_cache.stats()}")
+            return embeddings
         except Exception as e:
-            raise ApplicationError(f"Failed to compute embedding: {str(e)}")
+            raise ApplicationError(f"Failed to compute embeddings: {str(e)}")
+
+    @activity.defn
+    async def compute_staged_embeddings(self, points_key: str,
+                                        batch_index: int) -> None:
+        """
+        Computes the vectors for one batch of points staged by
+        VectorStoreActivities.stage_vector_points and writes them back to the
+        blob store, so the vectors never pass through workflow history.
+        """
+        points = await asyncio.to_thread(
+            self.blob_store.get_json, staged_points_batch_key(points_key, batch_index))
+        vectors = await self.compute_embeddings([point["text"] for point in points])
+        await asyncio.to_thread(
+            self.blob_store.put_json,
+            staged_vectors_batch_key(points_key, batch_index),
+            [vector.to_json() for vector in vectors])
 
     @activity.defn
     async def add_context_to_chunk(self, chunk: Chunk,
@@ -55,7 +154,7 @@ class LLMActivities:
                  "content": f"Please summarize the following text:\n\n{chunk.content}"}
             ]
             response = await self.chat(messages)
-            chunk.summary = response.content
+            chunk.summary = response
             return chunk
         except Exception as e:
             raise ApplicationError(f"Failed to add chunk summary: {str(e)}")
@@ -72,7 +171,7 @@ class LLMActivities:
             response = await self.chat(messages)
 
             # Parse the response and add QAs to the chunk
-            qas = self.parse_qas(response.content)
+            qas = self.parse_qas(response)
             chunk.qas = qas
             return chunk
         except Exception as e:
@@ -114,7 +213,7 @@ class LLMActivities:
                  "content": f"Please summarize the following text:\n\n{doc_section.content}"}
             ]
             response = await self.chat(messages)
-            doc_section.summary = response.content
+            doc_section.summary = response
             return doc_section
         except Exception as e:
             raise ApplicationError(
@@ -133,8 +232,55 @@ class LLMActivities:
             response = await self.chat(messages)
 
             # Parse the response and add QAs to the doc_section
-            qas = self.parse_qas(response.content)
+            qas = self.parse_qas(response)
             doc_section.qas = qas
             return doc_section
         except Exception as e:
-            raise ApplicationError(f"Failed to add doc section QAs: {str(e)}")
\ No newline at end of file
+            raise ApplicationError(f"Failed to add doc section QAs: {str(e)}")
+
+    async def generate_enrichment(self, content: str) -> Dict[str, Any]:
+        """
+        Generates summary and question-answer pairs for `content` with one
+        JSON schema constrained LLM call, so the text is only processed once.
+
+        Returns:
+            Dict[str, Any]: {"summary": str, "qas": [{"question": str, "answer": str}]}
+        """
+        messages = [
+            {"role": "system",
+             "content": "You are a helpful assistant that summarizes text and generates questions and answers based on given text. Reply in JSON."},
+            {"role": "user",
+             "content": f"Please summarize the following text and generate 3 question-answer pairs based on it:\n\n{content}"}
+        ]
+        response = await self.generate(messages, format=ENRICHMENT_SCHEMA)
+        return json.loads(response)
+
+    @activity.defn
+    async def add_chunk_enrichment(self, chunk: Chunk) -> Chunk:
+        try:
+            enrichment = await self.generate_enrichment(chunk.content)
+            chunk.summary = enrichment["summary"]
+            chunk.qas = [
+                ChunkQA(id=f"{chunk.id}_qa_{i}", chunk_id=chunk.id,
+                        question=qa["question"], answer=qa["answer"])
+                for i, qa in enumerate(enrichment["qas"])
+            ]
+            return chunk
+        except Exception as e:
+            raise ApplicationError(f"Failed to add chunk enrichment: {str(e)}")
+
+    @activity.defn
+    async def add_doc_section_enrichment(self, doc_section: DocSection) -> DocSection:
+        try:
+            enrichment = await self.generate_enrichment(doc_section.content)
+            doc_section.summary = enrichment["summary"]
+            doc_section.qas = [
+                DocSectionQA(id=f"{doc_section.id}_qa_{i}",
+                             docsection_id=doc_section.id,
+                             question=qa["question"], answer=qa["answer"])
+                for i, qa in enumerate(enrichment["qas"])
+            ]
+            return doc_section
+        except Exception as e:
+            raise ApplicationError(
+                f"Failed to add doc section enrichment: {str(e)}")
@@ -1,16 +1,354 @@
-from temporalio import activity
+import asyncio
+import hashlib
+import io
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Iterable, Iterator, List, Set, Tuple
+
+from temporalio import activity, workflow
+
+from shared.models.base import IngestModelInput
+
+with workflow.unsafe.imports_passed_through():
+    from minio.error import S3Error
+
+    from shared.code_archive import archive_index_object_name, stream_tar_zst
+    from shared.model_backup import LATEST_VERSION, archive_object_name, blob_object_name, \
+        blob_shard_prefix, build_manifest, codemeta_version, files_digest, manifest_object_name
+    from shared.utils.hashing import sha256_file
+
+# files larger than this are uploaded in parts of this size
+DEFAULT_PART_SIZE = 16 * 1024 * 1024
+HASH_BLOCK_SIZE = 1024 * 1024
+# seconds between heartbeats while a file is hashed, listed or uploaded
+HEARTBEAT_INTERVAL = 10
+# Above this many distinct blob shards (of 256) one listing per shard is cheaper than a
+# stat_object per hash, despite returning blobs of the rest of the catalog too.
+LIST_SHARDS_MIN = 128
+
+
+def iter_files(root: str, relative_path: str = "") -> Iterator[Tuple[str, str, int]]:
+    """
+    Walks a folder lazily, one directory listing at a time, in sorted order so
+    that the n-th file is the same on every run. Yields (relative path, path,
+    size); symlinked directories are not followed.
+    """
+    with os.scandir(os.path.join(root, relative_path)) as entries:
+        entries = sorted(entries, key=lambda entry: entry.name)
+    for entry in entries:
+        entry_relative_path = f"{relative_path}/{entry.name}" if relative_path else entry.name
+        if entry.is_dir(follow_symlinks=False):
+            yield from iter_files(root, entry_relative_path)
+        elif entry.is_file():
+            yield entry_relative_path, entry.path, entry.stat().st_size
+
+
+def local_etag(path: str, size: int, part_size: int) -> str:
+    """
+    ETag S3 computes for a file uploaded with `part_size`: the MD5 of a
+    single part upload, the MD5 of the part MD5s and the part count otherwise.
+    """
+    with open(path, "rb") as f:
+        if size <= part_size:
+            digest = hashlib.md5()
+            while block := f.read(HASH_BLOCK_SIZE):
+                digest.update(block)
+            return digest.hexdigest()
+        part_digests = []
+        while part := f.read(part_size):
+            part_digests.append(hashlib.md5(part).digest())
+    return f"{hashlib.md5(b''.join(part_digests)).hexdigest()}-{len(part_digests)}"
 
 
 class MinioActivities:
-    def __init__(self, minio_client, local_fs_root: str, minio_default_bucket_name: str):
+    def __init__(self, minio_client, local_fs_root: str, minio_default_bucket_name: str,
+                 upload_parallelism: int = 8, part_size: int = DEFAULT_PART_SIZE):
+        """
+        Args:
+            minio_client: Minio client
+            local_fs_root: Root of relative local paths
+            minio_default_bucket_name: Bucket the files are uploaded to
+            upload_parallelism: Number of files uploaded at once
+            part_size: Part size of multipart uploads, also used to compute
+                the ETags of local files
+        """
         self.minio_client = minio_client
         self.local_fs_root = local_fs_root
         self.minio_default_bucket_name = minio_default_bucket_name
+        self.upload_parallelism = upload_parallelism
+        self.part_size = part_size
+        self.executor = ThreadPoolExecutor(max_workers=upload_parallelism,
+                                           thread_name_prefix="minio-upload")
+
+    def _local_path(self, path: str) -> str:
+        return os.path.join(self.local_fs_root or "", path)
+
+    def _list_objects(self, prefix: str) -> Dict[str, Tuple[int, str]]:
+        """object name -> (size, ETag) of the objects below `prefix`."""
+        return {
+            obj.object_name: (obj.size, (obj.etag or "").strip('"'))
+            for obj in self.minio_client.list_objects(
+                self.minio_default_bucket_name, prefix=prefix, recursive=True)
+        }
+
+    def _upload_if_changed(self, path: str, size: int, object_name: str,
+                           existing: Dict[str, Tuple[int, str]]) -> bool:
+        """Uploads the file unless an object with the same size and ETag exists, returns if it uploaded."""
+        stored = existing.get(object_name)
+        if stored and stored[0] == size and stored[1] == local_etag(path, size, self.part_size):
+            return False
+        self.minio_client.fput_object(self.minio_default_bucket_name, object_name, path,
+                                      part_size=self.part_size)
+        return True
+
+    async def _map_bounded(self, func: Callable[[Any], Awaitable[None]], items: Iterable[Any]) -> int:
+        """
+        Awaits `func` for each item with at most `upload_parallelism` calls
+        running, pulling items only as calls finish. Raises the first error
+        after cancelling and awaiting the calls still running.
+        Returns the number of items.
+        """
+        semaphore = asyncio.Semaphore(self.upload_parallelism)
+        tasks = []
+        count = 0
+
+        async def run(item):
+            try:
+                await func(item)
+            finally:
+                semaphore.release()
+
+        try:
+            for item in items:
+                await semaphore.acquire()
+                # surface failed calls before pulling more items
+                for task in tasks:
+                    if task.done() and task.exception():
+                        raise task.exception()
+                tasks = [task for task in tasks if not task.done()]
+                tasks.append(asyncio.create_task(run(item)))
+                count += 1
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        return count
+
+    async def _run_heartbeating(self, details: Callable[[], Tuple], func: Callable, *args) -> Any:
+        """
+        Runs `func` on the executor, heartbeating `details()` every
+        HEARTBEAT_INTERVAL seconds until it returns, so a single large file
+        does not exceed the heartbeat timeout.
+        """
+        future = asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+        while not (await asyncio.wait([future], timeout=HEARTBEAT_INTERVAL))[0]:
+            activity.heartbeat(*details())
+        return future.result()
 
     @activity.defn
     async def upload_file(self, file_path: str, object_name:str) -> None:
-        activity.logger.info("Activity upload_file completed.")
+        loop = asyncio.get_running_loop()
+        path = self._local_path(file_path)
+        existing = await loop.run_in_executor(self.executor, self._list_objects, object_name)
+        uploaded = await loop.run_in_executor(
+            self.executor, self._upload_if_changed, path, os.path.getsize(path),
+            object_name, existing)
+        activity.logger.info(
+            f"{'Uploaded' if uploaded else 'Skipped unchanged'} {file_path} as {object_name}.")
+
+    @activity.defn
+    async def upload_folder(self, folder_path: str, object_name:str) -> Dict[str, float]:
+        """
+        Uploads all files below `folder_path` as `<object_name>/<relative path>`
+        with up to `upload_parallelism` files in flight. Files whose object
+        already has the same size and ETag are skipped. The number of leading
+        files done is heartbeated, also while a large file is uploaded, a
+        retried activity continues after them.
+
+        Returns:
+            Dict[str, float]: Number of files, uploaded and skipped files,
+                uploaded bytes and bytes per second
+        """
+        root = self._local_path(folder_path)
+        prefix = object_name.rstrip("/")
+        started = time.perf_counter()
+
+        start_index, bytes_uploaded = 0, 0
+        heartbeat_details = activity.info().heartbeat_details
+        if heartbeat_details:
+            start_index, bytes_uploaded = heartbeat_details[0], heartbeat_details[1]
+            activity.logger.info(f"Resuming upload of {folder_path} after {start_index} files.")
+
+        done = set()
+        next_index = start_index
+        stats = {"files": start_index, "uploaded_files": 0, "skipped_files": 0}
+
+        def progress():
+            return next_index, bytes_uploaded
+
+        existing = await self._run_heartbeating(progress, self._list_objects, f"{prefix}/")
+
+        async def upload(item: Tuple[int, Tuple[str, str, int]]):
+            nonlocal next_index, bytes_uploaded
+            index, (relative_path, path, size) = item
+            uploaded = await self._run_heartbeating(
+                progress, self._upload_if_changed, path, size, f"{prefix}/{relative_path}", existing)
+            stats["uploaded_files" if uploaded else "skipped_files"] += 1
+            bytes_uploaded += size if uploaded else 0
+            done.add(index)
+            while next_index in done:
+                done.remove(next_index)
+                next_index += 1
+            activity.heartbeat(next_index, bytes_uploaded)
+
+        files = itertools.islice(enumerate(iter_files(root)), start_index, None)
+        stats["files"] += await self._map_bounded(upload, files)
+
+        elapsed = time.perf_counter() - started
+        stats["bytes_uploaded"] = bytes_uploaded
+        stats["bytes_per_second"] = bytes_uploaded / elapsed if elapsed else 0.0
+        activity.logger.info(
+            f"Uploaded {stats['uploaded_files']} and skipped {stats['skipped_files']} unchanged "
+            f"of {stats['files']} files in {folder_path} "
+            f"({bytes_uploaded / 1024 / 1024:.1f} MiB, {stats['bytes_per_second'] / 1024 / 1024:.1f} MiB/s).")
+        return stats
+
+    def _object_exists(self, object_name: str) -> bool:
+        try:
+            self.minio_client.stat_object(self.minio_default_bucket_name, object_name)
+            return True
+        except S3Error as e:
+            if e.code in ("NoSuchKey", "NoSuchObject"):
+                return False
+            raise
+
+    def _stored_blobs(self, sha256s: Iterable[str]) -> Set[str]:
+        """
+        The hashes among `sha256s` stored as blobs. Stats each blob when they fall in few
+        shards, and lists each shard once when they cover more than LIST_SHARDS_MIN of them.
+        """
+        sha256s = set(sha256s)
+        shard_prefixes = {blob_shard_prefix(sha256) for sha256 in sha256s}
+        if len(shard_prefixes) <= LIST_SHARDS_MIN:
+            return {sha256 for sha256 in sha256s if self._object_exists(blob_object_name(sha256))}
+        stored = set()
+        for shard_prefix in sorted(shard_prefixes):
+            stored.update(object_name[len(shard_prefix):] for object_name in self._list_objects(shard_prefix))
+        return stored & sha256s
+
+    def _put_blob(self, path: str, sha256: str) -> None:
+        self.minio_client.fput_object(self.minio_default_bucket_name, blob_object_name(sha256), path,
+                                      part_size=self.part_size)
+
+    def _put_manifest(self, manifest: Dict[str, Any]) -> None:
+        data = json.dumps(manifest, indent=1).encode("utf-8")
+        for version in (manifest["version"], LATEST_VERSION):
+            self.minio_client.put_object(
+                self.minio_default_bucket_name,
+                manifest_object_name(manifest["model_slug"], version),
+                io.BytesIO(data), length=len(data), content_type="application/json")
+
+    def _put_code_archive(self, code_root: str, object_name: str, code_files: List[Dict[str, Any]]) -> int:
+        """
+        Streams the code folder as a tar.zst into a multipart upload, then
+        stores its index. Skipped if the index (written last) exists.
+        Returns the uploaded bytes.
+        """
+        index_object_name = archive_index_object_name(object_name)
+        if self._object_exists(index_object_name):
+            return 0
+        index = stream_tar_zst(
+            ((relative_path, path) for relative_path, path, _ in iter_files(code_root)),
+            lambda reader: self.minio_client.put_object(
+                self.minio_default_bucket_name, object_name, reader, length=-1,
+                part_size=self.part_size, content_type="application/zstd"))
+        archived = {f"code/{member['name']}": member["sha256"] for member in index["members"]}
+        if archived != {file["path"]: file["sha256"] for file in code_files}:
+            self.minio_client.remove_object(self.minio_default_bucket_name, object_name)
+            raise ValueError(f"{code_root} changed while it was backed up")
+        data = json.dumps(index).encode("utf-8")
+        self.minio_client.put_object(self.minio_default_bucket_name, index_object_name,
+                                     io.BytesIO(data), length=len(data), content_type="application/json")
+        return index["size"] + len(data)
+
+    def _backup_files(self, input: IngestModelInput, code_as_blobs: bool) -> Iterator[Tuple[str, str, bool]]:
+        """(manifest path, local path, store as blob) of the files backed up for a model."""
+        yield "metadata.json", self._local_path(input.metadata_json_path), True
+        yield f"docs/original/{os.path.basename(input.original_file_path)}", \
+            self._local_path(input.original_file_path), True
+        if input.code_folder_path:
+            for relative_path, path, _ in iter_files(self._local_path(input.code_folder_path)):
+                yield f"code/{relative_path}", path, code_as_blobs
 
     @activity.defn
-    async def upload_folder(self, folder_path: str, object_name:str) -> None:
-        activity.logger.info("Activity upload_folder not implemented!")
\ No newline at end of file
+    async def backup_model_version(self, input: IngestModelInput) -> Dict[str, Any]:
+        """
+        Backs up the metadata, original documentation and code of a model as
+        content addressed blobs, uploading only blobs not stored yet (by any
+        version of any model, see _stored_blobs), then writes the manifest of this version
+        (named by the codemeta version) and points "latest" to it.
+        With the "archive" code backup mode the code files are streamed into
+        one tar.zst archive instead, stored once per distinct code folder.
+        A retried activity finds the blobs it uploaded already.
+
+        Returns:
+            Dict[str, Any]: Version, number of files, uploaded blobs,
+                total and uploaded bytes and bytes per second
+        """
+        started = time.perf_counter()
+        files = []
+        # sha256 -> (path, size) of the files stored as blobs, identical files are uploaded once
+        blobs: Dict[str, Tuple[str, int]] = {}
+        stats = {"uploaded_blobs": 0, "bytes_total": 0, "bytes_uploaded": 0}
+        archive_code = bool(input.code_folder_path) and input.options.code_backup_mode == "archive"
+
+        def progress():
+            return len(files), stats["bytes_uploaded"]
+
+        async def hash_file(item: Tuple[str, str, bool]):
+            manifest_path, path, as_blob = item
+            size = os.path.getsize(path)
+            sha256 = await self._run_heartbeating(progress, sha256_file, path)
+            files.append({"path": manifest_path, "sha256": sha256, "size": size})
+            stats["bytes_total"] += size
+            if as_blob:
+                blobs.setdefault(sha256, (path, size))
+            activity.heartbeat(len(files), stats["bytes_uploaded"])
+
+        async def upload_blob(sha256: str):
+            path, size = blobs[sha256]
+            await self._run_heartbeating(progress, self._put_blob, path, sha256)
+            stats["uploaded_blobs"] += 1
+            stats["bytes_uploaded"] += size
+            activity.heartbeat(len(files), stats["bytes_uploaded"])
+
+        await self._map_bounded(hash_file, self._backup_files(input, code_as_blobs=not archive_code))
+        stored = await self._run_heartbeating(progress, self._stored_blobs, list(blobs))
+        await self._map_bounded(upload_blob, [sha256 for sha256 in blobs if sha256 not in stored])
+
+        if archive_code:
+            code_files = [file for file in files if file["path"].startswith("code/")]
+            archive = archive_object_name(files_digest(code_files))
+            for file in code_files:
+                file["archive"] = archive
+            stats["bytes_uploaded"] += await self._run_heartbeating(
+                progress, self._put_code_archive, self._local_path(input.code_folder_path), archive, code_files)
+
+        version = input.version or codemeta_version(self._local_path(input.metadata_json_path))
+        manifest = build_manifest(input.model_slug, version, files)
+        await self._run_heartbeating(progress, self._put_manifest, manifest)
+
+        elapsed = time.perf_counter() - started
+        stats.update(version=manifest["version"], files=len(files),
+                     bytes_per_second=stats["bytes_uploaded"] / elapsed if elapsed else 0.0)
+        activity.logger.info(
+            f"Backed up {len(files)} files of {input.model_slug} version {manifest['version']}, "
+            f"uploaded {stats['uploaded_blobs']} new blobs "
+            f"({stats['bytes_uploaded'] / 1024 / 1024:.1f} of {stats['bytes_total'] / 1024 / 1024:.1f} MiB, "
+            f"{stats['bytes_per_second'] / 1024 / 1024:.1f} MiB/s).")
+        return stats
@@ -1,9 +1,15 @@
-from temporalio import activity
+import time
+from datetime import timedelta
+from typing import Dict
 
 from temporalio import activity
 
-from shared.models.base import ModelDoc
+from shared.models.base import ModelDoc, ModelDocDiff
 from shared.models.model_metadata import ModelMetadata
+from shared.utils.postgres import bulk_insert
+
+# a 300 section document is written well within this
+SAVE_MODEL_DOC_TRANSACTION_TIMEOUT = timedelta(seconds=60)
 
 
 class PostgresActivities:
@@ -11,8 +17,163 @@ class PostgresActivities:
         self.postgres_client = postgres_client
 
     @activity.defn
-    async def save_model_doc(self, model_doc:ModelDoc) -> None:
-        activity.logger.info("Activity save_model_doc completed.")
+    async def save_model_doc(self, model_doc:ModelDoc) -> Dict[str, float]:
+        """
+        Saves a ModelDoc with its DocSections, Chunks and QAs in one transaction,
+        with one bulk statement per table instead of one per row. Rows are
+        upserted by their pre-assigned ids; the QAs of the saved DocSections
+        and Chunks, and Chunks no longer part of a saved DocSection, are
+        replaced.
+
+        Returns:
+            Dict[str, float]: Milliseconds spent on every table
+        """
+        doc_sections = model_doc.doc_sections
+        chunks = [chunk for doc_section in doc_sections for chunk in doc_section.chunks]
+        doc_section_ids = [doc_section.id for doc_section in doc_sections]
+        chunk_ids = [chunk.id for chunk in chunks]
+        timings_ms: Dict[str, float] = {}
+
+        async with self.postgres_client.tx(timeout=SAVE_MODEL_DOC_TRANSACTION_TIMEOUT) as transaction:
+            started = time.perf_counter()
+            await transaction.modeldoc.upsert(
+                where={"id": model_doc.id},
+                data={
+                    "create": {
+                        "id": model_doc.id,
+                        "model": {"connect": {"id": model_doc.model_id}},
+                        "markdown_object_name": model_doc.markdown_object_name or "",
+                        "original_source_object_name": model_doc.original_source_object_name or "",
+                        "docs_summary": model_doc.summary or "",
+                    },
+                    "update": {
+                        key: value for key, value in {
+                            "markdown_object_name": model_doc.markdown_object_name,
+                            "original_source_object_name": model_doc.original_source_object_name,
+                            "docs_summary": model_doc.summary,
+                        }.items() if value is not None
+                    },
+                },
+            )
+            timings_ms["ModelDoc"] = (time.perf_counter() - started) * 1000
+
+            started = time.perf_counter()
+            await bulk_insert(
+                transaction, "DocSection",
+                ["id", "modeldoc_id", "parent_id", "title", "level", "content", "summary", "content_hash"],
+                [
+                    (doc_section.id, model_doc.id,
+                     doc_section.parent.id if doc_section.parent else None,
+                     doc_section.title, doc_section.level, doc_section.content,
+                     doc_section.summary or "", doc_section.content_hash or "")
+                    for doc_section in doc_sections
+                ],
+                update_columns=["parent_id", "title", "level", "content", "summary", "content_hash"],
+            )
+            timings_ms["DocSection"] = (time.perf_counter() - started) * 1000
+
+            started = time.perf_counter()
+            await transaction.chunkqa.delete_many(
+                where={"chunk": {"is": {"docsection_id": {"in": doc_section_ids}}}})
+            await transaction.chunk.delete_many(
+                where={"docsection_id": {"in": doc_section_ids}, "id": {"not_in": chunk_ids}})
+            await bulk_insert(
+                transaction, "Chunk",
+                ["id", "docsection_id", "type", "content", "content_with_context", "summary", "content_hash"],
+                [
+                    (chunk.id, chunk.doc_section_id, chunk.type, chunk.content,
+                     chunk.content_with_context or "", chunk.summary or "", chunk.content_hash or "")
+                    for chunk in chunks
+                ],
+                update_columns=["docsection_id", "type", "content", "content_with_context",
+                                "summary", "content_hash"],
+            )
+            timings_ms["Chunk"] = (time.perf_counter() - started) * 1000
+
+            started = time.perf_counter()
+            await bulk_insert(
+                transaction, "ChunkQA", ["id", "chunk_id", "question", "answer"],
+                [(qa.id, chunk.id, qa.question, qa.answer) for chunk in chunks for qa in chunk.qas or []],
+            )
+            timings_ms["ChunkQA"] = (time.perf_counter() - started) * 1000
+
+            started = time.perf_counter()
+            await transaction.docsectionqa.delete_many(
+                where={"docsection_id": {"in": doc_section_ids}})
+            await bulk_insert(
+                transaction, "DocSectionQA", ["id", "docsection_id", "question", "answer"],
+                [
+                    (qa.id, doc_section.id, qa.question, qa.answer)
+                    for doc_section in doc_sections for qa in doc_section.qas or []
+                ],
+            )
+            timings_ms["DocSectionQA"] = (time.perf_counter() - started) * 1000
+
+        activity.logger.info(
+            f"Saved ModelDoc {model_doc.id} with {len(doc_sections)} DocSections and "
+            f"{len(chunks)} Chunks: " + ", ".join(
+                f"{table} {elapsed:.1f} ms" for table, elapsed in timings_ms.items()))
+        return timings_ms
+
+    @activity.defn
+    async def diff_model_doc(self, model_doc: ModelDoc) -> ModelDocDiff:
+        """
+        Compares the DocSections of a freshly split ModelDoc with the persisted
+        ones by id and content_hash.
+        """
+        persisted_doc_sections = await self.postgres_client.docsection.find_many(
+            where={"modeldoc_id": model_doc.id},
+            include={"chunks": True}
+        )
+        persisted_hashes = {
+            doc_section.id: doc_section.content_hash
+            for doc_section in persisted_doc_sections
+        }
+        doc_section_ids = {doc_section.id for doc_section in model_doc.doc_sections}
+
+        changed_doc_section_ids = [
+            doc_section.id for doc_section in model_doc.doc_sections
+            if persisted_hashes.get(doc_section.id) != doc_section.content_hash
+        ]
+        stale_doc_section_ids = [
+            doc_section_id for doc_section_id in persisted_hashes
+            if doc_section_id not in doc_section_ids
+        ]
+        replaced_doc_section_ids = set(changed_doc_section_ids) | set(stale_doc_section_ids)
+        stale_chunk_ids = [
+            chunk.id
+            for doc_section in persisted_doc_sections
+            if doc_section.id in replaced_doc_section_ids
+            for chunk in doc_section.chunks or []
+        ]
+
+        activity.logger.info(
+            f"ModelDoc {model_doc.id}: {len(changed_doc_section_ids)} new or changed, "
+            f"{len(stale_doc_section_ids)} stale of {len(model_doc.doc_sections)} DocSections.")
+        return ModelDocDiff(
+            changed_doc_section_ids=changed_doc_section_ids,
+            stale_doc_section_ids=stale_doc_section_ids,
+            stale_chunk_ids=stale_chunk_ids
+        )
+
+    @activity.defn
+    async def delete_stale_doc_sections(self, diff: ModelDocDiff) -> None:
+        """
+        Deletes stale DocSections, the Chunks and QAs of stale and changed
+        DocSections (changed ones are saved again by save_model_doc).
+        """
+        replaced_doc_section_ids = diff.changed_doc_section_ids + diff.stale_doc_section_ids
+        async with self.postgres_client.tx() as transaction:
+            await transaction.chunkqa.delete_many(
+                where={"chunk_id": {"in": diff.stale_chunk_ids}})
+            await transaction.chunk.delete_many(
+                where={"id": {"in": diff.stale_chunk_ids}})
+            await transaction.docsectionqa.delete_many(
+                where={"docsection_id": {"in": replaced_doc_section_ids}})
+            await transaction.docsection.delete_many(
+                where={"id": {"in": diff.stale_doc_section_ids}})
+
+        activity.logger.info("Activity delete_stale_doc_sections completed.")
 
     @activity.defn
     def create_model_from_metadata(self, model_metadata: ModelMetadata) -> None:
@@ -1,33 +1,257 @@
-from typing import List
+import asyncio
+from dataclasses import asdict
+from typing import List, Set
 
-from temporalio import activity
+from temporalio import activity, workflow
 
-from shared.models.vector import VectorPoint
+from shared.models.vector import PendingVectorPoint, Vector, VectorPoint
+
+with workflow.unsafe.imports_passed_through():
+	from shared.blob_store import staged_points_batch_key, \
+		staged_vectors_batch_key
+	from shared.vector_store.base import VectorStore
+	from shared.vector_store.sparse import SparseEncoder
 
 
 class VectorStoreActivities:
-	def __init__(self, vector_store_client):
-		self.client = vector_store_client
+	def __init__(self, vector_store: "VectorStore", blob_store=None,
+	             upsert_batch_size: int = 256, upsert_parallelism: int = 4,
+	             upsert_wait: bool = False,
+	             sparse_encoder: "SparseEncoder" = None):
+		"""
+		Args:
+			vector_store: VectorStore backend (Qdrant or embedded NumPy store)
+			blob_store: Blob store holding staged points and vectors
+			upsert_batch_size: Number of points per upsert request
+			upsert_parallelism: Number of upsert requests in flight
+			upsert_wait: Wait for every batch to be applied, otherwise only the
+				final barrier request of an upsert waits
+			sparse_encoder: Computes the BM25 sparse vectors of the points
+				upserted into its collections
+		"""
+		self.store = vector_store
+		self.blob_store = blob_store
+		self.upsert_batch_size = upsert_batch_size
+		self.upsert_parallelism = upsert_parallelism
+		self.upsert_wait = upsert_wait
+		self.sparse_encoder = sparse_encoder
+
+	async def upsert_batches(self, collection_name: str,
+	                         batches: List[List[VectorPoint]],
+	                         start_batch: int = 0) -> None:
+		"""
+		Upserts batches with up to `upsert_parallelism` requests in flight and
+		heartbeats the number of leading batches acknowledged by the store.
+		Points of sparse collections get their sparse vectors right before
+		their batch is upserted, so the term statistics only count batches
+		sent to the store.
+		"""
+		batches = list(batches)
+		sparse = self.sparse_encoder and self.sparse_encoder.enabled(collection_name)
+
+		async def encode_batch(batch_index: int):
+			if sparse:
+				batches[batch_index] = await asyncio.to_thread(
+					self.sparse_encoder.encode_points, collection_name, batches[batch_index])
+
+		semaphore = asyncio.Semaphore(self.upsert_parallelism)
+		acknowledged = [False] * len(batches)
+		next_batch = start_batch
+
+		async def upsert_batch(batch_index: int):
+			nonlocal next_batch
+			async with semaphore:
+				await encode_batch(batch_index)
+				await self.store.upsert(collection_name, batches[batch_index],
+				                        wait=self.upsert_wait)
+			acknowledged[batch_index] = True
+			while next_batch < len(batches) and acknowledged[next_batch]:
+				next_batch += 1
+			activity.heartbeat(next_batch)
+
+		await asyncio.gather(*[
+			upsert_batch(batch_index)
+			for batch_index in range(start_batch, len(batches))
+		])
+
+		if not self.upsert_wait and batches:
+			if start_batch >= len(batches):
+				# resumed after the last batch, it was not encoded in this attempt
+				await encode_batch(len(batches) - 1)
+			# Qdrant applies the updates in order, waiting for a last (idempotent)
+			# request makes all previous batches visible to searches
+			await self.store.upsert(collection_name, batches[-1], wait=True)
 
 	@activity.defn
 	async def upsert_metadata_vector_points(self, collection_name: str,
 	                 points: List[VectorPoint]) -> None:
 		"""
-		Upserts points into a Qdrant collection.
+		Upserts points into a vector store collection in batches of
+		`upsert_batch_size`. A retried activity resumes after the last batch
+		acknowledged in the heartbeat details.
 
 		Args:
 			collection_name: Name of the collection to upsert points into
-			points: List of PointStruct objects containing vectors and metadata
-		"""
-		# self.client.upsert(
-		# 	collection_name=collection_name,
-		# 	points=[
-		# 		PointStruct(
-		# 			id=point.id,
-		# 			vector=point.vector,
-		# 			payload=point.payload
-		# 		) for point in points
-		# 	]
-		# )
-
-		activity.logger.info(f"Activity upsert_metadata_vector_points completed.")
\ No newline at end of file
+			points: List of VectorPoints containing vectors and metadata
+		"""
+		batches = [
+			points[batch_start:batch_start + self.upsert_batch_size]
+			for batch_start in range(0, len(points), self.upsert_batch_size)
+		]
+
+		start_batch = 0
+		heartbeat_details = activity.info().heartbeat_details
+		if heartbeat_details:
+			start_batch = heartbeat_details[0]
+			activity.logger.info(
+				f"Resuming upsert into {collection_name} at batch {start_batch}/{len(batches)}.")
+
+		await self.upsert_batches(collection_name, batches, start_batch)
+
+		activity.logger.info(
+			f"Upserted {len(points)} points into {collection_name} in {len(batches)} batches.")
+
+	async def find_unchanged_point_ids(self, collection_name: str,
+	                                   points: List[PendingVectorPoint]) -> Set[str]:
+		"""
+		Returns the ids of `points` already stored with the same content_hash.
+		"""
+		if not points or not await self.store.collection_exists(collection_name):
+			return set()
+
+		content_hashes = {point.id: point.payload.get("content_hash") for point in points}
+		unchanged = set()
+		ids = list(content_hashes)
+		for batch_start in range(0, len(ids), self.upsert_batch_size):
+			records = await self.store.retrieve(
+				collection_name, ids[batch_start:batch_start + self.upsert_batch_size])
+			unchanged.update(
+				record.id for record in records
+				if record.payload.get("content_hash") == content_hashes.get(record.id)
+			)
+		return unchanged
+
+	@activity.defn
+	async def filter_changed_vector_points(self, collection_name: str,
+	                                       points: List[PendingVectorPoint]
+	                                       ) -> List[PendingVectorPoint]:
+		"""
+		Drops the points whose content_hash matches the stored point, so they
+		are neither embedded nor upserted again.
+		"""
+		unchanged = await self.find_unchanged_point_ids(collection_name, points)
+		activity.logger.info(
+			f"{len(unchanged)} of {len(points)} points in {collection_name} are unchanged.")
+		return [point for point in points if point.id not in unchanged]
+
+	@activity.defn
+	async def stage_vector_points(self, points_key: str,
+	                              points: List[PendingVectorPoint],
+	                              batch_size: int,
+	                              collection_name: str = None) -> int:
+		"""
+		Writes points waiting for their embedding to the blob store in batches.
+
+		Args:
+			points_key: Blob store prefix for the staged batches
+			points: Points to stage
+			batch_size: Number of points per batch
+			collection_name: If given, points unchanged in this collection are
+				not staged
+
+		Returns:
+			int: Number of staged batches
+		"""
+		if collection_name:
+			unchanged = await self.find_unchanged_point_ids(collection_name, points)
+			points = [point for point in points if point.id not in unchanged]
+
+		num_batches = 0
+		for batch_start in range(0, len(points), batch_size):
+			await asyncio.to_thread(
+				self.blob_store.put_json,
+				staged_points_batch_key(points_key, num_batches),
+				[asdict(point) for point in points[batch_start:batch_start + batch_size]]
+			)
+			num_batches += 1
+
+		activity.logger.info(
+			f"Staged {len(points)} points in {num_batches} batches under {points_key}.")
+		return num_batches
+
+	@activity.defn
+	async def upsert_staged_vector_points(self, collection_name: str,
+	                                      points_key: str,
+	                                      batch_index: int) -> int:
+		"""
+		Upserts one staged batch of points together with the vectors computed
+		for it by LLMActivities.compute_staged_embeddings.
+
+		Returns:
+			int: Number of upserted points
+		"""
+		pending_points = [
+			PendingVectorPoint(**point) for point in await asyncio.to_thread(
+				self.blob_store.get_json, staged_points_batch_key(points_key, batch_index))
+		]
+		vectors = [
+			Vector.from_json(vector) for vector in await asyncio.to_thread(
+				self.blob_store.get_json, staged_vectors_batch_key(points_key, batch_index))
+		]
+
+		points = [
+			VectorPoint(id=point.id, payload=point.payload, vector=vector)
+			for point, vector in zip(pending_points, vectors)
+			if vector
+		]
+		await self.upsert_batches(collection_name, [points] if points else [])
+		return len(points)
+
+	@activity.defn
+	async def delete_staged_vector_points(self, points_key: str) -> None:
+		await asyncio.to_thread(self.blob_store.delete_prefix, points_key)
+		activity.logger.info(f"Deleted staged points under {points_key}.")
+
+	@activity.defn
+	async def delete_points_by_payload(self, collection_names: List[str],
+	                                   key: str, values: List[str],
+	                                   kinds: List[str] = None) -> None:
+		"""
+		Deletes all points whose payload field `key` matches one of `values`.
+
+		Args:
+			collection_names: Collections to delete the points from
+			key: Payload field name, e.g. "doc_section_id"
+			values: Payload values of the points to delete
+			kinds: Only delete points of these kinds (single collection layout)
+		"""
+		if not values:
+			return
+		payload_filter = {key: values}
+		if kinds:
+			payload_filter["kind"] = kinds
+
+		for collection_name in collection_names:
+			if not await self.store.collection_exists(collection_name):
+				continue
+			await self.store.delete(collection_name, payload_filter)
+			if self.sparse_encoder and self.sparse_encoder.enabled(collection_name):
+				await asyncio.to_thread(self.sparse_encoder.remove, collection_name, payload_filter)
+
+		activity.logger.info(
+			f"Deleted points with {key} in {len(values)} values from {len(collection_names)} collections.")
+
+	@activity.defn
+	async def create_payload_indexes(self, collection_name: str,
+	                                 field_names: List[str]) -> None:
+		"""
+		Creates keyword payload indexes for filtering on `field_names`. Existing
+		indexes are left as they are.
+		"""
+		if not await self.store.collection_exists(collection_name):
+			activity.logger.warning(
+				f"Collection {collection_name} does not exist, no payload indexes created.")
+			return
+
+		for field_name in field_names:
+			await self.store.create_payload_index(collection_name, field_name)
@@ -0,0 +1,148 @@
+import io
+import json
+import os
+from abc import ABC, abstractmethod
+from typing import Any, List
+
+from minio import Minio
+from minio.error import S3Error
+
+
+class BlobStore(ABC):
+    """
+    Minimal key/value store for intermediate pipeline data that should not be
+    carried through Temporal workflow history (staged points, embedding batches...).
+    Keys are '/'-separated paths.
+    """
+
+    @abstractmethod
+    def put(self, key: str, data: bytes) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def get(self, key: str) -> bytes:
+        raise NotImplementedError
+
+    @abstractmethod
+    def exists(self, key: str) -> bool:
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete_prefix(self, prefix: str) -> None:
+        raise NotImplementedError
+
+    def put_json(self, key: str, value: Any) -> None:
+        self.put(key, json.dumps(value).encode("utf-8"))
+
+    def get_json(self, key: str) -> Any:
+        return json.loads(self.get(key))
+
+
+class LocalBlobStore(BlobStore):
+    """Stores blobs as files below `root` (a folder shared by all workers)."""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, *key.split("/"))
+
+    def put(self, key: str, data: bytes) -> None:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def get(self, key: str) -> bytes:
+        with open(self._path(key), "rb") as f:
+            return f.read()
+
+    def exists(self, key: str) -> bool:
+        return os.path.exists(self._path(key))
+
+    def delete_prefix(self, prefix: str) -> None:
+        path = self._path(prefix)
+        if os.path.isdir(path):
+            for dirpath, _, filenames in os.walk(path, topdown=False):
+                for filename in filenames:
+                    os.remove(os.path.join(dirpath, filename))
+                os.rmdir(dirpath)
+        elif os.path.exists(path):
+            os.remove(path)
+
+
+class MinioBlobStore(BlobStore):
+    """Stores blobs as objects in a MinIO bucket below `prefix`."""
+
+    def __init__(self, minio_client: Minio, bucket_name: str, prefix: str = ""):
+        self.client = minio_client
+        self.bucket_name = bucket_name
+        self.prefix = prefix.strip("/")
+
+    def _object_name(self, key: str) -> str:
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    def put(self, key: str, data: bytes) -> None:
+        self.client.put_object(self.bucket_name, self._object_name(key),
+                               io.BytesIO(data), length=len(data))
+
+    def get(self, key: str) -> bytes:
+        response = self.client.get_object(self.bucket_name, self._object_name(key))
+        try:
+            return response.read()
+        finally:
+            response.close()
+            response.release_conn()
+
+    def exists(self, key: str) -> bool:
+        try:
+            self.client.stat_object(self.bucket_name, self._object_name(key))
+            return True
+        except S3Error as e:
+            if e.code in ("NoSuchKey", "NoSuchObject"):
+                return False
+            raise
+
+    def delete_prefix(self, prefix: str) -> None:
+        object_names: List[str] = [
+            obj.object_name for obj in self.client.list_objects(
+                self.bucket_name, prefix=self._object_name(prefix), recursive=True)
+        ]
+        for object_name in object_names:
+            self.client.remove_object(self.bucket_name, object_name)
+
+
+def create_blob_store_from_env() -> BlobStore:
+    """
+    Creates the blob store configured by BLOB_STORE_BACKEND ("minio" or "local").
+
+    minio: objects in BLOB_STORE_BUCKET (default MINIO_BUCKET_NAME) below BLOB_STORE_PREFIX
+    local: files below BLOB_STORE_ROOT, only for workers sharing that folder
+        (e.g. all on one host), the activities reading a blob may run elsewhere
+    """
+    backend = os.getenv("BLOB_STORE_BACKEND", "minio")
+    if backend == "local":
+        return LocalBlobStore(os.getenv("BLOB_STORE_ROOT", "./local_data/blobs"))
+    if backend == "minio":
+        minio_client = Minio(
+            f"{os.getenv('MINIO_ENDPOINT')}:{os.getenv('MINIO_PORT')}",
+            access_key=os.getenv("MINIO_ACCESS_KEY"),
+            secret_key=os.getenv("MINIO_SECRET_KEY"),
+            secure=False,  # Set this to True if using HTTPS
+        )
+        return MinioBlobStore(
+            minio_client,
+            os.getenv("BLOB_STORE_BUCKET", os.getenv("MINIO_BUCKET_NAME")),
+            os.getenv("BLOB_STORE_PREFIX", "blobs"),
+        )
+    raise ValueError(f"Unknown BLOB_STORE_BACKEND: {backend}")
+
+
+def staged_points_batch_key(points_key: str, batch_index: int) -> str:
+    return f"{points_key}/points/{batch_index:06d}.json"
+
+
+def staged_vectors_batch_key(points_key: str, batch_index: int) -> str:
+    return f"{points_key}/vectors/{batch_index:06d}.json"
@@ -0,0 +1,38 @@
+from typing import List, Optional
+
+from shared.cache.sqlite_cache import SQLiteLRUCache
+from shared.models.vector import Vector
+from shared.utils.hashing import normalize_text, sha256_hex
+
+
+class EmbeddingCache:
+    """
+    Content addressed embedding cache: embeddings are stored as float32 under
+    the hash of (embedding model name, normalized text).
+    """
+
+    def __init__(self, cache: SQLiteLRUCache):
+        self.cache = cache
+
+    @staticmethod
+    def key(model: str, text: str) -> str:
+        return sha256_hex(model, normalize_text(text))
+
+    def get_many(self, model: str, texts: List[str]) -> List[Optional[Vector]]:
+        keys = [self.key(model, text) for text in texts]
+        found = self.cache.get_many(keys)
+        return [
+            Vector(found[key]) if key in found else None
+            for key in keys
+        ]
+
+    def put_many(self, model: str, texts: List[str],
+                 embeddings: List[List[float]]) -> None:
+        self.cache.put_many({
+            self.key(model, text): Vector.from_floats(embedding).data
+            for text, embedding in zip(texts, embeddings)
+            if embedding
+        })
+
+    def stats(self):
+        return self.cache.stats()
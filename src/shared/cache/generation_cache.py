@@ -0,0 +1,38 @@
+import json
+from typing import Any, Dict, List, Optional
+
+from shared.cache.sqlite_cache import SQLiteLRUCache
+from shared.utils.hashing import sha256_hex
+
+
+class GenerationCache:
+    """
+    LLM generation cache: replies are stored under the hash of
+    (model, response format, rendered messages), so a byte-identical request
+    is answered without calling the LLM again.
+    """
+
+    def __init__(self, cache: SQLiteLRUCache):
+        self.cache = cache
+
+    @staticmethod
+    def key(model: str, messages: List[Dict[str, str]],
+            format: Any = None) -> str:
+        return sha256_hex(
+            model,
+            json.dumps(format, sort_keys=True),
+            json.dumps(messages, sort_keys=True, ensure_ascii=False),
+        )
+
+    def get(self, model: str, messages: List[Dict[str, str]],
+            format: Any = None) -> Optional[str]:
+        value = self.cache.get(self.key(model, messages, format))
+        return value.decode("utf-8") if value is not None else None
+
+    def put(self, model: str, messages: List[Dict[str, str]], reply: str,
+            format: Any = None) -> None:
+        self.cache.put(self.key(model, messages, format),
+                       reply.encode("utf-8"))
+
+    def stats(self):
+        return self.cache.stats()
@@ -0,0 +1,103 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+
+class MemoryLRUCache:
+    """
+    In-process counterpart of SQLiteLRUCache for hot, short-lived entries:
+    bytes values capped at `max_bytes`, least recently used entries evicted
+    first, entries older than `ttl_seconds` treated as missing.
+    `on_evict(key)` is called for every evicted or expired entry.
+    """
+
+    def __init__(self, max_bytes: int, ttl_seconds: Optional[float] = None,
+                 on_evict: Optional[Callable[[str], None]] = None):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.on_evict = on_evict
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+        self._lock = threading.Lock()
+        # key -> (value, created_at), ordered from least to most recently used
+        self._entries: "OrderedDict[str, Tuple[bytes, float]]" = OrderedDict()
+        self._total_bytes = 0
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.get_many([key]).get(key)
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, bytes]:
+        keys = list(dict.fromkeys(keys))
+        found: Dict[str, bytes] = {}
+        expired: List[str] = []
+        now = time.time()
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is None:
+                    continue
+                if self.ttl_seconds is not None and entry[1] < now - self.ttl_seconds:
+                    self._remove(key)
+                    expired.append(key)
+                    continue
+                self._entries.move_to_end(key)
+                found[key] = entry[0]
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+            self.expirations += len(expired)
+        self._notify_evicted(expired)
+        return found
+
+    def put(self, key: str, value: bytes) -> None:
+        self.put_many({key: value})
+
+    def put_many(self, items: Dict[str, bytes]) -> None:
+        evicted: List[str] = []
+        now = time.time()
+        with self._lock:
+            for key, value in items.items():
+                self._remove(key)
+                self._entries[key] = (value, now)
+                self._total_bytes += len(value)
+            while self._total_bytes > self.max_bytes and self._entries:
+                evicted.append(next(iter(self._entries)))
+                self._remove(evicted[-1])
+            self.evictions += len(evicted)
+        self._notify_evicted(evicted)
+
+    def delete_many(self, keys: Iterable[str]) -> None:
+        with self._lock:
+            for key in keys:
+                self._remove(key)
+
+    def _notify_evicted(self, keys: List[str]) -> None:
+        # outside the lock, the callback may use the cache
+        if self.on_evict:
+            for key in keys:
+                self.on_evict(key)
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._total_bytes -= len(entry[0])
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "size_bytes": self._total_bytes,
+            "max_bytes": self.max_bytes,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
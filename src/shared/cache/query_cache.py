@@ -0,0 +1,96 @@
+import json
+import threading
+from dataclasses import asdict
+from typing import Dict, List, Optional, Set
+
+from shared.cache.memory_cache import MemoryLRUCache
+from shared.models.retrieval import Passage
+from shared.models.vector import Vector
+from shared.utils.hashing import normalize_text, sha256_hex
+
+
+class QueryEmbeddingCache:
+    """
+    Query embeddings stored as float32 under the hash of (embedding model,
+    normalized question), so repeated questions skip the embedding model.
+    """
+
+    def __init__(self, cache: MemoryLRUCache):
+        self.cache = cache
+
+    @staticmethod
+    def key(model: str, question: str) -> str:
+        return sha256_hex(model, normalize_text(question))
+
+    def get(self, model: str, question: str) -> Optional[List[float]]:
+        value = self.cache.get(self.key(model, question))
+        return Vector(value).tolist() if value is not None else None
+
+    def put(self, model: str, question: str, embedding: List[float]) -> None:
+        self.cache.put(self.key(model, question), Vector.from_floats(embedding).data)
+
+    def stats(self):
+        return self.cache.stats()
+
+
+class SearchResultCache:
+    """
+    Ranked passages stored under (query embedding bucket, search settings).
+    The bucket is the embedding rounded to `bucket_decimals`, so questions
+    that only differ in ways the embedding model ignores share an entry.
+
+    Entries are dropped when a model is re-ingested (`invalidate_model`): the
+    ones filtered on that model and all unfiltered ones, whose ranking could
+    now include the new points. The cache lives in the process of one
+    retrieval worker and the invalidation activity reaches only one of them,
+    with several workers the others serve stale results until their TTL.
+    """
+
+    def __init__(self, cache: MemoryLRUCache, bucket_decimals: int = 3):
+        self.cache = cache
+        self.cache.on_evict = self._forget
+        self.bucket_decimals = bucket_decimals
+        self._lock = threading.Lock()
+        # model_id filter (None: all models) -> keys of the cached results
+        self._keys_by_model: Dict[Optional[str], Set[str]] = {}
+        self._model_by_key: Dict[str, Optional[str]] = {}
+
+    def key(self, embedding: List[float], settings: Dict) -> str:
+        bucket = ",".join(f"{value:.{self.bucket_decimals}f}" for value in embedding)
+        return sha256_hex(bucket, json.dumps(settings, sort_keys=True))
+
+    def get(self, key: str) -> Optional[List[Passage]]:
+        value = self.cache.get(key)
+        if value is None:
+            return None
+        return [Passage(**passage) for passage in json.loads(value)]
+
+    def put(self, key: str, model_id: Optional[str], passages: List[Passage]) -> None:
+        # registered first, so an eviction right after the put forgets it
+        with self._lock:
+            self._keys_by_model.setdefault(model_id, set()).add(key)
+            self._model_by_key[key] = model_id
+        self.cache.put(key, json.dumps([asdict(passage) for passage in passages]).encode("utf-8"))
+
+    def _forget(self, key: str) -> None:
+        """Drops an evicted or expired key from the model index."""
+        with self._lock:
+            if key not in self._model_by_key:
+                return
+            model_id = self._model_by_key.pop(key)
+            keys = self._keys_by_model.get(model_id)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_model[model_id]
+
+    def invalidate_model(self, model_id: str) -> int:
+        with self._lock:
+            keys = self._keys_by_model.pop(model_id, set()) | self._keys_by_model.pop(None, set())
+            for key in keys:
+                self._model_by_key.pop(key, None)
+        self.cache.delete_many(keys)
+        return len(keys)
+
+    def stats(self):
+        return self.cache.stats()
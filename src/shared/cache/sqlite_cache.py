@@ -0,0 +1,142 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, Optional
+
+
+class SQLiteLRUCache:
+    """
+    Persistent key/value cache of bytes in a single SQLite file, capped at
+    `max_bytes` of stored values. When the cap is exceeded, the least recently
+    used entries are evicted. With `ttl_seconds`, entries older than the TTL
+    are treated as missing and removed.
+    """
+
+    def __init__(self, path: str, max_bytes: int,
+                 ttl_seconds: Optional[float] = None):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False,
+                                           isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " key TEXT PRIMARY KEY,"
+            " value BLOB NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " last_access REAL NOT NULL,"
+            " created_at REAL NOT NULL)"
+        )
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access)")
+        self._total_bytes = self._connection.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.get_many([key]).get(key)
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, bytes]:
+        keys = list(dict.fromkeys(keys))
+        found: Dict[str, bytes] = {}
+        with self._lock:
+            if self.ttl_seconds is not None:
+                self._expire()
+            # stay below SQLite's host parameter limit
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._connection.execute(
+                    f"SELECT key, value FROM entries WHERE key IN ({placeholders})",
+                    batch).fetchall()
+                found.update(rows)
+                if rows:
+                    self._connection.execute(
+                        f"UPDATE entries SET last_access = ? WHERE key IN "
+                        f"({','.join('?' * len(rows))})",
+                        [time.time(), *[row[0] for row in rows]])
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def put(self, key: str, value: bytes) -> None:
+        self.put_many({key: value})
+
+    def put_many(self, items: Dict[str, bytes]) -> None:
+        if not items:
+            return
+        now = time.time()
+        with self._lock:
+            total_bytes, evictions = self._total_bytes, self.evictions
+            self._connection.execute("BEGIN")
+            try:
+                for key, value in items.items():
+                    previous = self._connection.execute(
+                        "SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+                    if previous:
+                        self._total_bytes -= previous[0]
+                    self._connection.execute(
+                        "INSERT OR REPLACE INTO entries (key, value, size, last_access, created_at) "
+                        "VALUES (?, ?, ?, ?, ?)", (key, value, len(value), now, now))
+                    self._total_bytes += len(value)
+                self._evict()
+                self._connection.execute("COMMIT")
+            except BaseException:
+                # e.g. disk full, keep the counters in line with the rolled back file
+                self._connection.execute("ROLLBACK")
+                self._total_bytes, self.evictions = total_bytes, evictions
+                raise
+
+    def _expire(self) -> None:
+        cutoff = time.time() - self.ttl_seconds
+        expired = self._connection.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries WHERE created_at < ?",
+            (cutoff,)).fetchone()
+        if expired[0]:
+            self._connection.execute(
+                "DELETE FROM entries WHERE created_at < ?", (cutoff,))
+            self.expirations += expired[0]
+            self._total_bytes -= expired[1]
+
+    def _evict(self) -> None:
+        while self._total_bytes > self.max_bytes:
+            rows = self._connection.execute(
+                "SELECT key, size FROM entries ORDER BY last_access LIMIT 256"
+            ).fetchall()
+            if not rows:
+                self._total_bytes = 0
+                return
+            for key, size in rows:
+                self._connection.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self._total_bytes -= size
+                self.evictions += 1
+                if self._total_bytes <= self.max_bytes:
+                    return
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "size_bytes": self._total_bytes,
+            "max_bytes": self.max_bytes,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
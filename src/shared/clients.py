@@ -1,10 +1,10 @@
+import asyncio
 import json
 from dataclasses import asdict
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional, Union
 
+import httpx
 import instructor
-import ollama
-import requests
 from langchain_core.messages import BaseMessage
 from langchain_ollama import ChatOllama
 from openai import OpenAI
@@ -33,14 +33,107 @@ from pydantic import BaseModel
 #         return response.status_code == 200
 
 
-class OllamaClient:
-    def __init__(self, base_url: str, default_model: str):
-        self.client = ollama.Client(host=base_url)
+def batch_texts(texts: List[str], max_batch_size: int,
+                max_batch_chars: int) -> List[List[int]]:
+    """
+    Groups the indices of non-empty texts into batches for a single embedding request.
+
+    A batch holds at most `max_batch_size` texts and at most `max_batch_chars`
+    characters in total; a text longer than `max_batch_chars` gets a batch of its own.
+
+    Args:
+        texts: Input texts
+        max_batch_size: Maximum number of texts per batch
+        max_batch_chars: Maximum total number of characters per batch
+
+    Returns:
+        List[List[int]]: Batches of indices into `texts`, in input order
+    """
+    batches: List[List[int]] = []
+    batch: List[int] = []
+    batch_chars = 0
+    for i, text in enumerate(texts):
+        if not text:
+            continue
+        if batch and (len(batch) >= max_batch_size
+                      or batch_chars + len(text) > max_batch_chars):
+            batches.append(batch)
+            batch, batch_chars = [], 0
+        batch.append(i)
+        batch_chars += len(text)
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+class AsyncOllamaHTTPClient:
+    """
+    Non-blocking client for the Ollama REST API. All requests of one worker
+    process share a pool of keep-alive connections, so many LLM calls can be in
+    flight at the same time without blocking the event loop.
+    """
+
+    def __init__(self, base_url: str, max_connections: int = 10,
+                 timeout: float = 300.0, connect_timeout: float = 10.0):
+        self.base_url = base_url
+        self.client = httpx.AsyncClient(
+            base_url=base_url,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections
+            ),
+            timeout=httpx.Timeout(timeout, connect=connect_timeout),
+        )
+
+    async def _post(self, path: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Sends a POST request to the Ollama API.
+
+        Args:
+            path: API path, e.g. "/api/chat"
+            payload: JSON request body
+
+        Returns:
+            Dict[str, Any]: Decoded JSON response
+        """
+        response = await self.client.post(path, json=payload)
+        response.raise_for_status()
+        return response.json()
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
+
+
+class OllamaClient(AsyncOllamaHTTPClient):
+    def __init__(self, base_url: str, default_model: str,
+                 max_batch_size: int = 32, max_batch_chars: int = 32000,
+                 max_connections: int = 10, timeout: float = 300.0):
+        super().__init__(base_url, max_connections=max_connections,
+                         timeout=timeout)
         self.default_model = default_model
+        self.max_batch_size = max_batch_size
+        self.max_batch_chars = max_batch_chars
+
+    async def chat(self, messages: List[Dict[str, str]],
+                   model: Optional[str] = None,
+                   format: Optional[Union[str, Dict[str, Any]]] = None) -> str:
+        """
+        Sends a chat request and returns the reply text.
 
-    async def chat(self, model: str, messages: List[Dict[str, str]]) -> str:
-        ai_msg = self.client.chat(model, messages, stream=False)
-        return ai_msg
+        Args:
+            messages: Chat messages
+            model: Model name, defaults to `default_model`
+            format: "json" or a JSON schema the reply has to conform to
+        """
+        payload = {
+            "model": model or self.default_model,
+            "messages": messages,
+            "stream": False,
+        }
+        if format:
+            payload["format"] = format
+        result = await self._post("/api/chat", payload)
+        return result["message"]["content"]
 
     async def compute_embedding(self, text: str) -> List[float]:
         """
@@ -52,21 +145,49 @@ class OllamaClient:
         Returns:
             List[float]: Vector embedding representation of the input text
         """
-        response = self.client.embeddings(
-            model=self.default_model,
-            prompt=text
-        )
-        return response["embedding"]
+        result = await self._post("/api/embed", {
+            "model": self.default_model,
+            "input": text,
+        })
+        return result["embeddings"][0]
 
+    async def compute_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """
+        Computes embeddings for many texts, sending a whole batch of inputs per
+        Ollama request (see `batch_texts`). The batch requests are sent
+        concurrently over the connection pool.
+
+        Args:
+            texts: Input texts to generate embeddings for
 
-class OllamaJSONClient:
-    def __init__(self, model: str, base_url: str):
+        Returns:
+            List[List[float]]: One embedding per input text, in input order.
+            Empty texts are not sent to Ollama and get an empty embedding.
+        """
+        batches = batch_texts(texts, self.max_batch_size, self.max_batch_chars)
+        results = await asyncio.gather(*[
+            self._post("/api/embed", {
+                "model": self.default_model,
+                "input": [texts[i] for i in batch],
+            })
+            for batch in batches
+        ])
+
+        embeddings: List[List[float]] = [[] for _ in texts]
+        for batch, result in zip(batches, results):
+            for i, embedding in zip(batch, result["embeddings"]):
+                embeddings[i] = embedding
+        return embeddings
+
+
+class OllamaJSONClient(AsyncOllamaHTTPClient):
+    def __init__(self, model: str, base_url: str, max_connections: int = 10,
+                 timeout: float = 300.0):
+        super().__init__(base_url, max_connections=max_connections,
+                         timeout=timeout)
         self.model = model
-        self.base_url = base_url
 
     async def reply_with_json(self, messages: List[Dict[str, str]]) -> Dict[str, Any]:
-        url = f"{self.base_url}/api/chat"
-
         payload = {
             "model": self.model,
             "messages": messages,
@@ -74,19 +195,15 @@ class OllamaJSONClient:
             "format": "json",
         }
 
-        response = requests.post(url, json=payload)
-        response.raise_for_status()
+        result = await self._post("/api/chat", payload)
 
         try:
-            result = response.json()
             json_response = json.loads(result["message"]["content"])
             return json_response
         except json.JSONDecodeError:
             raise ValueError("The response from Ollama was not valid JSON.")
 
-    def generate(self, prompt: str, response_model: Dict[str, Any]) -> Dict[str, Any]:
-        url = f"{self.base_url}/api/generate"
-
+    async def generate(self, prompt: str, response_model: Dict[str, Any]) -> Dict[str, Any]:
         system_prompt = f"""You are a helpful AI assistant. 
         Respond to the user's request with a JSON object matching this structure:
         {json.dumps(response_model, indent=2)}
@@ -99,11 +216,9 @@ class OllamaJSONClient:
             "format": "json",
         }
 
-        response = requests.post(url, json=payload)
-        response.raise_for_status()
+        result = await self._post("/api/generate", payload)
 
         try:
-            result = response.json()
             json_response = json.loads(result["response"])
             return json_response
         except json.JSONDecodeError:
@@ -0,0 +1,206 @@
+import hashlib
+import os
+import queue
+import tarfile
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import zstandard
+
+# Code folders can be backed up as one tar.zst archive instead of one object
+# per file. The archive is a sequence of independent zstd frames that only
+# end between tar members, so it decompresses as a whole with any zstd tool
+# and single members can be range-read through the index stored next to it.
+
+# uncompressed bytes after which the next member starts a new frame
+FRAME_SIZE = 1024 * 1024
+READ_BLOCK_SIZE = 1024 * 1024
+INDEX_FORMAT = 1
+
+
+def archive_index_object_name(archive_object_name: str) -> str:
+    return f"{archive_object_name}.index.json"
+
+
+class FramedZstdWriter:
+    """
+    File-like writer compressing into consecutive zstd frames and passing
+    the compressed bytes to `sink`. Records the compressed offset and
+    length and the uncompressed offset and length of every frame.
+    """
+
+    def __init__(self, sink: Callable[[bytes], None], level: int = 3):
+        self.sink = sink
+        self.compressor = zstandard.ZstdCompressor(level=level)
+        self.compressobj = None
+        self.frames: List[Dict[str, int]] = []
+        self.position = 0
+        self.compressed_position = 0
+        self.frame_position = 0
+        self.frame_compressed_position = 0
+
+    def tell(self) -> int:
+        return self.position
+
+    def frame_size(self) -> int:
+        """Uncompressed bytes written to the current frame."""
+        return self.position - self.frame_position
+
+    def _emit(self, data: bytes) -> None:
+        if data:
+            self.sink(data)
+            self.compressed_position += len(data)
+
+    def write(self, data: bytes) -> None:
+        if self.compressobj is None:
+            self.compressobj = self.compressor.compressobj()
+            self.frame_position = self.position
+            self.frame_compressed_position = self.compressed_position
+        self._emit(self.compressobj.compress(data))
+        self.position += len(data)
+
+    def end_frame(self) -> None:
+        if self.compressobj is None:
+            return
+        self._emit(self.compressobj.flush(zstandard.COMPRESSOBJ_FLUSH_FINISH))
+        self.compressobj = None
+        self.frames.append({
+            "offset": self.frame_compressed_position,
+            "length": self.compressed_position - self.frame_compressed_position,
+            "uncompressed_offset": self.frame_position,
+            "uncompressed_length": self.position - self.frame_position,
+        })
+
+    def close(self) -> None:
+        self.end_frame()
+
+
+def write_tar(writer: FramedZstdWriter, files: Iterable[Tuple[str, str]]) -> List[Dict[str, Any]]:
+    """
+    Writes the (member name, path) files as a tar stream, reading each file
+    in blocks. Returns per member its name, size, SHA-256, frame and the
+    offset of its data within the uncompressed frame.
+    """
+    members = []
+    for name, path in files:
+        if writer.frame_size() >= FRAME_SIZE:
+            writer.end_frame()
+        stat = os.stat(path)
+        info = tarfile.TarInfo(name)
+        info.size = stat.st_size
+        info.mtime = int(stat.st_mtime)
+        info.mode = stat.st_mode & 0o7777
+        writer.write(info.tobuf(tarfile.PAX_FORMAT, "utf-8", "surrogateescape"))
+
+        frame, offset = len(writer.frames), writer.frame_size()
+        digest, size = hashlib.sha256(), 0
+        with open(path, "rb") as f:
+            while size < info.size and (block := f.read(min(READ_BLOCK_SIZE, info.size - size))):
+                digest.update(block)
+                writer.write(block)
+                size += len(block)
+        if size != info.size:
+            raise ValueError(f"{path} changed while it was archived")
+        if size % tarfile.BLOCKSIZE:
+            writer.write(tarfile.NUL * (tarfile.BLOCKSIZE - size % tarfile.BLOCKSIZE))
+        members.append({"name": name, "size": size, "sha256": digest.hexdigest(),
+                        "frame": frame, "offset": offset})
+
+    # end of archive marker
+    writer.write(tarfile.NUL * (2 * tarfile.BLOCKSIZE))
+    writer.close()
+    return members
+
+
+class _Pipe:
+    """
+    Bounded pipe between a thread writing chunks and a reader expecting a
+    file-like `read(size)`, such as Minio.put_object. Errors of the writer
+    are raised to the reader, a closed reader stops the writer.
+    """
+    _EOF = object()
+
+    def __init__(self, max_chunks: int = 64):
+        self.chunks = queue.Queue(max_chunks)
+        self.buffer = bytearray()
+        self.eof = False
+        self.reader_closed = threading.Event()
+
+    def write(self, data: bytes) -> None:
+        while True:
+            if self.reader_closed.is_set():
+                raise BrokenPipeError("The archive reader stopped")
+            try:
+                self.chunks.put(data, timeout=1)
+                return
+            except queue.Full:
+                pass
+
+    def finish(self, error: Optional[BaseException] = None) -> None:
+        try:
+            self.write(error or self._EOF)
+        except BrokenPipeError:
+            pass
+
+    def read(self, size: int = -1) -> bytes:
+        while not self.eof and (size < 0 or len(self.buffer) < size):
+            chunk = self.chunks.get()
+            if chunk is self._EOF:
+                self.eof = True
+            elif isinstance(chunk, BaseException):
+                raise chunk
+            else:
+                self.buffer += chunk
+        size = len(self.buffer) if size < 0 else min(size, len(self.buffer))
+        data = bytes(self.buffer[:size])
+        del self.buffer[:size]
+        return data
+
+    def close(self) -> None:
+        self.reader_closed.set()
+
+
+def stream_tar_zst(files: Iterable[Tuple[str, str]], upload: Callable[[Any], None],
+                   level: int = 3) -> Dict[str, Any]:
+    """
+    Streams the files as a tar.zst into `upload`, called with a file-like
+    object to read the archive from (e.g. a multipart upload), while a
+    thread archives the files. Nothing but a bounded number of compressed
+    chunks is held in memory. Returns the index of the archive.
+    """
+    pipe = _Pipe()
+    index: Dict[str, Any] = {"format": INDEX_FORMAT}
+
+    def archive():
+        try:
+            writer = FramedZstdWriter(pipe.write, level=level)
+            index["members"] = write_tar(writer, files)
+            index["frames"] = writer.frames
+            index["size"] = writer.compressed_position
+            pipe.finish()
+        except BaseException as e:
+            pipe.finish(e)
+
+    thread = threading.Thread(target=archive, name="tar-zst-archiver", daemon=True)
+    thread.start()
+    try:
+        upload(pipe)
+    finally:
+        pipe.close()
+        thread.join()
+    return index
+
+
+def read_member(index: Dict[str, Any], name: str, read_range: Callable[[int, int], bytes]) -> bytes:
+    """
+    Reads one member of an archive by decompressing only its frame, fetched
+    with `read_range(offset, length)` (e.g. a ranged GET).
+    """
+    member = next((member for member in index["members"] if member["name"] == name), None)
+    if member is None:
+        raise KeyError(f"{name} is not in the archive")
+    # frames end between members, so a member is within one frame
+    frame = index["frames"][member["frame"]]
+    data = zstandard.ZstdDecompressor().decompress(
+        read_range(frame["offset"], frame["length"]), max_output_size=frame["uncompressed_length"])
+    return data[member["offset"]:member["offset"] + member["size"]]
@@ -7,6 +7,10 @@ OLLAMA_EMBEDDING_TASK_QUEUE = "ollama-embedding-queue"
 OLLAMA_GENERATE_TASK_QUEUE = "ollama-generate-queue"
 BACKUP_TASK_QUEUE = "backup-queue"
 MINIO_TASK_QUEUE = "minio-queue"
+RETRIEVAL_TASK_QUEUE = "retrieval-queue"
+
+# Vector collection of all ModelDoc points in the "single" collection layout
+MODEL_DOC_POINTS_COLLECTION = "ModelDocPoints"
 
 TASK_QUEUE_COMSES_SPAM_CHECK = "spam_check_queue"
 
@@ -0,0 +1,147 @@
+import asyncio
+import dataclasses
+import os
+from typing import Any, List, Optional, Sequence, Type
+
+import temporalio.converter
+import zstandard
+from temporalio.api.common.v1 import Payload
+from temporalio.converter import AdvancedJSONEncoder, CompositePayloadConverter, \
+    DataConverter, DefaultPayloadConverter, JSONPlainPayloadConverter, \
+    JSONTypeConverter, PayloadCodec
+
+from shared.blob_store import BlobStore, create_blob_store_from_env
+from shared.models.vector import Vector
+from shared.utils.hashing import sha256_hex
+
+ZSTD_ENCODING = b"binary/zstd"
+CLAIM_CHECK_ENCODING = b"binary/claim-check"
+
+
+class VectorJSONEncoder(AdvancedJSONEncoder):
+    """Encodes Vectors as base64 packed floats instead of JSON float lists."""
+
+    def default(self, o: Any) -> Any:
+        if isinstance(o, Vector):
+            return o.to_json()
+        return super().default(o)
+
+
+class VectorTypeConverter(JSONTypeConverter):
+    def to_typed_value(self, hint: Type, value: Any) -> Any:
+        if hint is Vector:
+            return Vector.from_json(value)
+        return JSONTypeConverter.Unhandled
+
+
+class VectorJSONPayloadConverter(JSONPlainPayloadConverter):
+    def __init__(self):
+        super().__init__(encoder=VectorJSONEncoder,
+                         custom_type_converters=[VectorTypeConverter()])
+
+
+class PayloadConverter(CompositePayloadConverter):
+    """Default payload converter with Vector support in the JSON converter."""
+
+    def __init__(self):
+        super().__init__(*[
+            VectorJSONPayloadConverter()
+            if isinstance(converter, JSONPlainPayloadConverter) else converter
+            for converter in DefaultPayloadConverter.default_encoding_payload_converters
+        ])
+
+
+def claim_check_key(digest: str) -> str:
+    return f"payloads/{digest[:2]}/{digest}"
+
+
+class CompressionClaimCheckCodec(PayloadCodec):
+    """
+    Compresses payloads with zstd and offloads large ones to the blob store.
+
+    Payloads smaller than `compression_min_bytes` are passed through. Compressed
+    payloads still larger than `claim_check_min_bytes` are stored in the blob
+    store by content hash and only the key is written into workflow history.
+    Claim-checked blobs are never deleted by the codec, they are shared by
+    every history referencing the same content.
+    """
+
+    def __init__(
+        self,
+        blob_store: Optional[BlobStore],
+        compression_min_bytes: int = 1024,
+        claim_check_min_bytes: int = 128 * 1024,
+        zstd_level: int = 3,
+    ):
+        self.blob_store = blob_store
+        self.compression_min_bytes = compression_min_bytes
+        self.claim_check_min_bytes = claim_check_min_bytes
+        self.zstd_level = zstd_level
+
+    async def encode(self, payloads: Sequence[Payload]) -> List[Payload]:
+        return [await self.encode_payload(p) for p in payloads]
+
+    async def decode(self, payloads: Sequence[Payload]) -> List[Payload]:
+        return [await self.decode_payload(p) for p in payloads]
+
+    async def encode_payload(self, payload: Payload) -> Payload:
+        data = payload.SerializeToString()
+        if len(data) < self.compression_min_bytes:
+            return payload
+
+        compressed = zstandard.ZstdCompressor(level=self.zstd_level).compress(data)
+        if self.blob_store is None or len(compressed) < self.claim_check_min_bytes:
+            return Payload(metadata={"encoding": ZSTD_ENCODING}, data=compressed)
+
+        key = claim_check_key(sha256_hex(compressed))
+        await asyncio.to_thread(self.put_if_absent, key, compressed)
+        return Payload(metadata={"encoding": CLAIM_CHECK_ENCODING}, data=key.encode("utf-8"))
+
+    async def decode_payload(self, payload: Payload) -> Payload:
+        encoding = payload.metadata.get("encoding", b"")
+        if encoding == ZSTD_ENCODING:
+            compressed = payload.data
+        elif encoding == CLAIM_CHECK_ENCODING:
+            if self.blob_store is None:
+                raise ValueError("Claim-checked payload received but no blob store is configured")
+            compressed = await asyncio.to_thread(self.blob_store.get, payload.data.decode("utf-8"))
+        else:
+            return payload
+
+        return Payload.FromString(zstandard.ZstdDecompressor().decompress(compressed))
+
+    def put_if_absent(self, key: str, data: bytes) -> None:
+        # keys are content hashes, an existing blob already holds the same bytes
+        if not self.blob_store.exists(key):
+            self.blob_store.put(key, data)
+
+
+def create_data_converter(codec: Optional[PayloadCodec]) -> DataConverter:
+    return dataclasses.replace(
+        temporalio.converter.default(),
+        payload_converter_class=PayloadConverter,
+        payload_codec=codec,
+    )
+
+
+def create_data_converter_from_env() -> DataConverter:
+    """
+    Creates the data converter shared by every worker and client. All of them
+    must use the same settings, otherwise they can't read each other's payloads.
+
+    PAYLOAD_CODEC_ENABLED: compress payloads with zstd (default true)
+    PAYLOAD_COMPRESSION_MIN_BYTES: smaller payloads are left untouched
+    PAYLOAD_CLAIM_CHECK_MIN_BYTES: larger compressed payloads go to the blob store (0 disables)
+    PAYLOAD_ZSTD_LEVEL: zstd compression level
+    """
+    if os.getenv("PAYLOAD_CODEC_ENABLED", "true").lower() != "true":
+        return create_data_converter(None)
+
+    claim_check_min_bytes = int(os.getenv("PAYLOAD_CLAIM_CHECK_MIN_BYTES", str(128 * 1024)))
+    codec = CompressionClaimCheckCodec(
+        blob_store=create_blob_store_from_env() if claim_check_min_bytes > 0 else None,
+        compression_min_bytes=int(os.getenv("PAYLOAD_COMPRESSION_MIN_BYTES", "1024")),
+        claim_check_min_bytes=claim_check_min_bytes,
+        zstd_level=int(os.getenv("PAYLOAD_ZSTD_LEVEL", "3")),
+    )
+    return create_data_converter(codec)
@@ -0,0 +1,65 @@
+import hashlib
+import json
+import re
+from typing import Any, Dict, List, Optional
+
+# Model backups are content addressed: every file is stored once as a blob
+# named by its SHA-256, and every backed up version of a model is a manifest
+# mapping the file paths to blob hashes.
+BLOBS_PREFIX = "blobs/sha256"
+# code folders backed up as one tar.zst archive, named by the digest of their files
+ARCHIVES_PREFIX = "archives/sha256"
+MANIFESTS_PREFIX = "manifests"
+LATEST_VERSION = "latest"
+MANIFEST_FORMAT = 1
+
+
+def blob_shard_prefix(sha256: str) -> str:
+    """Prefix of the blobs sharing the first byte of their hash."""
+    return f"{BLOBS_PREFIX}/{sha256[:2]}/"
+
+
+def blob_object_name(sha256: str) -> str:
+    return f"{blob_shard_prefix(sha256)}{sha256}"
+
+
+def archive_object_name(digest: str) -> str:
+    return f"{ARCHIVES_PREFIX}/{digest[:2]}/{digest}.tar.zst"
+
+
+def manifest_object_name(model_slug: str, version: str = LATEST_VERSION) -> str:
+    return f"{MANIFESTS_PREFIX}/{model_slug}/{version}.json"
+
+
+def files_digest(files: List[Dict[str, Any]]) -> str:
+    """Hash of the paths and contents of manifest files, independent of their order."""
+    digest = hashlib.sha256()
+    for file in sorted(files, key=lambda file: file["path"]):
+        digest.update(f"{file['path']}\0{file['sha256']}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def codemeta_version(metadata_json_path: str) -> Optional[str]:
+    """The "version" of a codemeta.json file, if it has one."""
+    try:
+        with open(metadata_json_path, "r", encoding="utf-8") as f:
+            version = json.load(f).get("version")
+    except (OSError, ValueError, AttributeError):
+        return None
+    return str(version) if version else None
+
+
+def build_manifest(model_slug: str, version: Optional[str], files: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Manifest of one backed up version. Versions without a name (no codemeta
+    version) are named by the digest of their files, so backing up the same
+    files twice yields the same manifest.
+    """
+    digest = files_digest(files)
+    return {
+        "format": MANIFEST_FORMAT,
+        "model_slug": model_slug,
+        "version": re.sub(r"[^\w.\-]+", "-", version) if version else digest[:16],
+        "digest": digest,
+        "files": sorted(files, key=lambda file: file["path"]),
+    }
@@ -1,4 +1,4 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import List, Optional
 
 from shared.models.model_metadata import ModelMetadata
@@ -44,6 +44,9 @@ class Chunk:
   # List of Q&A about the chunk: [{"question": "A question about the content of the chunk"], "answer": "Answer to the question."}] #llmgenerated
   qas: Optional[List[ChunkQA]] = None
 
+  # sha256 of the chunk content, used to detect changes on re-ingestion
+  content_hash: Optional[str] = None
+
 @dataclass
 class DocSection:
   id: str
@@ -74,6 +77,9 @@ class DocSection:
   parent: Optional['DocSection'] = None
   children: Optional[List['DocSection']] = None
 
+  # sha256 of level, title and content, used to detect changes on re-ingestion
+  content_hash: Optional[str] = None
+
 @dataclass
 class ModelDoc:
   id: str
@@ -91,6 +97,18 @@ class ModelDoc:
   markdown_object_name: Optional[str] = None
   original_source_object_name: Optional[str] = None
 
+@dataclass
+class ModelDocDiff:
+  # new DocSections and DocSections whose content_hash changed -> enrich, save and embed
+  changed_doc_section_ids: List[str]
+  # persisted DocSections that are no longer part of the ModelDoc -> delete
+  stale_doc_section_ids: List[str]
+  # persisted Chunks of changed and stale DocSections -> delete
+  stale_chunk_ids: List[str]
+
+  def is_empty(self) -> bool:
+    return not (self.changed_doc_section_ids or self.stale_doc_section_ids)
+
 # Analog to CoMSES Codebase
 @dataclass
 class Model:
@@ -101,10 +119,32 @@ class Model:
   docs: ModelDoc
   # code: ModelCode
 
+@dataclass
+class IngestOptions:
+  # write embedding batches to the vector store as they are produced, so the
+  # embedding workflow history only carries a cursor instead of all vectors
+  stream_embeddings: bool = True
+  # "separate": summary and QAs are generated by separate LLM calls
+  # "combined": summary and QAs are generated by one JSON schema constrained LLM call
+  enrichment_mode: str = "separate"
+  # only enrich, save and embed DocSections that are new or changed since the last ingest
+  incremental: bool = True
+  # don't embed and upsert points whose stored content_hash (text, payload and
+  # embedding model) matches, disable to re-embed everything
+  skip_unchanged_points: bool = True
+  # "separate": one vector collection per point kind (Chunks, ChunkQuestions, ...)
+  # "single": all ModelDoc points in one collection, told apart by the "kind" payload
+  collection_layout: str = "separate"
+  # "blobs": every code file is backed up as a content addressed blob
+  # "archive": the code folder is streamed into one tar.zst archive, for folders of many tiny files
+  code_backup_mode: str = "blobs"
+
 @dataclass
 class IngestModelInput:
   model_id: str # this should be set externally -> uuid.UUID
   model_slug: str  # used for workflow ids, minio object names
   original_file_path: str  # pdf documentation file
   metadata_json_path: str  # codemeta.json
-  code_folder_path: Optional[str] = None  # folder with code source files
\ No newline at end of file
+  code_folder_path: Optional[str] = None  # folder with code source files
+  version: Optional[str] = None  # release of the model, defaults to the codemeta version
+  options: IngestOptions = field(default_factory=IngestOptions)
\ No newline at end of file
@@ -0,0 +1,33 @@
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+
+@dataclass
+class RetrievalQuery:
+  question: str
+  limit: int = 10  # number of fused passages returned
+  per_collection_limit: int = 20  # candidates fetched from every collection
+  model_id: Optional[str] = None  # restrict to the points of one model
+  collections: Optional[List[str]] = None  # defaults to RETRIEVAL_COLLECTIONS
+  hybrid: bool = True  # also rank the hybrid collections by their BM25 sparse vectors
+
+@dataclass
+class Passage:
+  # "chunk", "doc_section" or "model_doc", the level results are deduplicated on
+  type: str
+  id: str
+  model_id: str
+  doc_section_id: Optional[str]
+  content: str
+  score: float  # reciprocal rank fusion score
+  # collections (and "<collection>:bm25" for sparse searches) that contributed
+  # to the passage with the rank in each of them
+  ranks: Dict[str, int] = field(default_factory=dict)
+
+@dataclass
+class RetrievalResult:
+  passages: List[Passage]
+  # latency of every stage (embed, search, fuse, hydrate) and the total in ms
+  timings_ms: Dict[str, float] = field(default_factory=dict)
+  # caches that answered the query ("query_embedding", "search_results")
+  cache_hits: List[str] = field(default_factory=list)
@@ -0,0 +1,57 @@
+import hashlib
+import json
+import re
+import uuid
+import unicodedata
+
+_WHITESPACE_RE = re.compile(r"\s+")
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normalizes text for content addressing: NFC unicode form, collapsed
+    whitespace, stripped ends. Case is kept since it can change the meaning
+    for embedding models.
+    """
+    return _WHITESPACE_RE.sub(" ", unicodedata.normalize("NFC", text)).strip()
+
+
+def sha256_hex(*parts: str) -> str:
+    """sha256 hex digest of the given strings, separated by NUL bytes."""
+    digest = hashlib.sha256()
+    for i, part in enumerate(parts):
+        if i:
+            digest.update(b"\0")
+        digest.update(part.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def point_content_hash(embedding_model: str, text: str, payload: dict) -> str:
+    """
+    Hash of everything a stored vector point is derived from: the embedding
+    model (and vector dtype), the embedded text and the payload.
+    """
+    return sha256_hex(embedding_model, text, json.dumps(payload, sort_keys=True, default=str))
+
+
+def sha256_file(path: str) -> str:
+    """sha256 hex digest of a file, read in blocks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while block := f.read(HASH_BLOCK_SIZE):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def stable_id(namespace: str, *parts: str) -> str:
+    """Deterministic UUID (v5) for the given parts within `namespace`."""
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, sha256_hex(namespace, *parts)))
+
+
+def vector_point_id(collection_name: str, model_id: str, source_id: str) -> str:
+    """
+    Vector store point id (Qdrant only accepts UUIDs and integers) for the
+    point built from `source_id` of a model, unique across collections.
+    """
+    return stable_id("vector-point", collection_name, model_id, source_id)
@@ -0,0 +1,34 @@
+from typing import Any, List, Sequence
+
+# bind parameters of one statement, Postgres allows at most 65535
+MAX_BULK_PARAMETERS = 32000
+
+
+async def bulk_insert(transaction, table: str, columns: Sequence[str],
+                      rows: List[Sequence[Any]], update_columns: Sequence[str] = (),
+                      conflict_columns: Sequence[str] = ("id",)) -> None:
+    """
+    Inserts rows through a Prisma client (or transaction) with one multi-row
+    INSERT per MAX_BULK_PARAMETERS parameters. Rows conflicting on
+    `conflict_columns` are skipped, or updated with `update_columns`, which
+    keeps the rows referencing them (e.g. child DocSections) valid.
+    """
+    rows_per_statement = max(1, MAX_BULK_PARAMETERS // len(columns))
+    column_list = ", ".join(f'"{column}"' for column in columns)
+    conflict_list = ", ".join(f'"{column}"' for column in conflict_columns)
+    on_conflict = f" ON CONFLICT ({conflict_list}) DO NOTHING"
+    if update_columns:
+        on_conflict = f" ON CONFLICT ({conflict_list}) DO UPDATE SET " + ", ".join(
+            [f'"{column}" = EXCLUDED."{column}"' for column in update_columns]
+            + ['"updated_at" = now()'])
+
+    for start in range(0, len(rows), rows_per_statement):
+        batch = rows[start:start + rows_per_statement]
+        values = ", ".join(
+            "(" + ", ".join(f"${row_index * len(columns) + column_index + 1}"
+                            for column_index in range(len(columns))) + ")"
+            for row_index in range(len(batch))
+        )
+        await transaction.execute_raw(
+            f'INSERT INTO "{table}" ({column_list}) VALUES {values}{on_conflict}',
+            *[value for row in batch for value in row])
@@ -0,0 +1,70 @@
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from shared.models.vector import SparseVector, VectorPoint
+
+# payload field -> accepted values, all fields have to match
+PayloadFilter = Dict[str, List[str]]
+# name of the sparse (BM25) vector next to the unnamed dense vector
+SPARSE_VECTOR_NAME = "bm25"
+
+
+@dataclass
+class StoredPoint:
+    id: str
+    payload: Dict[str, Any]
+
+
+@dataclass
+class SearchHit:
+    id: str
+    score: float
+    payload: Dict[str, Any]
+
+
+class VectorStore(ABC):
+    """
+    Vector store backend used by the vector store activities and the retrieval
+    engine. Point ids are strings (UUIDs, see `vector_point_id`), filters only
+    match payload fields against sets of values.
+    """
+
+    @abstractmethod
+    async def collection_exists(self, collection_name: str) -> bool:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def create_collection(self, collection_name: str, size: int,
+                                distance: str = "Cosine", sparse: bool = False) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def upsert(self, collection_name: str, points: List[VectorPoint],
+                     wait: bool = True) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def retrieve(self, collection_name: str, ids: List[str]) -> List[StoredPoint]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def delete(self, collection_name: str, payload_filter: PayloadFilter) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def search(self, collection_name: str, vector: List[float], limit: int,
+                     payload_filter: Optional[PayloadFilter] = None) -> List[SearchHit]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def search_sparse(self, collection_name: str, sparse_vector: SparseVector, limit: int,
+                            payload_filter: Optional[PayloadFilter] = None) -> List[SearchHit]:
+        """Searches the sparse vectors of the points by dot product."""
+        raise NotImplementedError
+
+    async def create_payload_index(self, collection_name: str, field_name: str) -> None:
+        """Makes filtering on `field_name` fast, a no-op for backends without indexes."""
+
+    async def close(self) -> None:
+        pass
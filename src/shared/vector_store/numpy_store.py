@@ -0,0 +1,398 @@
+import asyncio
+import json
+import os
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from shared.models.vector import SparseVector, VectorPoint
+from shared.vector_store.base import PayloadFilter, SearchHit, StoredPoint, \
+    VectorStore
+
+# rows multiplied with the query vector at once during a search
+SEARCH_BLOCK_ROWS = 65536
+# segments of a collection before they are merged into one
+MAX_SEGMENTS = 32
+
+
+def _write_atomic(path: str, write) -> None:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        write(f)
+    os.replace(tmp_path, path)
+
+
+class _Segment:
+    """
+    Append-only batch of points: float32 vectors in `<name>.npy` (memory
+    mapped), ids, payloads and sparse vectors in `<name>.payloads.jsonl` and
+    a tombstone mask of deleted or overwritten rows in `<name>.deleted.npy`.
+    """
+
+    def __init__(self, directory: str, name: str):
+        self.directory = directory
+        self.name = name
+        self.vectors = np.load(self._path(".npy"), mmap_mode="r")
+        self.ids: List[str] = []
+        self.payloads: List[Dict[str, Any]] = []
+        self.sparse_vectors: List[Optional[SparseVector]] = []
+        with open(self._path(".payloads.jsonl"), encoding="utf-8") as f:
+            for line in f:
+                point_id, payload, *sparse = json.loads(line)
+                self.ids.append(point_id)
+                self.payloads.append(payload)
+                self.sparse_vectors.append(SparseVector(*sparse[0]) if sparse else None)
+        self.deleted = np.zeros(len(self.ids), dtype=bool)
+        self.load_deleted()
+        self._field_values: Dict[str, np.ndarray] = {}
+        self._postings: Optional[Dict[int, Tuple[np.ndarray, np.ndarray]]] = None
+
+    def _path(self, suffix: str) -> str:
+        return os.path.join(self.directory, f"{self.name}{suffix}")
+
+    @classmethod
+    def write(cls, directory: str, name: str, ids: List[str], vectors: np.ndarray,
+              payloads: List[Dict[str, Any]],
+              sparse_vectors: List[Optional[SparseVector]]) -> "_Segment":
+        _write_atomic(os.path.join(directory, f"{name}.npy"),
+                      lambda f: np.save(f, vectors.astype(np.float32, copy=False)))
+        _write_atomic(os.path.join(directory, f"{name}.payloads.jsonl"), lambda f: f.write("".join(
+            json.dumps([point_id, payload, *([[sparse.indices, sparse.values]] if sparse else [])],
+                       ensure_ascii=False) + "\n"
+            for point_id, payload, sparse in zip(ids, payloads, sparse_vectors)
+        ).encode("utf-8")))
+        return cls(directory, name)
+
+    def load_deleted(self) -> None:
+        if os.path.exists(self._path(".deleted.npy")):
+            self.deleted = np.load(self._path(".deleted.npy"))
+
+    def save_deleted(self) -> None:
+        _write_atomic(self._path(".deleted.npy"), lambda f: np.save(f, self.deleted))
+
+    def field_values(self, key: str) -> np.ndarray:
+        if key not in self._field_values:
+            self._field_values[key] = np.array(
+                [payload.get(key) for payload in self.payloads], dtype=object)
+        return self._field_values[key]
+
+    def mask(self, payload_filter: Optional[PayloadFilter]) -> np.ndarray:
+        mask = ~self.deleted
+        for key, values in (payload_filter or {}).items():
+            mask &= np.isin(self.field_values(key), list(values))
+        return mask
+
+    def sparse_scores(self, sparse_vector: SparseVector) -> np.ndarray:
+        """Dot products of all rows with `sparse_vector`, via an inverted index built on first use."""
+        if self._postings is None:
+            postings: Dict[int, Tuple[List[int], List[float]]] = {}
+            for row, sparse in enumerate(self.sparse_vectors):
+                if not sparse:
+                    continue
+                for term, value in zip(sparse.indices, sparse.values):
+                    rows, values = postings.setdefault(term, ([], []))
+                    rows.append(row)
+                    values.append(value)
+            self._postings = {
+                term: (np.array(rows), np.array(values, dtype=np.float32))
+                for term, (rows, values) in postings.items()
+            }
+
+        scores = np.zeros(len(self.ids), dtype=np.float32)
+        for term, weight in zip(sparse_vector.indices, sparse_vector.values):
+            if term in self._postings:
+                rows, values = self._postings[term]
+                scores[rows] += weight * values
+        return scores
+
+    def remove_files(self) -> None:
+        for suffix in (".npy", ".payloads.jsonl", ".deleted.npy"):
+            if os.path.exists(self._path(suffix)):
+                os.remove(self._path(suffix))
+
+
+class _Collection:
+    """
+    Segments of one collection, listed in `meta.json`. Every change writes the
+    segment files first and replaces meta.json last with an increased
+    version, readers in other processes reload when the version changes.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.lock = threading.RLock()
+        self.version = -1
+        self.size = 0
+        self.distance = "Cosine"
+        self.segments: List[_Segment] = []
+        self.index: Dict[str, Tuple[_Segment, int]] = {}
+        self.refresh()
+
+    @property
+    def meta_path(self) -> str:
+        return os.path.join(self.directory, "meta.json")
+
+    def refresh(self) -> None:
+        with open(self.meta_path) as f:
+            meta = json.load(f)
+        if meta["version"] == self.version:
+            return
+
+        loaded = {segment.name: segment for segment in self.segments}
+        self.segments = []
+        for name in meta["segments"]:
+            segment = loaded.get(name) or _Segment(self.directory, name)
+            segment.load_deleted()
+            self.segments.append(segment)
+        self.size = meta["size"]
+        self.distance = meta["distance"]
+        self.next_segment = meta["next_segment"]
+        self.version = meta["version"]
+        self.index = {
+            point_id: (segment, row)
+            for segment in self.segments
+            for row, point_id in enumerate(segment.ids)
+            if not segment.deleted[row]
+        }
+
+    def save_meta(self) -> None:
+        self.version += 1
+        meta = {
+            "size": self.size,
+            "distance": self.distance,
+            "segments": [segment.name for segment in self.segments],
+            "next_segment": self.next_segment,
+            "version": self.version,
+        }
+        _write_atomic(self.meta_path, lambda f: f.write(json.dumps(meta).encode("utf-8")))
+
+    def prepare(self, vectors: np.ndarray) -> np.ndarray:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if self.distance == "Cosine":
+            norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+            vectors = vectors / np.where(norms == 0, 1, norms)
+        return vectors
+
+    def upsert(self, points: List[VectorPoint]) -> None:
+        # the last occurrence of an id within the batch wins
+        points = list({point.id: point for point in points}.values())
+        vectors = self.prepare(np.stack([point.vector.to_numpy() for point in points]))
+        if vectors.shape[1] != self.size:
+            raise ValueError(f"Expected vectors of size {self.size}, got {vectors.shape[1]}")
+
+        name = f"seg_{self.next_segment:08d}"
+        self.next_segment += 1
+        segment = _Segment.write(self.directory, name, [point.id for point in points],
+                                 vectors, [point.payload for point in points],
+                                 [point.sparse_vector for point in points])
+        self.tombstone([point.id for point in points])
+        self.segments.append(segment)
+        for row, point in enumerate(points):
+            self.index[point.id] = (segment, row)
+        self.save_meta()
+
+        if len(self.segments) > MAX_SEGMENTS:
+            self.compact()
+
+    def tombstone(self, ids: List[str]) -> None:
+        changed = set()
+        for point_id in ids:
+            location = self.index.pop(point_id, None)
+            if location:
+                segment, row = location
+                segment.deleted[row] = True
+                changed.add(segment.name)
+        for segment in self.segments:
+            if segment.name in changed:
+                segment.save_deleted()
+
+    def delete(self, payload_filter: PayloadFilter) -> None:
+        ids = [
+            segment.ids[row]
+            for segment in self.segments
+            for row in np.flatnonzero(segment.mask(payload_filter))
+        ]
+        if ids:
+            self.tombstone(ids)
+            self.save_meta()
+
+    def compact(self) -> None:
+        """Merges all segments into one without the tombstoned rows."""
+        ids, vectors, payloads, sparse_vectors = [], [], [], []
+        for segment in self.segments:
+            rows = np.flatnonzero(~segment.deleted)
+            ids.extend(segment.ids[row] for row in rows)
+            vectors.append(np.asarray(segment.vectors[rows]))
+            payloads.extend(segment.payloads[row] for row in rows)
+            sparse_vectors.extend(segment.sparse_vectors[row] for row in rows)
+
+        old_segments = self.segments
+        name = f"seg_{self.next_segment:08d}"
+        self.next_segment += 1
+        merged = _Segment.write(
+            self.directory, name, ids,
+            np.concatenate(vectors) if vectors else np.zeros((0, self.size), dtype=np.float32),
+            payloads, sparse_vectors)
+        self.segments = [merged]
+        self.index = {point_id: (merged, row) for row, point_id in enumerate(ids)}
+        self.save_meta()
+        for segment in old_segments:
+            segment.remove_files()
+
+    def search(self, vector: List[float], limit: int,
+               payload_filter: Optional[PayloadFilter]) -> List[SearchHit]:
+        query = self.prepare(np.asarray(vector))
+        best_scores = np.empty(0, dtype=np.float32)
+        best_hits: List[Tuple[_Segment, int]] = []
+
+        for segment in self.segments:
+            rows = np.flatnonzero(segment.mask(payload_filter))
+            for block_start in range(0, len(rows), SEARCH_BLOCK_ROWS):
+                block_rows = rows[block_start:block_start + SEARCH_BLOCK_ROWS]
+                block = segment.vectors[block_rows]
+                if self.distance == "Euclid":
+                    scores = -np.linalg.norm(block - query, axis=1)
+                else:
+                    scores = block @ query
+                if len(scores) > limit:
+                    top = np.argpartition(-scores, limit)[:limit]
+                    scores, block_rows = scores[top], block_rows[top]
+                best_scores = np.concatenate([best_scores, scores])
+                best_hits.extend((segment, row) for row in block_rows)
+
+                if len(best_scores) > limit:
+                    top = np.argpartition(-best_scores, limit)[:limit]
+                    best_scores = best_scores[top]
+                    best_hits = [best_hits[i] for i in top]
+
+        order = np.argsort(-best_scores)[:limit]
+        return [
+            SearchHit(id=best_hits[i][0].ids[best_hits[i][1]],
+                      score=float(best_scores[i]),
+                      payload=best_hits[i][0].payloads[best_hits[i][1]])
+            for i in order
+        ]
+
+    def search_sparse(self, sparse_vector: SparseVector, limit: int,
+                      payload_filter: Optional[PayloadFilter]) -> List[SearchHit]:
+        hits: List[Tuple[float, _Segment, int]] = []
+        for segment in self.segments:
+            scores = segment.sparse_scores(sparse_vector)
+            rows = np.flatnonzero(segment.mask(payload_filter) & (scores > 0))
+            if len(rows) > limit:
+                rows = rows[np.argpartition(-scores[rows], limit)[:limit]]
+            hits.extend((float(scores[row]), segment, row) for row in rows)
+
+        hits.sort(key=lambda hit: -hit[0])
+        return [
+            SearchHit(id=segment.ids[row], score=score, payload=segment.payloads[row])
+            for score, segment, row in hits[:limit]
+        ]
+
+
+class NumpyVectorStore(VectorStore):
+    """
+    Embedded vector store for single-node deployments, tests and benchmarks.
+
+    Every collection is a folder below `root` with append-only segments of
+    float32 vectors (memory-mapped .npy files) and their payloads. Upserts
+    append a segment and tombstone the previous rows of the same ids, deletes
+    only tombstone rows; segments are merged once there are more than
+    MAX_SEGMENTS. Searches are exact: a blocked matrix product over all rows
+    that match the payload filter, so results are the brute force baseline
+    for the recall of approximate indexes.
+
+    Sparse vectors are kept next to the payloads and searched exactly through
+    a per segment inverted index, every collection accepts them.
+
+    Only one process may write to a collection, any number can read it.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self._collections: Dict[str, _Collection] = {}
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def _directory(self, collection_name: str) -> str:
+        return os.path.join(self.root, collection_name)
+
+    def _collection(self, collection_name: str) -> _Collection:
+        with self._lock:
+            collection = self._collections.get(collection_name)
+            if collection is None:
+                if not os.path.exists(os.path.join(self._directory(collection_name), "meta.json")):
+                    raise ValueError(f"Collection {collection_name} does not exist")
+                collection = _Collection(self._directory(collection_name))
+                self._collections[collection_name] = collection
+        with collection.lock:
+            collection.refresh()
+        return collection
+
+    def _create_collection(self, collection_name: str, size: int, distance: str) -> None:
+        if distance not in ("Cosine", "Dot", "Euclid"):
+            raise ValueError(f"Unsupported distance: {distance}")
+        directory = self._directory(collection_name)
+        os.makedirs(directory, exist_ok=True)
+        meta = {"size": size, "distance": distance, "segments": [], "next_segment": 0, "version": 0}
+        _write_atomic(os.path.join(directory, "meta.json"),
+                      lambda f: f.write(json.dumps(meta).encode("utf-8")))
+
+    def _upsert(self, collection_name: str, points: List[VectorPoint]) -> None:
+        collection = self._collection(collection_name)
+        with collection.lock:
+            collection.upsert(points)
+
+    def _retrieve(self, collection_name: str, ids: List[str]) -> List[StoredPoint]:
+        collection = self._collection(collection_name)
+        with collection.lock:
+            locations = [(point_id, collection.index.get(point_id)) for point_id in ids]
+        return [
+            StoredPoint(id=point_id, payload=location[0].payloads[location[1]])
+            for point_id, location in locations if location
+        ]
+
+    def _delete(self, collection_name: str, payload_filter: PayloadFilter) -> None:
+        collection = self._collection(collection_name)
+        with collection.lock:
+            collection.delete(payload_filter)
+
+    def _search_sparse(self, collection_name: str, sparse_vector: SparseVector, limit: int,
+                       payload_filter: Optional[PayloadFilter]) -> List[SearchHit]:
+        collection = self._collection(collection_name)
+        with collection.lock:
+            return collection.search_sparse(sparse_vector, limit, payload_filter)
+
+    def _search(self, collection_name: str, vector: List[float], limit: int,
+                payload_filter: Optional[PayloadFilter]) -> List[SearchHit]:
+        collection = self._collection(collection_name)
+        with collection.lock:
+            return collection.search(vector, limit, payload_filter)
+
+    async def collection_exists(self, collection_name: str) -> bool:
+        return os.path.exists(os.path.join(self._directory(collection_name), "meta.json"))
+
+    async def create_collection(self, collection_name: str, size: int,
+                                distance: str = "Cosine", sparse: bool = False) -> None:
+        await asyncio.to_thread(self._create_collection, collection_name, size, distance)
+
+    async def upsert(self, collection_name: str, points: List[VectorPoint],
+                     wait: bool = True) -> None:
+        if points:
+            await asyncio.to_thread(self._upsert, collection_name, points)
+
+    async def retrieve(self, collection_name: str, ids: List[str]) -> List[StoredPoint]:
+        return await asyncio.to_thread(self._retrieve, collection_name, ids)
+
+    async def delete(self, collection_name: str, payload_filter: PayloadFilter) -> None:
+        await asyncio.to_thread(self._delete, collection_name, payload_filter)
+
+    async def search(self, collection_name: str, vector: List[float], limit: int,
+                     payload_filter: Optional[PayloadFilter] = None) -> List[SearchHit]:
+        return await asyncio.to_thread(self._search, collection_name, vector, limit, payload_filter)
+
+    async def search_sparse(self, collection_name: str, sparse_vector: SparseVector, limit: int,
+                            payload_filter: Optional[PayloadFilter] = None) -> List[SearchHit]:
+        return await asyncio.to_thread(self._search_sparse, collection_name, sparse_vector,
+                                       limit, payload_filter)
@@ -0,0 +1,309 @@
+import json
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import asyncpg
+
+from shared.models.vector import SparseVector, VectorPoint
+from shared.vector_store.base import PayloadFilter, SearchHit, StoredPoint, \
+    VectorStore
+
+# operator class, distance operator and distance -> score of every distance
+DISTANCES = {
+    "Cosine": ("vector_cosine_ops", "<=>", "1 - ({})"),
+    "Dot": ("vector_ip_ops", "<#>", "-({})"),
+    "Euclid": ("vector_l2_ops", "<->", "-({})"),
+}
+COLLECTIONS_TABLE = "vector_collections"
+_NAME_RE = re.compile(r"^[A-Za-z0-9_]+$")
+
+
+def to_asyncpg_dsn(url: str) -> str:
+    """Drops the Prisma-only query parameters (e.g. schema) from a database url."""
+    parts = urlsplit(url)
+    query = [(key, value) for key, value in parse_qsl(parts.query)
+             if key not in ("schema", "connection_limit", "pool_timeout", "pgbouncer")]
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+def points_table(collection_name: str) -> str:
+    if not _NAME_RE.match(collection_name):
+        raise ValueError(f"Invalid collection name: {collection_name}")
+    return f'"vector_points_{collection_name}"'
+
+
+def filter_sql(payload_filter: Optional[PayloadFilter], first_parameter: int,
+               alias: str = "") -> Tuple[str, List[Any]]:
+    """
+    WHERE conditions (with leading AND) and their parameters for a payload
+    filter. Keys are inlined so the expression indexes of
+    `create_payload_index` apply.
+    """
+    conditions, parameters = [], []
+    for key, values in (payload_filter or {}).items():
+        if not _NAME_RE.match(key):
+            raise ValueError(f"Invalid payload field name: {key}")
+        parameters.append(list(values))
+        conditions.append(f" AND {alias}payload->>'{key}' = ANY(${first_parameter}::text[])")
+        first_parameter += 1
+    return "".join(conditions), parameters
+
+
+@dataclass
+class MetadataFilter:
+    """Filters on the ModelMetadata of the model a point belongs to."""
+    programming_languages: Optional[List[str]] = None
+    keywords: Optional[List[str]] = None  # any of them
+    text: Optional[str] = None  # full text search in name, abstract and description
+
+
+class PgVectorStore(VectorStore):
+    """
+    Vector store in the models DB with the pgvector extension, for deployments
+    without Qdrant. Every collection is a table with the point id, its
+    model_id (to join the Prisma tables), the payload as jsonb, the vector
+    and optionally the sparse vector as parallel index/value arrays.
+
+    Vectors get an HNSW index when the collection is created. IVFFlat needs
+    data to train its lists and is built by `build_index` once a collection
+    is loaded.
+    """
+
+    def __init__(self, pool: asyncpg.Pool, index_type: str = "hnsw",
+                 hnsw_m: int = 16, hnsw_ef_construction: int = 64,
+                 ef_search: Optional[int] = None, ivfflat_probes: Optional[int] = None,
+                 iterative_scan: Optional[str] = None):
+        """
+        Args:
+            pool: asyncpg pool of the models DB, see `to_asyncpg_dsn`
+            index_type: "hnsw" or "ivfflat"
+            hnsw_m: Links per node of the HNSW graph
+            hnsw_ef_construction: Candidate list size while building the HNSW graph
+            ef_search: HNSW candidate list size of searches, None uses the default (40)
+            ivfflat_probes: IVFFlat lists searched, None uses the default (1)
+            iterative_scan: "relaxed_order" or "strict_order" lets filtered
+                searches scan on until `limit` rows match (pgvector >= 0.8)
+        """
+        if index_type not in ("hnsw", "ivfflat"):
+            raise ValueError(f"Unsupported index type: {index_type}")
+        if iterative_scan not in (None, "relaxed_order", "strict_order"):
+            raise ValueError(f"Unsupported iterative scan: {iterative_scan}")
+        self.pool = pool
+        self.index_type = index_type
+        self.hnsw_m = hnsw_m
+        self.hnsw_ef_construction = hnsw_ef_construction
+        self.ef_search = ef_search
+        self.ivfflat_probes = ivfflat_probes
+        self.iterative_scan = iterative_scan
+        # collection name -> (size, distance)
+        self._collections: Dict[str, Tuple[int, str]] = {}
+
+    @classmethod
+    async def connect(cls, url: str, min_size: int = 1, max_size: int = 10, **kwargs) -> "PgVectorStore":
+        pool = await asyncpg.create_pool(to_asyncpg_dsn(url), min_size=min_size, max_size=max_size)
+        async with pool.acquire() as connection:
+            await connection.execute("CREATE EXTENSION IF NOT EXISTS vector")
+            await connection.execute(
+                f"CREATE TABLE IF NOT EXISTS {COLLECTIONS_TABLE} ("
+                " name TEXT PRIMARY KEY,"
+                " size INTEGER NOT NULL,"
+                " distance TEXT NOT NULL)")
+        return cls(pool, **kwargs)
+
+    async def _collection(self, collection_name: str) -> Tuple[int, str]:
+        if collection_name not in self._collections:
+            row = await self.pool.fetchrow(
+                f"SELECT size, distance FROM {COLLECTIONS_TABLE} WHERE name = $1", collection_name)
+            if not row:
+                raise ValueError(f"Collection {collection_name} does not exist")
+            self._collections[collection_name] = (row["size"], row["distance"])
+        return self._collections[collection_name]
+
+    async def collection_exists(self, collection_name: str) -> bool:
+        try:
+            await self._collection(collection_name)
+            return True
+        except ValueError:
+            return False
+
+    async def create_collection(self, collection_name: str, size: int,
+                                distance: str = "Cosine", sparse: bool = False) -> None:
+        if distance not in DISTANCES:
+            raise ValueError(f"Unsupported distance: {distance}")
+        table = points_table(collection_name)
+        async with self.pool.acquire() as connection, connection.transaction():
+            await connection.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} ("
+                " id TEXT PRIMARY KEY,"
+                " model_id TEXT,"
+                " payload JSONB NOT NULL,"
+                f" embedding vector({size}) NOT NULL,"
+                " sparse_indices BIGINT[],"
+                " sparse_values REAL[])")
+            await connection.execute(
+                f'CREATE INDEX IF NOT EXISTS "vector_points_{collection_name}_model_id" ON {table} (model_id)')
+            if sparse:
+                await connection.execute(
+                    f'CREATE INDEX IF NOT EXISTS "vector_points_{collection_name}_sparse" '
+                    f"ON {table} USING gin (sparse_indices)")
+            await connection.execute(
+                f"INSERT INTO {COLLECTIONS_TABLE} (name, size, distance) VALUES ($1, $2, $3) "
+                f"ON CONFLICT (name) DO NOTHING", collection_name, size, distance)
+        self._collections[collection_name] = (size, distance)
+        if self.index_type == "hnsw":
+            await self.build_index(collection_name)
+
+    async def build_index(self, collection_name: str) -> None:
+        """
+        (Re)builds the vector index of a collection. IVFFlat uses rows / 1000
+        lists (at least 10), so call it again after the collection grew a lot.
+        """
+        _, distance = await self._collection(collection_name)
+        table = points_table(collection_name)
+        index_name = f'"vector_points_{collection_name}_embedding"'
+        operator_class = DISTANCES[distance][0]
+        if self.index_type == "hnsw":
+            index_sql = (f"USING hnsw (embedding {operator_class}) "
+                         f"WITH (m = {self.hnsw_m}, ef_construction = {self.hnsw_ef_construction})")
+        else:
+            num_rows = await self.pool.fetchval(f"SELECT count(*) FROM {table}")
+            index_sql = f"USING ivfflat (embedding {operator_class}) WITH (lists = {max(10, num_rows // 1000)})"
+
+        async with self.pool.acquire() as connection, connection.transaction():
+            await connection.execute(f"DROP INDEX IF EXISTS {index_name}")
+            await connection.execute(f"CREATE INDEX {index_name} ON {table} {index_sql}")
+
+    async def upsert(self, collection_name: str, points: List[VectorPoint],
+                     wait: bool = True) -> None:
+        """Copies the points into a temporary table and merges them in one statement."""
+        if not points:
+            return
+        await self._collection(collection_name)
+        table = points_table(collection_name)
+        # the last occurrence of an id within the batch wins
+        points = list({point.id: point for point in points}.values())
+        async with self.pool.acquire() as connection, connection.transaction():
+            await connection.execute(
+                "CREATE TEMPORARY TABLE vector_points_upsert ("
+                " id TEXT, model_id TEXT, payload JSONB, embedding REAL[],"
+                " sparse_indices BIGINT[], sparse_values REAL[]) ON COMMIT DROP")
+            # a list encodes faster than a NumPy array, asyncpg would box every element
+            await connection.copy_records_to_table("vector_points_upsert", records=[
+                (point.id, point.payload.get("model_id"), json.dumps(point.payload),
+                 point.vector.tolist(),
+                 point.sparse_vector.indices if point.sparse_vector else None,
+                 point.sparse_vector.values if point.sparse_vector else None)
+                for point in points
+            ])
+            await connection.execute(
+                f"INSERT INTO {table} (id, model_id, payload, embedding, sparse_indices, sparse_values) "
+                f"SELECT id, model_id, payload, embedding::vector, sparse_indices, sparse_values "
+                f"FROM vector_points_upsert "
+                f"ON CONFLICT (id) DO UPDATE SET model_id = EXCLUDED.model_id, "
+                f"payload = EXCLUDED.payload, embedding = EXCLUDED.embedding, "
+                f"sparse_indices = EXCLUDED.sparse_indices, sparse_values = EXCLUDED.sparse_values")
+
+    async def retrieve(self, collection_name: str, ids: List[str]) -> List[StoredPoint]:
+        rows = await self.pool.fetch(
+            f"SELECT id, payload FROM {points_table(collection_name)} WHERE id = ANY($1::text[])", ids)
+        return [StoredPoint(id=row["id"], payload=json.loads(row["payload"])) for row in rows]
+
+    async def delete(self, collection_name: str, payload_filter: PayloadFilter) -> None:
+        conditions, parameters = filter_sql(payload_filter, 1)
+        await self.pool.execute(
+            f"DELETE FROM {points_table(collection_name)} WHERE TRUE{conditions}", *parameters)
+
+    async def _search_settings(self, connection) -> None:
+        if self.ef_search:
+            await connection.execute(f"SET LOCAL hnsw.ef_search = {int(self.ef_search)}")
+        if self.ivfflat_probes:
+            await connection.execute(f"SET LOCAL ivfflat.probes = {int(self.ivfflat_probes)}")
+        if self.iterative_scan:
+            await connection.execute(f"SET LOCAL hnsw.iterative_scan = {self.iterative_scan}")
+            if self.iterative_scan == "relaxed_order":
+                await connection.execute("SET LOCAL ivfflat.iterative_scan = relaxed_order")
+
+    async def search(self, collection_name: str, vector: List[float], limit: int,
+                     payload_filter: Optional[PayloadFilter] = None) -> List[SearchHit]:
+        _, distance = await self._collection(collection_name)
+        _, operator, score = DISTANCES[distance]
+        conditions, parameters = filter_sql(payload_filter, 3)
+        async with self.pool.acquire() as connection, connection.transaction():
+            await self._search_settings(connection)
+            rows = await connection.fetch(
+                f"SELECT id, payload, {score.format(f'embedding {operator} $1::real[]::vector')} AS score "
+                f"FROM {points_table(collection_name)} WHERE TRUE{conditions} "
+                f"ORDER BY embedding {operator} $1::real[]::vector LIMIT $2",
+                list(vector), limit, *parameters)
+        return [SearchHit(id=row["id"], score=row["score"], payload=json.loads(row["payload"]))
+                for row in rows]
+
+    async def search_sparse(self, collection_name: str, sparse_vector: SparseVector, limit: int,
+                            payload_filter: Optional[PayloadFilter] = None) -> List[SearchHit]:
+        """Dot product over the points sharing a term with the query, found through the GIN index."""
+        conditions, parameters = filter_sql(payload_filter, 4, alias="p.")
+        rows = await self.pool.fetch(
+            f"SELECT p.id, p.payload, sum(d.value * q.value) AS score "
+            f"FROM {points_table(collection_name)} p "
+            f"CROSS JOIN LATERAL unnest(p.sparse_indices, p.sparse_values) AS d(term, value) "
+            f"JOIN unnest($1::bigint[], $2::real[]) AS q(term, value) ON q.term = d.term "
+            f"WHERE p.sparse_indices && $1::bigint[]{conditions} "
+            f"GROUP BY p.id, p.payload ORDER BY score DESC LIMIT $3",
+            sparse_vector.indices, sparse_vector.values, limit, *parameters)
+        return [SearchHit(id=row["id"], score=row["score"], payload=json.loads(row["payload"]))
+                for row in rows]
+
+    async def search_models(self, collection_name: str, vector: List[float], limit: int,
+                            metadata_filter: MetadataFilter,
+                            payload_filter: Optional[PayloadFilter] = None) -> List[SearchHit]:
+        """
+        kNN search restricted by the ModelMetadata of the models, in one
+        statement joining the Prisma tables, e.g. "NetLogo models about
+        epidemics similar to X". The hits carry the model name in their payload.
+        """
+        _, distance = await self._collection(collection_name)
+        _, operator, score = DISTANCES[distance]
+        conditions, parameters = filter_sql(payload_filter, 3, alias="p.")
+        if metadata_filter.programming_languages:
+            parameters.append(metadata_filter.programming_languages)
+            conditions += (
+                f' AND EXISTS (SELECT 1 FROM "_ModelMetadataToProgrammingLanguage" l '
+                f'JOIN "ProgrammingLanguage" pl ON pl.id = l."B" '
+                f'WHERE l."A" = md.id AND pl.name = ANY(${len(parameters) + 2}::text[]))')
+        if metadata_filter.keywords:
+            parameters.append(metadata_filter.keywords)
+            conditions += f" AND md.keywords && ${len(parameters) + 2}::text[]"
+        if metadata_filter.text:
+            parameters.append(metadata_filter.text)
+            conditions += (
+                f" AND to_tsvector('english', md.name || ' ' || md.abstract || ' ' || md.description) "
+                f"@@ plainto_tsquery('english', ${len(parameters) + 2})")
+
+        async with self.pool.acquire() as connection, connection.transaction():
+            await self._search_settings(connection)
+            rows = await connection.fetch(
+                f"SELECT p.id, p.payload, md.name AS model_name, "
+                f"{score.format(f'p.embedding {operator} $1::real[]::vector')} AS score "
+                f"FROM {points_table(collection_name)} p "
+                f'JOIN "Model" m ON m.id = p.model_id '
+                f'JOIN "ModelMetadata" md ON md.id = m.metadata_id '
+                f"WHERE TRUE{conditions} "
+                f"ORDER BY p.embedding {operator} $1::real[]::vector LIMIT $2",
+                list(vector), limit, *parameters)
+        return [
+            SearchHit(id=row["id"], score=row["score"],
+                      payload={**json.loads(row["payload"]), "model_name": row["model_name"]})
+            for row in rows
+        ]
+
+    async def create_payload_index(self, collection_name: str, field_name: str) -> None:
+        if not _NAME_RE.match(field_name):
+            raise ValueError(f"Invalid payload field name: {field_name}")
+        await self.pool.execute(
+            f'CREATE INDEX IF NOT EXISTS "vector_points_{collection_name}_{field_name}" '
+            f"ON {points_table(collection_name)} ((payload->>'{field_name}'))")
+
+    async def close(self) -> None:
+        await self.pool.close()
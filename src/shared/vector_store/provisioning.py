@@ -0,0 +1,189 @@
+import json
+import os
+from dataclasses import dataclass, field, fields
+from typing import Dict, List, Optional
+
+from qdrant_client import AsyncQdrantClient, models
+
+from shared.utils.logging_config import logger
+from shared.vector_store.base import SPARSE_VECTOR_NAME, VectorStore
+from shared.vector_store.qdrant_store import QdrantVectorStore
+
+DEFAULT_PROFILE_PATH = os.path.join(os.path.dirname(__file__), "collection_profiles.json")
+
+
+@dataclass
+class CollectionProfile:
+    """
+    Declared configuration of a vector collection.
+
+    quantization: None, "scalar" (int8, ~4x less RAM) or "binary" (~32x less
+    RAM, for high-dimensional embeddings). With `on_disk` the original vectors
+    are memory-mapped and only the quantized ones are kept in RAM
+    (`quantization_always_ram`); searches rescore the top
+    `oversampling` * limit candidates with the original vectors (`rescore`).
+
+    sparse: Adds a BM25 sparse vector next to the dense one, see
+    shared.vector_store.sparse. Only honoured when sparse vectors are enabled
+    (SPARSE_VECTORS_ENABLED), existing collections don't have one.
+    """
+    name: str
+    size: int
+    distance: str = "Cosine"
+    hnsw_m: int = 16
+    hnsw_ef_construct: int = 100
+    on_disk: bool = False
+    hnsw_on_disk: bool = False
+    quantization: Optional[str] = None
+    quantization_always_ram: bool = True
+    rescore: bool = True
+    oversampling: float = 2.0
+    payload_indexes: List[str] = field(default_factory=list)
+    sparse: bool = False
+
+    def vectors_config(self) -> models.VectorParams:
+        return models.VectorParams(
+            size=self.size,
+            distance=models.Distance(self.distance),
+            on_disk=self.on_disk,
+        )
+
+    def sparse_vectors_config(self) -> Optional[Dict[str, models.SparseVectorParams]]:
+        if not self.sparse:
+            return None
+        return {SPARSE_VECTOR_NAME: models.SparseVectorParams(
+            index=models.SparseIndexParams(on_disk=self.on_disk),
+        )}
+
+    def hnsw_config(self) -> models.HnswConfigDiff:
+        return models.HnswConfigDiff(
+            m=self.hnsw_m,
+            ef_construct=self.hnsw_ef_construct,
+            on_disk=self.hnsw_on_disk,
+        )
+
+    def quantization_config(self) -> Optional[models.QuantizationConfig]:
+        if self.quantization == "scalar":
+            return models.ScalarQuantization(scalar=models.ScalarQuantizationConfig(
+                type=models.ScalarType.INT8,
+                quantile=0.99,
+                always_ram=self.quantization_always_ram,
+            ))
+        if self.quantization == "binary":
+            return models.BinaryQuantization(binary=models.BinaryQuantizationConfig(
+                always_ram=self.quantization_always_ram,
+            ))
+        if self.quantization is None:
+            return None
+        raise ValueError(f"Unknown quantization for collection {self.name}: {self.quantization}")
+
+    def search_params(self, hnsw_ef: Optional[int] = None) -> models.SearchParams:
+        return models.SearchParams(
+            hnsw_ef=hnsw_ef,
+            quantization=models.QuantizationSearchParams(
+                rescore=self.rescore,
+                oversampling=self.oversampling,
+            ) if self.quantization else None,
+        )
+
+
+def load_collection_profiles(path: str = DEFAULT_PROFILE_PATH,
+                             sparse_enabled: bool = False) -> List[CollectionProfile]:
+    """
+    Loads collection profiles from a JSON file of the form
+    {"defaults": {...}, "collections": {"<name>": {...overrides}}}.
+    The "sparse" setting is dropped unless `sparse_enabled` is set.
+    """
+    with open(path) as f:
+        profile_file = json.load(f)
+
+    known_fields = {f.name for f in fields(CollectionProfile)}
+    profiles = []
+    for name, overrides in profile_file["collections"].items():
+        settings = {**profile_file.get("defaults", {}), **overrides}
+        unknown = set(settings) - known_fields
+        if unknown:
+            raise ValueError(f"Unknown settings for collection {name}: {sorted(unknown)}")
+        if not sparse_enabled:
+            settings["sparse"] = False
+        profiles.append(CollectionProfile(name=name, **settings))
+    return profiles
+
+
+async def provision_collection(client: AsyncQdrantClient, profile: CollectionProfile,
+                               recreate: bool = False) -> None:
+    """
+    Creates the collection described by `profile` or migrates an existing one
+    to it. Vector size, distance and the sparse vector can't be changed in
+    place, a mismatch raises unless `recreate` is set, which drops the
+    collection and its points.
+    """
+    if await client.collection_exists(profile.name):
+        info = await client.get_collection(profile.name)
+        vectors = info.config.params.vectors
+        has_sparse = SPARSE_VECTOR_NAME in (info.config.params.sparse_vectors or {})
+        if vectors.size != profile.size or vectors.distance != models.Distance(profile.distance) \
+                or has_sparse != profile.sparse:
+            if not recreate:
+                raise ValueError(
+                    f"Collection {profile.name} has vectors of size {vectors.size} ({vectors.distance}, "
+                    f"sparse: {has_sparse}), profile declares {profile.size} ({profile.distance}, "
+                    f"sparse: {profile.sparse}). Provision with recreate to drop it.")
+            logger.warning(f"Recreating collection {profile.name}, all points are dropped.")
+            await client.delete_collection(profile.name)
+        else:
+            await client.update_collection(
+                collection_name=profile.name,
+                vectors_config={"": models.VectorParamsDiff(on_disk=profile.on_disk)},
+                hnsw_config=profile.hnsw_config(),
+                quantization_config=profile.quantization_config() or models.Disabled.DISABLED,
+            )
+            logger.info(f"Updated collection {profile.name}.")
+
+    if not await client.collection_exists(profile.name):
+        await client.create_collection(
+            collection_name=profile.name,
+            vectors_config=profile.vectors_config(),
+            sparse_vectors_config=profile.sparse_vectors_config(),
+            hnsw_config=profile.hnsw_config(),
+            quantization_config=profile.quantization_config(),
+        )
+        logger.info(f"Created collection {profile.name}.")
+
+    payload_schema = (await client.get_collection(profile.name)).payload_schema or {}
+    for field_name in profile.payload_indexes:
+        if field_name not in payload_schema:
+            await client.create_payload_index(
+                collection_name=profile.name,
+                field_name=field_name,
+                field_schema=models.PayloadSchemaType.KEYWORD,
+                wait=True,
+            )
+
+
+async def provision_collections(client: AsyncQdrantClient,
+                                profiles: List[CollectionProfile],
+                                recreate: bool = False) -> None:
+    for profile in profiles:
+        await provision_collection(client, profile, recreate)
+    logger.info(f"Provisioned {len(profiles)} collections.")
+
+
+async def provision_vector_store(store: VectorStore, profiles: List[CollectionProfile],
+                                 recreate: bool = False) -> None:
+    """
+    Provisions the collections on any backend. Backends other than Qdrant
+    only take the vector size, distance, sparse flag and payload indexes of
+    a profile.
+    """
+    if isinstance(store, QdrantVectorStore):
+        await provision_collections(store.client, profiles, recreate)
+        return
+
+    for profile in profiles:
+        if not await store.collection_exists(profile.name):
+            await store.create_collection(profile.name, profile.size, profile.distance,
+                                          profile.sparse)
+            logger.info(f"Created collection {profile.name}.")
+        for field_name in profile.payload_indexes:
+            await store.create_payload_index(profile.name, field_name)
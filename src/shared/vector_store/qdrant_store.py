@@ -0,0 +1,128 @@
+from typing import Dict, List, Optional, Union
+
+from qdrant_client import AsyncQdrantClient, models
+
+from shared.models.vector import SparseVector, VectorPoint
+from shared.vector_store.base import SPARSE_VECTOR_NAME, PayloadFilter, \
+    SearchHit, StoredPoint, VectorStore
+
+
+def to_qdrant_batch(points: List[VectorPoint]) -> Union[models.Batch, List[models.PointStruct]]:
+    # Batch and PointStruct validate vectors as lists of strict floats, NumPy
+    # arrays are only accepted by upload_collection, which converts them to lists too
+    if any(point.sparse_vector for point in points):
+        return [
+            models.PointStruct(
+                id=point.id,
+                vector={
+                    "": point.vector.tolist(),
+                    **({SPARSE_VECTOR_NAME: models.SparseVector(
+                        indices=point.sparse_vector.indices,
+                        values=point.sparse_vector.values,
+                    )} if point.sparse_vector else {}),
+                },
+                payload=point.payload,
+            )
+            for point in points
+        ]
+    return models.Batch(
+        ids=[point.id for point in points],
+        vectors=[point.vector.tolist() for point in points],
+        payloads=[point.payload for point in points],
+    )
+
+
+def to_qdrant_filter(payload_filter: Optional[PayloadFilter]) -> Optional[models.Filter]:
+    if not payload_filter:
+        return None
+    return models.Filter(must=[
+        models.FieldCondition(key=key, match=models.MatchAny(any=values))
+        for key, values in payload_filter.items()
+    ])
+
+
+class QdrantVectorStore(VectorStore):
+    def __init__(self, client: AsyncQdrantClient,
+                 search_params: Optional[Dict[str, models.SearchParams]] = None):
+        """
+        Args:
+            client: AsyncQdrantClient, remote or local (location=":memory:")
+            search_params: Search params by collection name, see
+                CollectionProfile.search_params
+        """
+        self.client = client
+        self.search_params = search_params or {}
+
+    async def collection_exists(self, collection_name: str) -> bool:
+        return await self.client.collection_exists(collection_name)
+
+    async def create_collection(self, collection_name: str, size: int,
+                                distance: str = "Cosine", sparse: bool = False) -> None:
+        await self.client.create_collection(
+            collection_name=collection_name,
+            vectors_config=models.VectorParams(size=size, distance=models.Distance(distance)),
+            sparse_vectors_config={SPARSE_VECTOR_NAME: models.SparseVectorParams()} if sparse else None,
+        )
+
+    async def upsert(self, collection_name: str, points: List[VectorPoint],
+                     wait: bool = True) -> None:
+        await self.client.upsert(
+            collection_name=collection_name,
+            points=to_qdrant_batch(points),
+            wait=wait,
+        )
+
+    async def retrieve(self, collection_name: str, ids: List[str]) -> List[StoredPoint]:
+        records = await self.client.retrieve(
+            collection_name=collection_name,
+            ids=ids,
+            with_payload=True,
+            with_vectors=False,
+        )
+        return [StoredPoint(id=str(record.id), payload=record.payload or {}) for record in records]
+
+    async def delete(self, collection_name: str, payload_filter: PayloadFilter) -> None:
+        await self.client.delete(
+            collection_name=collection_name,
+            points_selector=models.FilterSelector(filter=to_qdrant_filter(payload_filter)),
+        )
+
+    async def search(self, collection_name: str, vector: List[float], limit: int,
+                     payload_filter: Optional[PayloadFilter] = None) -> List[SearchHit]:
+        response = await self.client.query_points(
+            collection_name=collection_name,
+            query=vector,
+            query_filter=to_qdrant_filter(payload_filter),
+            search_params=self.search_params.get(collection_name),
+            limit=limit,
+            with_payload=True,
+        )
+        return [SearchHit(id=str(point.id), score=point.score, payload=point.payload or {})
+                for point in response.points]
+
+    async def search_sparse(self, collection_name: str, sparse_vector: SparseVector, limit: int,
+                            payload_filter: Optional[PayloadFilter] = None) -> List[SearchHit]:
+        response = await self.client.query_points(
+            collection_name=collection_name,
+            query=models.SparseVector(indices=sparse_vector.indices, values=sparse_vector.values),
+            using=SPARSE_VECTOR_NAME,
+            query_filter=to_qdrant_filter(payload_filter),
+            limit=limit,
+            with_payload=True,
+        )
+        return [SearchHit(id=str(point.id), score=point.score, payload=point.payload or {})
+                for point in response.points]
+
+    async def create_payload_index(self, collection_name: str, field_name: str) -> None:
+        collection = await self.client.get_collection(collection_name)
+        if field_name in (collection.payload_schema or {}):
+            return
+        await self.client.create_payload_index(
+            collection_name=collection_name,
+            field_name=field_name,
+            field_schema=models.PayloadSchemaType.KEYWORD,
+            wait=True,
+        )
+
+    async def close(self) -> None:
+        await self.client.close()
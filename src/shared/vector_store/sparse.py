@@ -0,0 +1,272 @@
+import math
+import os
+import re
+import sqlite3
+import threading
+import zlib
+from collections import Counter
+from dataclasses import replace
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from shared.models.vector import SparseVector, VectorPoint
+from shared.utils.logging_config import logger
+from shared.vector_store.base import PayloadFilter
+
+# BM25 term frequency saturation and document length normalization
+BM25_K1 = 1.2
+BM25_B = 0.75
+# payload fields holding the text of a point, the first non-empty one is indexed
+TEXT_FIELDS = ("content", "summary", "answer", "question")
+# payload fields the term statistics can be deleted by, see delete_points_by_payload
+FILTER_FIELDS = ("model_id", "doc_section_id", "kind")
+STOPWORDS = frozenset(
+    "a an and are as at be been but by can do for from has have if in into is it its "
+    "not of on or so such that the their then there these they this to was were which "
+    "will with".split()
+)
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word tokens without stopwords and single characters."""
+    return [
+        token for token in TOKEN_PATTERN.findall(text.lower())
+        if len(token) > 1 and token not in STOPWORDS
+    ]
+
+
+def term_index(term: str) -> int:
+    """Stable 32 bit index of a term, collisions only merge rare terms."""
+    return zlib.crc32(term.encode("utf-8"))
+
+
+def point_text(payload: Dict[str, str]) -> str:
+    for field_name in TEXT_FIELDS:
+        if payload.get(field_name):
+            return payload[field_name]
+    return ""
+
+
+class TermStatistics:
+    """
+    Per collection document frequencies for the BM25 IDF, kept in a SQLite
+    file. The terms of every indexed point are stored as well, so points
+    can be re-indexed and deleted (by their FILTER_FIELDS) without
+    recounting the collection.
+    """
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False,
+                                           isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS collections ("
+            " collection_name TEXT PRIMARY KEY,"
+            " num_docs INTEGER NOT NULL,"
+            " total_length INTEGER NOT NULL)"
+        )
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS terms ("
+            " collection_name TEXT NOT NULL,"
+            " term INTEGER NOT NULL,"
+            " doc_freq INTEGER NOT NULL,"
+            " PRIMARY KEY (collection_name, term))"
+        )
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS documents ("
+            " collection_name TEXT NOT NULL,"
+            " point_id TEXT NOT NULL,"
+            " length INTEGER NOT NULL,"
+            " terms TEXT NOT NULL,"
+            f" {', '.join(f'{field_name} TEXT' for field_name in FILTER_FIELDS)},"
+            " PRIMARY KEY (collection_name, point_id))"
+        )
+        for field_name in FILTER_FIELDS:
+            self._connection.execute(
+                f"CREATE INDEX IF NOT EXISTS documents_{field_name} "
+                f"ON documents (collection_name, {field_name})")
+
+    def _add_doc_freqs(self, collection_name: str, terms: Iterable[int], delta: int) -> None:
+        self._connection.executemany(
+            "INSERT INTO terms (collection_name, term, doc_freq) VALUES (?, ?, ?) "
+            "ON CONFLICT (collection_name, term) DO UPDATE SET doc_freq = doc_freq + excluded.doc_freq",
+            [(collection_name, term, delta) for term in terms])
+
+    def _add_totals(self, collection_name: str, num_docs: int, total_length: int) -> None:
+        self._connection.execute(
+            "INSERT INTO collections (collection_name, num_docs, total_length) VALUES (?, ?, ?) "
+            "ON CONFLICT (collection_name) DO UPDATE SET "
+            "num_docs = num_docs + excluded.num_docs, "
+            "total_length = total_length + excluded.total_length",
+            (collection_name, num_docs, total_length))
+
+    def _remove(self, collection_name: str, point_ids: List[str]) -> int:
+        removed = 0
+        for start in range(0, len(point_ids), 500):
+            batch = point_ids[start:start + 500]
+            rows = self._connection.execute(
+                f"SELECT length, terms FROM documents WHERE collection_name = ? "
+                f"AND point_id IN ({','.join('?' * len(batch))})",
+                [collection_name, *batch]).fetchall()
+            for length, terms in rows:
+                self._add_doc_freqs(collection_name, [int(term) for term in terms.split(",") if term], -1)
+                self._add_totals(collection_name, -1, -length)
+            self._connection.execute(
+                f"DELETE FROM documents WHERE collection_name = ? "
+                f"AND point_id IN ({','.join('?' * len(batch))})",
+                [collection_name, *batch])
+            removed += len(rows)
+        return removed
+
+    def add_documents(self, collection_name: str,
+                      documents: Dict[str, Tuple[Counter, Dict[str, str]]]) -> None:
+        """
+        Counts the documents into the statistics, replacing earlier versions
+        of the same point ids.
+
+        Args:
+            collection_name: Name of the collection
+            documents: Point id -> (term frequencies, payload)
+        """
+        with self._lock:
+            self._connection.execute("BEGIN")
+            try:
+                self._remove(collection_name, list(documents))
+                for point_id, (term_freqs, payload) in documents.items():
+                    length = sum(term_freqs.values())
+                    self._connection.execute(
+                        f"INSERT INTO documents (collection_name, point_id, length, terms, "
+                        f"{', '.join(FILTER_FIELDS)}) VALUES ({','.join('?' * (4 + len(FILTER_FIELDS)))})",
+                        [collection_name, point_id, length, ",".join(map(str, term_freqs)),
+                         *[payload.get(field_name) for field_name in FILTER_FIELDS]])
+                    self._add_doc_freqs(collection_name, term_freqs, 1)
+                    self._add_totals(collection_name, 1, length)
+                self._connection.execute("DELETE FROM terms WHERE doc_freq <= 0")
+                self._connection.execute("COMMIT")
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                raise
+
+    def remove_documents(self, collection_name: str, payload_filter: PayloadFilter) -> int:
+        """Removes the documents matching the filter, returns their number."""
+        unknown = set(payload_filter) - set(FILTER_FIELDS)
+        if unknown:
+            logger.warning(f"Term statistics of {collection_name} can't be filtered by {sorted(unknown)}, "
+                           f"they keep the deleted points.")
+            return 0
+
+        conditions = " AND ".join(
+            f"{key} IN ({','.join('?' * len(values))})" for key, values in payload_filter.items())
+        with self._lock:
+            self._connection.execute("BEGIN")
+            try:
+                point_ids = [row[0] for row in self._connection.execute(
+                    f"SELECT point_id FROM documents WHERE collection_name = ? AND {conditions}",
+                    [collection_name, *[value for values in payload_filter.values() for value in values]])]
+                removed = self._remove(collection_name, point_ids)
+                self._connection.execute("DELETE FROM terms WHERE doc_freq <= 0")
+                self._connection.execute("COMMIT")
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                raise
+        return removed
+
+    def totals(self, collection_name: str) -> Tuple[int, int]:
+        """(number of documents, summed document length) of a collection."""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT num_docs, total_length FROM collections WHERE collection_name = ?",
+                (collection_name,)).fetchone()
+        return row or (0, 0)
+
+    def doc_freqs(self, collection_name: str, terms: List[int]) -> Dict[int, int]:
+        if not terms:
+            return {}
+        with self._lock:
+            rows = self._connection.execute(
+                f"SELECT term, doc_freq FROM terms WHERE collection_name = ? "
+                f"AND term IN ({','.join('?' * len(terms))})",
+                [collection_name, *terms]).fetchall()
+        return dict(rows)
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+
+class SparseEncoder:
+    """
+    Local BM25 encoder for sparse vectors. Points get the BM25 term frequency
+    weight of their terms (k1, b, average length of the collection at
+    indexing time), queries the IDF of their terms, so the dot product of
+    both is the BM25 score and changing document frequencies never require
+    re-encoding the stored points.
+    """
+
+    def __init__(self, statistics: TermStatistics, collection_names: Iterable[str],
+                 k1: float = BM25_K1, b: float = BM25_B):
+        """
+        Args:
+            statistics: Term statistics shared by indexing and querying
+            collection_names: Collections with sparse vectors
+            k1: BM25 term frequency saturation
+            b: BM25 document length normalization
+        """
+        self.statistics = statistics
+        self.collection_names: Set[str] = set(collection_names)
+        self.k1 = k1
+        self.b = b
+
+    def enabled(self, collection_name: str) -> bool:
+        return collection_name in self.collection_names
+
+    def encode_points(self, collection_name: str, points: List[VectorPoint]) -> List[VectorPoint]:
+        """Updates the term statistics with `points` and returns them with their sparse vectors."""
+        term_freqs = {
+            point.id: Counter(term_index(token) for token in tokenize(point_text(point.payload)))
+            for point in points
+        }
+        self.statistics.add_documents(collection_name, {
+            point.id: (term_freqs[point.id], point.payload) for point in points
+        })
+        num_docs, total_length = self.statistics.totals(collection_name)
+        avg_length = total_length / num_docs if num_docs else 1.0
+
+        encoded = []
+        for point in points:
+            freqs = term_freqs[point.id]
+            norm = self.k1 * (1 - self.b + self.b * sum(freqs.values()) / (avg_length or 1.0))
+            terms = sorted(freqs)
+            encoded.append(replace(point, sparse_vector=SparseVector(
+                indices=terms,
+                values=[freqs[term] * (self.k1 + 1) / (freqs[term] + norm) for term in terms],
+            )))
+        return encoded
+
+    def encode_query(self, collection_name: str, text: str) -> Optional[SparseVector]:
+        """IDF weights of the query terms known to the collection, None if there are none."""
+        terms = sorted({term_index(token) for token in tokenize(text)})
+        doc_freqs = self.statistics.doc_freqs(collection_name, terms)
+        num_docs, _ = self.statistics.totals(collection_name)
+        terms = [term for term in terms if doc_freqs.get(term)]
+        if not terms:
+            return None
+        return SparseVector(
+            indices=terms,
+            values=[math.log(1 + (num_docs - doc_freqs[term] + 0.5) / (doc_freqs[term] + 0.5))
+                    for term in terms],
+        )
+
+    def remove(self, collection_name: str, payload_filter: PayloadFilter) -> None:
+        removed = self.statistics.remove_documents(collection_name, payload_filter)
+        logger.info(f"Removed {removed} documents from the term statistics of {collection_name}.")
+
+    def close(self) -> None:
+        self.statistics.close()
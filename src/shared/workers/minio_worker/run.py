@@ -13,6 +13,7 @@ from ingest.workflows.docs.IngestModelDocsWorkflow import \
     IngestModelDocsWorkflow
 from shared.activities.minio_activities import MinioActivities
 from shared.const import MINIO_TASK_QUEUE
+from shared.converter import create_data_converter_from_env
 from shared.utils.logging_config import logger
 
 
@@ -51,12 +52,24 @@ async def main():
         f"MINIO_WORKER_MAX_ACTIVITIES_PER_SECOND = {MINIO_WORKER_MAX_ACTIVITIES_PER_SECOND} from .env loaded."
     )
 
+    # files uploaded at once by one upload_folder activity
+    MINIO_UPLOAD_PARALLELISM = int(os.getenv("MINIO_UPLOAD_PARALLELISM", "8"))
+    # files above this size are uploaded in parts of this size
+    MINIO_PART_SIZE_MB = int(os.getenv("MINIO_PART_SIZE_MB", "16"))
+
+    logger.info(f"MINIO_UPLOAD_PARALLELISM = {MINIO_UPLOAD_PARALLELISM} from .env loaded.")
+    logger.info(f"MINIO_PART_SIZE_MB = {MINIO_PART_SIZE_MB} from .env loaded.")
+
     client = None
     tp = None
     worker = None
 
     try:
-        client = await Client.connect(TEMPORAL_ADDRESS, namespace=TEMPORAL_NAMESPACE)
+        client = await Client.connect(
+            TEMPORAL_ADDRESS,
+            namespace=TEMPORAL_NAMESPACE,
+            data_converter=create_data_converter_from_env(),
+        )
         tp = ThreadPoolExecutor()
 
         minio_client = Minio(
@@ -65,7 +78,11 @@ async def main():
             secret_key=MINIO_SECRET_KEY,
             secure=False,  # Set this to True if using HTTPS
         )
-        minio_activities = MinioActivities(minio_client, FS_ROOT, MINIO_BUCKET_NAME)
+        minio_activities = MinioActivities(
+            minio_client, FS_ROOT, MINIO_BUCKET_NAME,
+            upload_parallelism=MINIO_UPLOAD_PARALLELISM,
+            part_size=MINIO_PART_SIZE_MB * 1024 * 1024,
+        )
         logger.info("Worker running...")
 
         worker = Worker(
@@ -77,7 +94,8 @@ async def main():
             ],
             activities=[
                 minio_activities.upload_file,
-                minio_activities.upload_folder
+                minio_activities.upload_folder,
+                minio_activities.backup_model_version
             ],
             max_concurrent_activities=MINIO_WORKER_MAX_CONCURRENT_ACTIVITIES,
             max_activities_per_second=MINIO_WORKER_MAX_ACTIVITIES_PER_SECOND,
@@ -7,12 +7,17 @@ from temporalio.client import Client
 from temporalio.worker import Worker
 
 from ingest.workflows.docs.ComputeAndUpsertModelDocEmbeddingsWorkflow import \
-    ComputeAndUpsertModelDocEmbeddingsWorkflow, ComputeEmbeddingsWorkflow
+    ComputeAndUpsertModelDocEmbeddingsWorkflow, ComputeEmbeddingsWorkflow, \
+    EmbedAndUpsertVectorPointsWorkflow
 from ingest.workflows.metadata.ComputeAndUpsertMetadataEmbeddingsWorkflow import \
     ComputeAndUpsertMetadataEmbeddingsWorkflow
 from shared.activities.llm_activities import LLMActivities
+from shared.blob_store import create_blob_store_from_env
+from shared.cache.embedding_cache import EmbeddingCache
+from shared.cache.sqlite_cache import SQLiteLRUCache
 from shared.clients import OllamaClient
 from shared.const import OLLAMA_EMBEDDING_TASK_QUEUE
+from shared.converter import create_data_converter_from_env
 from shared.utils.logging_config import logger
 
 
@@ -25,6 +30,22 @@ async def main():
     OLLAMA_URL = os.getenv("OLLAMA_URL")
     OLLAMA_DEFAULT_EMBEDDING_MODEL = os.getenv("OLLAMA_DEFAULT_EMBEDDING_MODEL", "nomic-embed-text")
 
+    OLLAMA_EMBEDDING_MAX_BATCH_SIZE = int(
+        os.getenv("OLLAMA_EMBEDDING_MAX_BATCH_SIZE", "32")
+    )
+    OLLAMA_EMBEDDING_MAX_BATCH_CHARS = int(
+        os.getenv("OLLAMA_EMBEDDING_MAX_BATCH_CHARS", "32000")
+    )
+
+    EMBEDDING_CACHE_ENABLED = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+    EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "./local_data/cache/embeddings.sqlite")
+    EMBEDDING_CACHE_MAX_MB = int(os.getenv("EMBEDDING_CACHE_MAX_MB", "2048"))
+    # "float32" or "float16", precision of the vectors passed between workers
+    EMBEDDING_VECTOR_DTYPE = os.getenv("EMBEDDING_VECTOR_DTYPE", "float32")
+
+    OLLAMA_MAX_CONNECTIONS = int(os.getenv("OLLAMA_MAX_CONNECTIONS", "10"))
+    OLLAMA_REQUEST_TIMEOUT = float(os.getenv("OLLAMA_REQUEST_TIMEOUT", "300"))
+
     OLLAMA_EMBEDDING_WORKER_MAX_CONCURRENT_ACTIVITIES = int(
         os.getenv("OLLAMA_EMBEDDING_WORKER_MAX_CONCURRENT_ACTIVITIES", "1")
     )
@@ -34,6 +55,14 @@ async def main():
 
     logger.info(f"OLLAMA_URL = {OLLAMA_URL} from .env loaded.")
     logger.info(f"OLLAMA_DEFAULT_EMBEDDING_MODEL = {OLLAMA_DEFAULT_EMBEDDING_MODEL} from .env loaded.")
+    logger.info(f"OLLAMA_EMBEDDING_MAX_BATCH_SIZE = {OLLAMA_EMBEDDING_MAX_BATCH_SIZE} from .env loaded.")
+    logger.info(f"OLLAMA_EMBEDDING_MAX_BATCH_CHARS = {OLLAMA_EMBEDDING_MAX_BATCH_CHARS} from .env loaded.")
+    logger.info(f"EMBEDDING_CACHE_ENABLED = {EMBEDDING_CACHE_ENABLED} from .env loaded.")
+    logger.info(f"EMBEDDING_CACHE_PATH = {EMBEDDING_CACHE_PATH} from .env loaded.")
+    logger.info(f"EMBEDDING_CACHE_MAX_MB = {EMBEDDING_CACHE_MAX_MB} from .env loaded.")
+    logger.info(f"EMBEDDING_VECTOR_DTYPE = {EMBEDDING_VECTOR_DTYPE} from .env loaded.")
+    logger.info(f"OLLAMA_MAX_CONNECTIONS = {OLLAMA_MAX_CONNECTIONS} from .env loaded.")
+    logger.info(f"OLLAMA_REQUEST_TIMEOUT = {OLLAMA_REQUEST_TIMEOUT} from .env loaded.")
     logger.info(
         f"OLLAMA_EMBEDDING_WORKER_MAX_CONCURRENT_ACTIVITIES = {OLLAMA_EMBEDDING_WORKER_MAX_CONCURRENT_ACTIVITIES} from .env loaded."
     )
@@ -42,15 +71,33 @@ async def main():
     )
 
     client = None
+    llm_client = None
     tp = None
     worker = None
 
     try:
-        client = await Client.connect(TEMPORAL_ADDRESS, namespace=TEMPORAL_NAMESPACE)
+        client = await Client.connect(
+            TEMPORAL_ADDRESS,
+            namespace=TEMPORAL_NAMESPACE,
+            data_converter=create_data_converter_from_env(),
+        )
         tp = ThreadPoolExecutor()
 
-        llm_client = OllamaClient(OLLAMA_URL, OLLAMA_DEFAULT_EMBEDDING_MODEL)
-        llm_activities = LLMActivities(llm_client)
+        llm_client = OllamaClient(
+            OLLAMA_URL,
+            OLLAMA_DEFAULT_EMBEDDING_MODEL,
+            max_batch_size=OLLAMA_EMBEDDING_MAX_BATCH_SIZE,
+            max_batch_chars=OLLAMA_EMBEDDING_MAX_BATCH_CHARS,
+            max_connections=OLLAMA_MAX_CONNECTIONS,
+            timeout=OLLAMA_REQUEST_TIMEOUT
+        )
+        embedding_cache = None
+        if EMBEDDING_CACHE_ENABLED:
+            embedding_cache = EmbeddingCache(
+                SQLiteLRUCache(EMBEDDING_CACHE_PATH, EMBEDDING_CACHE_MAX_MB * 1024 * 1024)
+            )
+        llm_activities = LLMActivities(llm_client, create_blob_store_from_env(), embedding_cache,
+                                       vector_dtype=EMBEDDING_VECTOR_DTYPE)
 
         worker = Worker(
             client,
@@ -58,10 +105,14 @@ async def main():
             workflows=[
                 ComputeAndUpsertMetadataEmbeddingsWorkflow,
                 ComputeAndUpsertModelDocEmbeddingsWorkflow,
-                ComputeEmbeddingsWorkflow
+                ComputeEmbeddingsWorkflow,
+                EmbedAndUpsertVectorPointsWorkflow
             ],
             activities=[
+                llm_activities.get_embedding_model,
                 llm_activities.compute_embedding,
+                llm_activities.compute_embeddings,
+                llm_activities.compute_staged_embeddings,
             ],
             max_concurrent_activities=OLLAMA_EMBEDDING_WORKER_MAX_CONCURRENT_ACTIVITIES,
             max_activities_per_second=OLLAMA_EMBEDDING_WORKER_MAX_ACTIVITIES_PER_SECOND,
@@ -78,6 +129,8 @@ async def main():
             await worker.shutdown()
         if tp:
             tp.shutdown(wait=True)
+        if llm_client:
+            await llm_client.aclose()
 
 
 if __name__ == "__main__":
@@ -11,8 +11,11 @@ from ingest.workflows.docs.GenerateSyntheticDataForChunksWorkflow import \
 from ingest.workflows.docs.GenerateSyntheticDataForDocSectionWorkflow import \
     GenerateSyntheticDataForDocSectionWorkflow
 from shared.activities.llm_activities import LLMActivities
+from shared.cache.generation_cache import GenerationCache
+from shared.cache.sqlite_cache import SQLiteLRUCache
 from shared.clients import OllamaClient
 from shared.const import OLLAMA_GENERATE_TASK_QUEUE
+from shared.converter import create_data_converter_from_env
 from shared.utils.logging_config import logger
 
 
@@ -25,6 +28,14 @@ async def main():
     OLLAMA_URL = os.getenv("OLLAMA_URL")
     OLLAMA_DEFAULT_GENERATE_MODEL = os.getenv("OLLAMA_DEFAULT_GENERATE_MODEL", "nomic-embed-text")
 
+    OLLAMA_MAX_CONNECTIONS = int(os.getenv("OLLAMA_MAX_CONNECTIONS", "10"))
+    OLLAMA_REQUEST_TIMEOUT = float(os.getenv("OLLAMA_REQUEST_TIMEOUT", "300"))
+
+    GENERATION_CACHE_ENABLED = os.getenv("GENERATION_CACHE_ENABLED", "true").lower() == "true"
+    GENERATION_CACHE_PATH = os.getenv("GENERATION_CACHE_PATH", "./local_data/cache/generations.sqlite")
+    GENERATION_CACHE_MAX_MB = int(os.getenv("GENERATION_CACHE_MAX_MB", "1024"))
+    GENERATION_CACHE_TTL_DAYS = float(os.getenv("GENERATION_CACHE_TTL_DAYS", "30"))
+
     OLLAMA_GENERATE_WORKER_MAX_CONCURRENT_ACTIVITIES = int(
         os.getenv("OLLAMA_GENERATE_WORKER_MAX_CONCURRENT_ACTIVITIES", "1")
     )
@@ -34,6 +45,12 @@ async def main():
 
     logger.info(f"OLLAMA_URL = {OLLAMA_URL} from .env loaded.")
     logger.info(f"OLLAMA_DEFAULT_GENERATE_MODEL = {OLLAMA_DEFAULT_GENERATE_MODEL} from .env loaded.")
+    logger.info(f"OLLAMA_MAX_CONNECTIONS = {OLLAMA_MAX_CONNECTIONS} from .env loaded.")
+    logger.info(f"OLLAMA_REQUEST_TIMEOUT = {OLLAMA_REQUEST_TIMEOUT} from .env loaded.")
+    logger.info(f"GENERATION_CACHE_ENABLED = {GENERATION_CACHE_ENABLED} from .env loaded.")
+    logger.info(f"GENERATION_CACHE_PATH = {GENERATION_CACHE_PATH} from .env loaded.")
+    logger.info(f"GENERATION_CACHE_MAX_MB = {GENERATION_CACHE_MAX_MB} from .env loaded.")
+    logger.info(f"GENERATION_CACHE_TTL_DAYS = {GENERATION_CACHE_TTL_DAYS} from .env loaded.")
     logger.info(
         f"OLLAMA_GENERATE_WORKER_MAX_CONCURRENT_ACTIVITIES = {OLLAMA_GENERATE_WORKER_MAX_CONCURRENT_ACTIVITIES} from .env loaded."
     )
@@ -42,15 +59,34 @@ async def main():
     )
 
     client = None
+    llm_client = None
     tp = None
     worker = None
 
     try:
-        client = await Client.connect(TEMPORAL_ADDRESS, namespace=TEMPORAL_NAMESPACE)
+        client = await Client.connect(
+            TEMPORAL_ADDRESS,
+            namespace=TEMPORAL_NAMESPACE,
+            data_converter=create_data_converter_from_env(),
+        )
         tp = ThreadPoolExecutor()
 
-        llm_client = OllamaClient(OLLAMA_URL, OLLAMA_DEFAULT_GENERATE_MODEL)
-        llm_activities = LLMActivities(llm_client)
+        llm_client = OllamaClient(
+            OLLAMA_URL,
+            OLLAMA_DEFAULT_GENERATE_MODEL,
+            max_connections=OLLAMA_MAX_CONNECTIONS,
+            timeout=OLLAMA_REQUEST_TIMEOUT
+        )
+        generation_cache = None
+        if GENERATION_CACHE_ENABLED:
+            generation_cache = GenerationCache(
+                SQLiteLRUCache(
+                    GENERATION_CACHE_PATH,
+                    GENERATION_CACHE_MAX_MB * 1024 * 1024,
+                    ttl_seconds=GENERATION_CACHE_TTL_DAYS * 24 * 60 * 60
+                )
+            )
+        llm_activities = LLMActivities(llm_client, generation_cache=generation_cache)
 
         worker = Worker(
             client,
@@ -65,7 +101,9 @@ async def main():
                 llm_activities.add_chunk_summary,
                 llm_activities.add_doc_section_summary,
                 llm_activities.add_chunk_qas,
-                llm_activities.add_doc_section_qas
+                llm_activities.add_doc_section_qas,
+                llm_activities.add_chunk_enrichment,
+                llm_activities.add_doc_section_enrichment
             ],
             max_concurrent_activities=OLLAMA_GENERATE_WORKER_MAX_CONCURRENT_ACTIVITIES,
             max_activities_per_second=OLLAMA_GENERATE_WORKER_MAX_ACTIVITIES_PER_SECOND,
@@ -82,6 +120,8 @@ async def main():
             await worker.shutdown()
         if tp:
             tp.shutdown(wait=True)
+        if llm_client:
+            await llm_client.aclose()
 
 
 if __name__ == "__main__":
@@ -12,6 +12,7 @@ from ingest.workflows.metadata.IngestModelMetadataWorkflow import \
     IngestModelMetadataWorkflow
 from shared.activities.postgres_activities import PostgresActivities
 from shared.const import POSTGRES_TASK_QUEUE
+from shared.converter import create_data_converter_from_env
 from shared.prisma.models_db_prisma_client import \
     Prisma as PrismaClient
 from shared.utils.logging_config import logger
@@ -38,7 +39,11 @@ async def main():
         prisma_client = PrismaClient(datasource={"url": MODELS_DB_URL})
         await prisma_client.connect()
 
-        temporal_client = await Client.connect(TEMPORAL_ADDRESS, namespace=TEMPORAL_NAMESPACE)
+        temporal_client = await Client.connect(
+            TEMPORAL_ADDRESS,
+            namespace=TEMPORAL_NAMESPACE,
+            data_converter=create_data_converter_from_env(),
+        )
         tp = ThreadPoolExecutor()
 
         postgres_activities = PostgresActivities(prisma_client)
@@ -50,6 +55,8 @@ async def main():
             activities=[
                 postgres_activities.save_model_doc,
                 postgres_activities.create_model_from_metadata,
+                postgres_activities.diff_model_doc,
+                postgres_activities.delete_stale_doc_sections,
             ],
             activity_executor=tp,
         )
@@ -3,7 +3,7 @@ import os
 from concurrent.futures import ThreadPoolExecutor
 
 from dotenv import load_dotenv
-from qdrant_client import QdrantClient
+from qdrant_client import AsyncQdrantClient
 from temporalio.client import Client
 from temporalio.worker import Worker
 
@@ -12,8 +12,15 @@ from ingest.workflows.docs.ComputeAndUpsertModelDocEmbeddingsWorkflow import \
 from ingest.workflows.metadata.ComputeAndUpsertMetadataEmbeddingsWorkflow import \
     ComputeAndUpsertMetadataEmbeddingsWorkflow
 from shared.activities.vector_store_activities import VectorStoreActivities
+from shared.blob_store import create_blob_store_from_env
 from shared.const import VECTOR_STORE_TASK_QUEUE
+from shared.converter import create_data_converter_from_env
 from shared.utils.logging_config import logger
+from shared.vector_store.numpy_store import NumpyVectorStore
+from shared.vector_store.provisioning import DEFAULT_PROFILE_PATH, \
+    load_collection_profiles, provision_vector_store
+from shared.vector_store.qdrant_store import QdrantVectorStore
+from shared.vector_store.sparse import SparseEncoder, TermStatistics
 
 
 async def main():
@@ -22,8 +29,28 @@ async def main():
     TEMPORAL_ADDRESS = os.getenv("TEMPORAL_ADDRESS", "temporal:7233")
     TEMPORAL_NAMESPACE = os.getenv("TEMPORAL_NAMESPACE", "default")
 
+    # "qdrant", "numpy" (embedded store below VECTOR_STORE_ROOT) or "pgvector" (PGVECTOR_DB_URL)
+    VECTOR_STORE_BACKEND = os.getenv("VECTOR_STORE_BACKEND", "qdrant")
+    VECTOR_STORE_ROOT = os.getenv("VECTOR_STORE_ROOT", "./local_data/vector_store")
+    PGVECTOR_DB_URL = os.getenv("PGVECTOR_DB_URL", os.getenv("MODELS_DB_URL"))
+    # "hnsw" or "ivfflat"
+    PGVECTOR_INDEX_TYPE = os.getenv("PGVECTOR_INDEX_TYPE", "hnsw")
+    # "relaxed_order" lets filtered searches return `limit` hits (pgvector >= 0.8)
+    PGVECTOR_ITERATIVE_SCAN = os.getenv("PGVECTOR_ITERATIVE_SCAN") or None
     VECTOR_DB_HOST = os.getenv("VECTOR_DB_HOST")
     VECTOR_DB_PORT = os.getenv("VECTOR_DB_PORT")
+    VECTOR_DB_GRPC_PORT = int(os.getenv("VECTOR_DB_GRPC_PORT", "6334"))
+    VECTOR_DB_PREFER_GRPC = os.getenv("VECTOR_DB_PREFER_GRPC", "false").lower() == "true"
+    VECTOR_DB_UPSERT_BATCH_SIZE = int(os.getenv("VECTOR_DB_UPSERT_BATCH_SIZE", "256"))
+    VECTOR_DB_UPSERT_PARALLELISM = int(os.getenv("VECTOR_DB_UPSERT_PARALLELISM", "4"))
+    VECTOR_DB_UPSERT_WAIT = os.getenv("VECTOR_DB_UPSERT_WAIT", "false").lower() == "true"
+    VECTOR_DB_PROVISION_ON_STARTUP = os.getenv("VECTOR_DB_PROVISION_ON_STARTUP", "true").lower() == "true"
+    VECTOR_DB_COLLECTION_PROFILES = os.getenv("VECTOR_DB_COLLECTION_PROFILES", DEFAULT_PROFILE_PATH)
+    # BM25 sparse vectors of the collections with "sparse" in their profile,
+    # the term statistics file is written by the vector worker and read by retrieval.
+    # Opt-in: existing collections have to be recreated with the sparse vector first.
+    SPARSE_VECTORS_ENABLED = os.getenv("SPARSE_VECTORS_ENABLED", "false").lower() == "true"
+    SPARSE_STATS_PATH = os.getenv("SPARSE_STATS_PATH", "./local_data/sparse_stats.sqlite3")
     VECTOR_STORE_WORKER_MAX_CONCURRENT_ACTIVITIES = int(
         os.getenv("VECTOR_STORE_WORKER_MAX_CONCURRENT_ACTIVITIES", "1")
     )
@@ -31,8 +58,21 @@ async def main():
         os.getenv("VECTOR_STORE_WORKER_MAX_ACTIVITIES_PER_SECOND", "1")
     )
 
+    logger.info(f"VECTOR_STORE_BACKEND = {VECTOR_STORE_BACKEND} from .env loaded.")
+    logger.info(f"VECTOR_STORE_ROOT = {VECTOR_STORE_ROOT} from .env loaded.")
+    logger.info(f"PGVECTOR_INDEX_TYPE = {PGVECTOR_INDEX_TYPE} from .env loaded.")
+    logger.info(f"PGVECTOR_ITERATIVE_SCAN = {PGVECTOR_ITERATIVE_SCAN} from .env loaded.")
     logger.info(f"VECTOR_DB_HOST = {VECTOR_DB_HOST} from .env loaded.")
     logger.info(f"VECTOR_DB_PORT = {VECTOR_DB_PORT} from .env loaded.")
+    logger.info(f"VECTOR_DB_GRPC_PORT = {VECTOR_DB_GRPC_PORT} from .env loaded.")
+    logger.info(f"VECTOR_DB_PREFER_GRPC = {VECTOR_DB_PREFER_GRPC} from .env loaded.")
+    logger.info(f"VECTOR_DB_UPSERT_BATCH_SIZE = {VECTOR_DB_UPSERT_BATCH_SIZE} from .env loaded.")
+    logger.info(f"VECTOR_DB_UPSERT_PARALLELISM = {VECTOR_DB_UPSERT_PARALLELISM} from .env loaded.")
+    logger.info(f"VECTOR_DB_UPSERT_WAIT = {VECTOR_DB_UPSERT_WAIT} from .env loaded.")
+    logger.info(f"VECTOR_DB_PROVISION_ON_STARTUP = {VECTOR_DB_PROVISION_ON_STARTUP} from .env loaded.")
+    logger.info(f"VECTOR_DB_COLLECTION_PROFILES = {VECTOR_DB_COLLECTION_PROFILES} from .env loaded.")
+    logger.info(f"SPARSE_VECTORS_ENABLED = {SPARSE_VECTORS_ENABLED} from .env loaded.")
+    logger.info(f"SPARSE_STATS_PATH = {SPARSE_STATS_PATH} from .env loaded.")
     logger.info(
         f"VECTOR_STORE_WORKER_MAX_CONCURRENT_ACTIVITIES = {VECTOR_STORE_WORKER_MAX_CONCURRENT_ACTIVITIES} from .env loaded."
     )
@@ -43,13 +83,50 @@ async def main():
     client = None
     tp = None
     worker = None
+    vector_store = None
+    sparse_encoder = None
 
     try:
-        client = await Client.connect(TEMPORAL_ADDRESS, namespace=TEMPORAL_NAMESPACE)
+        client = await Client.connect(
+            TEMPORAL_ADDRESS,
+            namespace=TEMPORAL_NAMESPACE,
+            data_converter=create_data_converter_from_env(),
+        )
         tp = ThreadPoolExecutor()
 
-        vector_store_client = QdrantClient(host=VECTOR_DB_HOST, port=VECTOR_DB_PORT)
-        vector_store_activities = VectorStoreActivities(vector_store_client)
+        profiles = load_collection_profiles(VECTOR_DB_COLLECTION_PROFILES, SPARSE_VECTORS_ENABLED)
+        if SPARSE_VECTORS_ENABLED:
+            sparse_encoder = SparseEncoder(
+                TermStatistics(SPARSE_STATS_PATH),
+                [profile.name for profile in profiles if profile.sparse],
+            )
+        if VECTOR_STORE_BACKEND == "numpy":
+            vector_store = NumpyVectorStore(VECTOR_STORE_ROOT)
+        elif VECTOR_STORE_BACKEND == "pgvector":
+            # asyncpg is only needed by this backend
+            from shared.vector_store.pgvector_store import PgVectorStore
+            vector_store = await PgVectorStore.connect(
+                PGVECTOR_DB_URL,
+                index_type=PGVECTOR_INDEX_TYPE,
+                iterative_scan=PGVECTOR_ITERATIVE_SCAN,
+            )
+        else:
+            vector_store = QdrantVectorStore(AsyncQdrantClient(
+                host=VECTOR_DB_HOST,
+                port=VECTOR_DB_PORT,
+                grpc_port=VECTOR_DB_GRPC_PORT,
+                prefer_grpc=VECTOR_DB_PREFER_GRPC,
+            ))
+        if VECTOR_DB_PROVISION_ON_STARTUP:
+            await provision_vector_store(vector_store, profiles)
+        vector_store_activities = VectorStoreActivities(
+            vector_store,
+            create_blob_store_from_env(),
+            upsert_batch_size=VECTOR_DB_UPSERT_BATCH_SIZE,
+            upsert_parallelism=VECTOR_DB_UPSERT_PARALLELISM,
+            upsert_wait=VECTOR_DB_UPSERT_WAIT,
+            sparse_encoder=sparse_encoder,
+        )
 
         worker = Worker(
             client,
@@ -60,6 +137,12 @@ async def main():
             ],
             activities=[
                 vector_store_activities.upsert_metadata_vector_points,
+                vector_store_activities.filter_changed_vector_points,
+                vector_store_activities.stage_vector_points,
+                vector_store_activities.upsert_staged_vector_points,
+                vector_store_activities.delete_staged_vector_points,
+                vector_store_activities.delete_points_by_payload,
+                vector_store_activities.create_payload_indexes,
             ],
             max_concurrent_activities=VECTOR_STORE_WORKER_MAX_CONCURRENT_ACTIVITIES,
             max_activities_per_second=VECTOR_STORE_WORKER_MAX_ACTIVITIES_PER_SECOND,
@@ -76,6 +159,10 @@ async def main():
             await worker.shutdown()
         if tp:
             tp.shutdown(wait=True)
+        if vector_store:
+            await vector_store.close()
+        if sparse_encoder:
+            sparse_encoder.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,116 @@
+import asyncio
+
+import pytest
+
+from shared.models.vector import SparseVector, Vector, VectorPoint
+from shared.vector_store import numpy_store
+from shared.vector_store.numpy_store import NumpyVectorStore
+
+COLLECTION = "Chunks"
+
+
+def point(point_id: str, vector, model_id: str = "m1", content: str = "", sparse=None) -> VectorPoint:
+    return VectorPoint(id=point_id, payload={"model_id": model_id, "content": content},
+                       vector=Vector.from_floats(vector), sparse_vector=sparse)
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = NumpyVectorStore(str(tmp_path))
+    asyncio.run(store.create_collection(COLLECTION, 3))
+    return store
+
+
+def search_ids(store, vector, limit=10, payload_filter=None):
+    return [hit.id for hit in asyncio.run(store.search(COLLECTION, vector, limit, payload_filter))]
+
+
+def test_upsert_and_search(store):
+    asyncio.run(store.upsert(COLLECTION, [
+        point("a", [1, 0, 0]),
+        point("b", [0, 1, 0]),
+        point("c", [0.9, 0.1, 0]),
+    ]))
+
+    assert search_ids(store, [1, 0, 0], limit=2) == ["a", "c"]
+    hits = asyncio.run(store.search(COLLECTION, [0, 1, 0], 1))
+    assert hits[0].id == "b"
+    assert hits[0].score == pytest.approx(1.0)
+
+
+def test_upsert_overwrites_point(store):
+    asyncio.run(store.upsert(COLLECTION, [point("a", [1, 0, 0]), point("b", [0, 1, 0])]))
+    asyncio.run(store.upsert(COLLECTION, [point("a", [0, 0, 1], content="new")]))
+
+    assert search_ids(store, [1, 0, 0]) == ["b", "a"]
+    assert search_ids(store, [0, 0, 1], limit=1) == ["a"]
+    stored = asyncio.run(store.retrieve(COLLECTION, ["a"]))
+    assert [(p.id, p.payload["content"]) for p in stored] == [("a", "new")]
+
+
+def test_last_occurrence_in_batch_wins(store):
+    asyncio.run(store.upsert(COLLECTION, [
+        point("a", [1, 0, 0], content="first"),
+        point("a", [0, 1, 0], content="second"),
+    ]))
+
+    assert search_ids(store, [1, 0, 0]) == ["a"]
+    assert asyncio.run(store.retrieve(COLLECTION, ["a"]))[0].payload["content"] == "second"
+
+
+def test_delete_by_payload(store):
+    asyncio.run(store.upsert(COLLECTION, [
+        point("a", [1, 0, 0], model_id="m1"),
+        point("b", [0, 1, 0], model_id="m2"),
+        point("c", [0, 0, 1], model_id="m1"),
+    ]))
+    asyncio.run(store.delete(COLLECTION, {"model_id": ["m1"]}))
+
+    assert search_ids(store, [1, 0, 0]) == ["b"]
+    assert [p.id for p in asyncio.run(store.retrieve(COLLECTION, ["a", "b", "c"]))] == ["b"]
+
+
+def test_search_filters_by_payload(store):
+    asyncio.run(store.upsert(COLLECTION, [
+        point("a", [1, 0, 0], model_id="m1"),
+        point("b", [0.9, 0.1, 0], model_id="m2"),
+    ]))
+
+    assert search_ids(store, [1, 0, 0], payload_filter={"model_id": ["m2"]}) == ["b"]
+
+
+def test_compaction_past_max_segments(store, tmp_path, monkeypatch):
+    monkeypatch.setattr(numpy_store, "MAX_SEGMENTS", 3)
+    for i in range(4):
+        asyncio.run(store.upsert(COLLECTION, [point(f"p{i}", [1, i, 0]), point("shared", [0, 0, 1 + i])]))
+
+    collection = store._collection(COLLECTION)
+    assert len(collection.segments) == 1
+    assert sorted(collection.segments[0].ids) == ["p0", "p1", "p2", "p3", "shared"]
+    # files of the merged segments are removed
+    assert len(list((tmp_path / COLLECTION).glob("seg_*.npy"))) == 1
+    assert sorted(search_ids(store, [1, 0, 0])) == ["p0", "p1", "p2", "p3", "shared"]
+
+
+def test_other_reader_sees_new_version(store, tmp_path):
+    asyncio.run(store.upsert(COLLECTION, [point("a", [1, 0, 0])]))
+    reader = NumpyVectorStore(str(tmp_path))
+    assert search_ids(reader, [1, 0, 0]) == ["a"]
+
+    asyncio.run(store.upsert(COLLECTION, [point("b", [0, 1, 0]), point("a", [0, 0, 1])]))
+    asyncio.run(store.delete(COLLECTION, {"model_id": ["m2"]}))
+
+    assert search_ids(reader, [0, 1, 0], limit=1) == ["b"]
+    assert search_ids(reader, [0, 0, 1], limit=1) == ["a"]
+    assert len(search_ids(reader, [1, 0, 0])) == 2
+
+
+def test_sparse_search(store):
+    asyncio.run(store.upsert(COLLECTION, [
+        point("a", [1, 0, 0], sparse=SparseVector(indices=[1, 2], values=[1.0, 0.5])),
+        point("b", [0, 1, 0], sparse=SparseVector(indices=[2], values=[2.0])),
+        point("c", [0, 0, 1]),
+    ]))
+
+    hits = asyncio.run(store.search_sparse(COLLECTION, SparseVector(indices=[2], values=[1.0]), 10))
+    assert [(hit.id, hit.score) for hit in hits] == [("b", pytest.approx(2.0)), ("a", pytest.approx(0.5))]
@@ -0,0 +1,100 @@
+from collections import Counter
+
+import pytest
+
+from shared.models.vector import Vector, VectorPoint
+from shared.vector_store.sparse import SparseEncoder, TermStatistics, term_index, tokenize
+
+COLLECTION = "Chunks"
+
+
+@pytest.fixture
+def statistics(tmp_path):
+    statistics = TermStatistics(str(tmp_path / "stats.sqlite3"))
+    yield statistics
+    statistics.close()
+
+
+def document(text: str, model_id: str = "m1", doc_section_id: str = "s1"):
+    return Counter(term_index(token) for token in tokenize(text)), \
+        {"model_id": model_id, "doc_section_id": doc_section_id}
+
+
+def doc_freq(statistics, term: str) -> int:
+    return statistics.doc_freqs(COLLECTION, [term_index(term)]).get(term_index(term), 0)
+
+
+def test_tokenize_drops_stopwords_and_single_characters():
+    assert tokenize("The agent-based Model of a city, v2") == ["agent", "based", "model", "city", "v2"]
+
+
+def test_add_documents_counts_terms(statistics):
+    statistics.add_documents(COLLECTION, {
+        "a": document("forest fire model"),
+        "b": document("forest growth"),
+    })
+
+    assert statistics.totals(COLLECTION) == (2, 5)
+    assert doc_freq(statistics, "forest") == 2
+    assert doc_freq(statistics, "fire") == 1
+
+
+def test_reindexing_replaces_earlier_version(statistics):
+    statistics.add_documents(COLLECTION, {"a": document("forest fire model")})
+    statistics.add_documents(COLLECTION, {"a": document("predator prey")})
+
+    assert statistics.totals(COLLECTION) == (1, 2)
+    assert doc_freq(statistics, "forest") == 0
+    assert doc_freq(statistics, "prey") == 1
+
+
+def test_remove_documents_by_payload(statistics):
+    statistics.add_documents(COLLECTION, {
+        "a": document("forest fire", doc_section_id="s1"),
+        "b": document("forest growth", doc_section_id="s2"),
+    })
+
+    assert statistics.remove_documents(COLLECTION, {"doc_section_id": ["s1"]}) == 1
+    assert statistics.totals(COLLECTION) == (1, 2)
+    assert doc_freq(statistics, "forest") == 1
+    assert doc_freq(statistics, "fire") == 0
+
+
+def test_remove_documents_by_unknown_field_keeps_them(statistics):
+    statistics.add_documents(COLLECTION, {"a": document("forest fire")})
+
+    assert statistics.remove_documents(COLLECTION, {"chunk_id": ["c1"]}) == 0
+    assert statistics.totals(COLLECTION) == (1, 2)
+
+
+def test_failed_add_documents_rolls_back(statistics):
+    statistics.add_documents(COLLECTION, {"a": document("forest fire")})
+    with pytest.raises(AttributeError):
+        # the payload of the second document is invalid
+        statistics.add_documents(COLLECTION, {
+            "b": document("forest growth"),
+            "c": (Counter([1]), None),
+        })
+
+    assert statistics.totals(COLLECTION) == (1, 2)
+    assert doc_freq(statistics, "growth") == 0
+    statistics.add_documents(COLLECTION, {"b": document("forest growth")})
+    assert statistics.totals(COLLECTION) == (2, 4)
+
+
+def test_encoder_scores_matching_points_higher(statistics):
+    encoder = SparseEncoder(statistics, [COLLECTION])
+    points = encoder.encode_points(COLLECTION, [
+        VectorPoint(id=point_id, payload={"model_id": "m1", "content": content}, vector=Vector())
+        for point_id, content in [("a", "wolf sheep predation"), ("b", "forest fire spread"),
+                                  ("c", "sheep grazing")]
+    ])
+    query = encoder.encode_query(COLLECTION, "wolf sheep")
+
+    def score(point):
+        weights = dict(zip(point.sparse_vector.indices, point.sparse_vector.values))
+        return sum(weights.get(term, 0.0) * value for term, value in zip(query.indices, query.values))
+
+    scores = {point.id: score(point) for point in points}
+    assert scores["a"] > scores["c"] > scores["b"] == 0
+    assert encoder.encode_query(COLLECTION, "unknown words") is None